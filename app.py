@@ -1,44 +1,41 @@
-import random
+import csv
+import queue
 import sqlite3
 import sys
+import threading
+import time
 import tkinter as tk
 import tkinter.ttk as ttk
-from tkinter import messagebox
-import json
+from tkinter import filedialog, messagebox, simpledialog
 import os
-
-
-class Database:
-    @staticmethod
-    def get_connection():
-        if getattr(sys, 'frozen', False):
-            base_path = os.path.dirname(sys.executable)
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-
-        db_path = os.path.join(base_path, 'vocabulary.db')
-
-        conn = sqlite3.connect(db_path)
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
-
-    # SCHEMA
-    """
-        CREATE TABLE vocab_sets (
-        set_id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL UNIQUE,
-        description TEXT
-    );
-
-    CREATE TABLE vocab (
-        vocab_id INTEGER PRIMARY KEY,
-        set_id INTEGER NOT NULL,
-        word TEXT NOT NULL,
-        definition TEXT NOT NULL,
-        FOREIGN KEY (set_id) REFERENCES vocab_sets(set_id) ON DELETE CASCADE
-    );
-    
-    """
+import zipfile
+
+from vocab_core import audio, profiles, sets, stats
+from vocab_core.database import Database
+from vocab_core.deckquery import session_source
+from vocab_core.grading import Grader, GradingOptions
+from vocab_core.importer import import_file
+from vocab_core.metrics import metrics
+from vocab_core.paging import VocabPages
+from vocab_core.review_log import ReviewLogWriter
+from vocab_core.search import search_vocab
+from vocab_core.session import TrainingSession
+from vocab_core.tags import list_tags, tag_words, untag_words
+from vocab_core.tasks import TaskRunner
+from vocab_core.timers import SessionClock, Timers
+from widgets import ListRows, TimerPump, VirtualTreeview
+
+# how often the training window picks up work finished in the background
+TASK_POLL_MS = 50
+# the next quiz batch is fetched this long before its popup is due
+PREFETCH_LEAD = 5.0
+# words shown at once in the quiz popup; larger batches are paged
+PAGE_SIZE = 10
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
 
 
 class App:
@@ -46,6 +43,21 @@ class App:
         self.root = root
         self.root.title("Vocabulary App")
 
+        # each learner has their own settings and progress
+        profile_frame = tk.Frame(self.root)
+        profile_frame.pack()
+        tk.Label(profile_frame, text="Learner:").pack(side=tk.LEFT)
+        self.profile_combobox = ttk.Combobox(profile_frame, state="readonly", width=20)
+        self.profile_combobox.pack(side=tk.LEFT)
+        self.profile_combobox.bind("<<ComboboxSelected>>", self.select_profile)
+        new_profile_button = tk.Button(
+            profile_frame, text="New Learner", command=self.create_profile)
+        new_profile_button.pack(side=tk.LEFT)
+        delete_profile_button = tk.Button(
+            profile_frame, text="Delete Learner", command=self.delete_profile)
+        delete_profile_button.pack(side=tk.LEFT)
+        self.refresh_profiles()
+
         create_vocab_set_button = tk.Button(
             self.root, text="Create New Vocab Set", command=self.create_vocab_set)
         create_vocab_set_button.pack()
@@ -54,6 +66,10 @@ class App:
             root, text="Delete Vocab Set", command=self.delete_vocab_set)
         delete_vocab_set_button.pack()
 
+        import_vocab_set_button = tk.Button(
+            root, text="Import Vocab Set", command=self.import_vocab_set)
+        import_vocab_set_button.pack()
+
         self.display_vocab_sets()
 
         start_training_button = tk.Button(
@@ -61,16 +77,49 @@ class App:
         start_training_button.pack()
 
     # FUNCTIONS
+    def refresh_profiles(self):
+        # profiles in the format {name: id}, most recently used first
+        self.profiles = {name: profile_id for profile_id, name in profiles.list_profiles()}
+        self.profile_combobox.config(values=list(self.profiles))
+        self.profile_name = next(iter(self.profiles))
+        self.profile_id = self.profiles[self.profile_name]
+        self.profile_combobox.set(self.profile_name)
+
+    def select_profile(self, event=None):
+        self.profile_name = self.profile_combobox.get()
+        self.profile_id = self.profiles[self.profile_name]
+        profiles.touch_profile(self.profile_id)
+
+    def create_profile(self):
+        name = simpledialog.askstring("New Learner", "Name:", parent=self.root)
+        if not name or not name.strip():
+            return
+        try:
+            profile_id = profiles.create_profile(name.strip())
+        except profiles.ProfileExistsError:
+            messagebox.showwarning(
+                "Warning", "A learner with this name already exists.")
+            return
+        profiles.touch_profile(profile_id)
+        self.refresh_profiles()
+
+    def delete_profile(self):
+        if self.profile_id == profiles.DEFAULT_PROFILE:
+            messagebox.showwarning(
+                "Warning", "The default learner cannot be deleted.")
+            return
+        if not messagebox.askyesno(
+                "Delete Learner",
+                f"Delete {self.profile_name} and their progress and settings?",
+                parent=self.root):
+            return
+        profiles.delete_profile(self.profile_id)
+        self.refresh_profiles()
+
     # vocab sets in the format {name: (id, description)}
 
     def get_vocab_sets(self):
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("SELECT * FROM vocab_sets")
-            vocab_sets = c.fetchall()
-            vocab_sets_ret = {vs[1]: (vs[0], vs[2]) for vs in vocab_sets}
-            c.close()
-            return vocab_sets_ret
+        return sets.get_vocab_sets()
 
     def display_vocab_sets(self):
         self.vocab_sets = self.get_vocab_sets()
@@ -113,19 +162,6 @@ class App:
         # Bind the edit_vocab_set function to the listbox's double-click event
         self.vocab_sets_listbox.bind("<Double-Button-1>", self.edit_vocab_set)
 
-    def get_vocab_list(self, set_id):
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("SELECT * FROM vocab WHERE set_id=?", (set_id,))
-            vocab_list = c.fetchall()
-            vocab_list_ret = {v[2]: v[3] for v in vocab_list}
-            c.close()
-            return vocab_list_ret
-
-    def get_vocab_list_by_name(self, set_name):
-        set_id = self.vocab_sets[set_name][0]
-        return self.get_vocab_list(set_id)
-
     def refresh_vocab_sets(self):
         self.vocab_sets_listbox.delete(0, tk.END)
         self.vocab_sets = self.get_vocab_sets()
@@ -141,6 +177,19 @@ class App:
         self.root.withdraw()
         NewVocabSetWindow(self.root, self)
 
+    def import_vocab_set(self):
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Import Vocab Set",
+            filetypes=[("Vocab files", "*.csv *.tsv *.txt *.apkg"), ("All files", "*")])
+        if not path:
+            return
+        set_name = simpledialog.askstring(
+            "Import Vocab Set", "Import into set:", parent=self.root,
+            initialvalue=os.path.splitext(os.path.basename(path))[0])
+        if not set_name:
+            return
+        ImportWindow(self.root, path, set_name, self)
+
     def edit_vocab_set(self, event):
         index = event.widget.curselection()
         if not index:
@@ -149,10 +198,9 @@ class App:
         self.vocab_sets = self.get_vocab_sets()
         set_id = self.vocab_sets[set_name][0]
         set_description = self.vocab_sets[set_name][1]
-        vocab_list = self.get_vocab_list(set_id)
         self.root.withdraw()
         EditVocabSetWindow(self.root, set_id, set_name,
-                           set_description, vocab_list, self)
+                           set_description, self)
 
     def start_training(self):
         self.root.withdraw()
@@ -242,33 +290,92 @@ class NewVocabSetWindow:
                 "Warning", "Please enter a name for the set.")
             return
         self.set_description = self.set_description_entry.get()
-        # Save the word and definition to the database
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            vocab_set_titles = [name for name in self.app.get_vocab_sets()]
-            if self.set_title in vocab_set_titles:
-                messagebox.showwarning(
-                    "Warning", "A set with that name already exists.")
-                return
-            c.execute(
-                "INSERT INTO vocab_sets (name, description) VALUES (?, ?)", (self.set_title, self.set_description))
-            conn.commit()
-            set_id = c.lastrowid
-            vocab_items = []
-            for item in self.vocab_treeview.get_children():
-                word = self.vocab_treeview.item(item)["values"][0]
-                definition = self.vocab_treeview.item(item)["values"][1]
-                vocab_items.append((set_id, word, definition))
-
-            c.executemany(
-                "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", vocab_items)
-            conn.commit()
-            c.close()
+        vocab_items = []
+        for item in self.vocab_treeview.get_children():
+            word = self.vocab_treeview.item(item)["values"][0]
+            definition = self.vocab_treeview.item(item)["values"][1]
+            vocab_items.append((word, definition))
+
+        # Save the set and its words to the database in one transaction
+        try:
+            sets.create_set(self.set_title, self.set_description, vocab_items)
+        except sets.SetExistsError:
+            messagebox.showwarning(
+                "Warning", "A set with that name already exists.")
+            return
         self.app.refresh_vocab_sets()
         self.parent.deiconify()
         self.window.destroy()
 
 
+class ImportWindow:
+    def __init__(self, parent, path, set_name, app):
+        self.app = app
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"Importing into {set_name}")
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.progress_label = tk.Label(
+            self.window, text=f"Reading {os.path.basename(path)}...", width=40)
+        self.progress_label.grid(row=0, column=0)
+        self.progressbar = ttk.Progressbar(
+            self.window, mode="indeterminate", length=300)
+        self.progressbar.grid(row=1, column=0)
+        self.progressbar.start()
+        self.cancel_button = tk.Button(
+            self.window, text="Cancel", command=self.cancel)
+        self.cancel_button.grid(row=2, column=0)
+
+        # The import runs on a worker thread and reports back through a queue
+        # that the Tk mainloop polls
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        threading.Thread(
+            target=self.run_import, args=(path, set_name), daemon=True).start()
+        self.poll()
+
+    def run_import(self, path, set_name):
+        try:
+            count = import_file(
+                path, set_name,
+                progress=lambda count: self.messages.put(("progress", count)),
+                cancelled=self.cancelled.is_set)
+        except (ValueError, OSError, csv.Error, zipfile.BadZipFile, sqlite3.Error) as e:
+            self.messages.put(("error", str(e)))
+        else:
+            self.messages.put(("done", count))
+        finally:
+            Database.release()
+
+    def poll(self):
+        try:
+            while True:
+                kind, value = self.messages.get_nowait()
+                if kind == "progress":
+                    self.progress_label.config(text=f"Imported {value} words")
+                elif kind == "error":
+                    self.finish()
+                    messagebox.showerror("Import failed", value)
+                    return
+                else:
+                    self.finish()
+                    messagebox.showinfo("Import finished", f"Imported {value} words.")
+                    return
+        except queue.Empty:
+            pass
+        self.window.after(100, self.poll)
+
+    def cancel(self):
+        # Stops after the chunk being written; what was committed is kept
+        self.cancelled.set()
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def finish(self):
+        self.progressbar.stop()
+        self.window.destroy()
+        self.app.refresh_vocab_sets()
+
+
 class DeleteVocabSetWindow:
     def __init__(self, parent, vocab_sets, app):
         self.window = tk.Toplevel(parent)
@@ -303,18 +410,14 @@ class DeleteVocabSetWindow:
                 "Warning", "Please select a set to delete.")
             return
         set_name = self.vocab_sets_listbox.get(index)
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("DELETE FROM vocab_sets WHERE name = ?", (set_name,))
-            conn.commit()
-            c.close()
+        sets.delete_set(set_name)
 
         self.app.refresh_vocab_sets()
         self.window.destroy()
 
 
 class EditVocabSetWindow:
-    def __init__(self, parent, set_id, set_name, set_description, vocab_list, app):
+    def __init__(self, parent, set_id, set_name, set_description, app):
         self.window = tk.Toplevel(parent)
         self.window.title(f"Edit {set_name}")
         self.window.grid_columnconfigure(0, weight=1)
@@ -323,9 +426,20 @@ class EditVocabSetWindow:
         self.set_name = set_name
         self.app = app
         self.parent = parent
-        self.vocab_list = vocab_list
         self.set_id = set_id
         self.set_description = set_description
+        # Saved rows are read from the database a page at a time as the
+        # treeview scrolls
+        self.vocab_pages = VocabPages(set_id)
+
+        # Pending changes since the last save, applied over the saved rows.
+        # Saved rows use their vocab_id as the treeview item id; new rows are
+        # tracked by item id, in the order they were added, until they are
+        # inserted. Both map to (word, definition).
+        self.inserted_items = {}
+        self.new_item_count = 0
+        self.updated_rows = {}
+        self.deleted_ids = set()
 
         # Rename set
         rename_label = tk.Label(self.window, text="Rename set:")
@@ -352,25 +466,25 @@ class EditVocabSetWindow:
         self.def_entry = tk.Entry(self.window)
         self.def_entry.grid(row=3, column=1)
 
-        # Create the Treeview
-        self.vocab_treeview = ttk.Treeview(
-            self.window, columns=("Word", "Definition"), show="headings")
-        self.vocab_treeview.heading("Word", text="Word")
-        self.vocab_treeview.heading("Definition", text="Definition")
-        self.vocab_treeview.column("Word", width=100)
-        self.vocab_treeview.column("Definition", width=200)
-
-        # Create the vertical scrollbar and associate it with the Treeview
-        scrollbar = ttk.Scrollbar(
-            self.window, orient="vertical", command=self.vocab_treeview.yview)
-        self.vocab_treeview.configure(yscrollcommand=scrollbar.set)
-
-        # Place the Treeview and scrollbar using grid geometry manager
-        self.vocab_treeview.grid(row=4, column=0, columnspan=3, sticky='nsew')
-        scrollbar.grid(row=4, column=2, sticky='nse')
-
-        # Fill vocab_listbox with current vocab
-        self.fill_vocab_treeview()
+        # Search the set; an empty search shows every word
+        search_label = tk.Label(self.window, text="Search:")
+        search_label.grid(row=4, column=0)
+        self.search_entry = tk.Entry(self.window)
+        self.search_entry.grid(row=4, column=1)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_rows = None
+        self.search_after_id = None
+
+        # Create the Treeview, which only holds the rows in view
+        self.vocab_view = VirtualTreeview(
+            self.window, columns=("Word", "Definition"),
+            fetch_rows=self.fetch_vocab_rows, count_rows=self.count_vocab_rows)
+        self.vocab_view.heading("Word", text="Word")
+        self.vocab_view.heading("Definition", text="Definition")
+        self.vocab_view.column("Word", width=100)
+        self.vocab_view.column("Definition", width=200)
+        self.vocab_view.grid(row=5, column=0, columnspan=3, sticky='nsew')
+        self.vocab_treeview = self.vocab_view.tree
 
         # Delete word  (bind to right click)
         if sys.platform == "darwin":
@@ -387,49 +501,123 @@ class EditVocabSetWindow:
         # Add word button
         add_button = tk.Button(self.window, text="Add Word", command=lambda: self.add_vocab(
         ))
-        add_button.grid(row=5, column=0)
+        add_button.grid(row=6, column=0)
 
         # Save button
         save_button = tk.Button(self.window, text="Save",
                                 command=lambda: self.save_vocab())
-        save_button.grid(row=5, column=1)
+        save_button.grid(row=6, column=1)
 
         # Cancel button
         cancel_button = tk.Button(
             self.window, text="Cancel", command=lambda: (self.window.destroy(), self.parent.deiconify()))
-        cancel_button.grid(row=5, column=2)
+        cancel_button.grid(row=6, column=2)
+
+        # Tag the selected words; tags are saved at once, not with Save
+        tag_label = tk.Label(self.window, text="Tag:")
+        tag_label.grid(row=7, column=0)
+        self.tag_entry = tk.Entry(self.window)
+        self.tag_entry.grid(row=7, column=1)
+        tag_button = tk.Button(self.window, text="Tag Selected",
+                               command=lambda: self.tag_selected(True))
+        tag_button.grid(row=8, column=0)
+        untag_button = tk.Button(self.window, text="Untag Selected",
+                                 command=lambda: self.tag_selected(False))
+        untag_button.grid(row=8, column=1)
+        self.tags_label = tk.Label(self.window, text="", wraplength=300)
+        self.tags_label.grid(row=9, column=0, columnspan=3)
+        self.show_tags()
+
+    def tag_selected(self, add):
+        # new words have no vocab_id to tag until they are saved
+        vocab_ids = [int(item) for item in self.vocab_treeview.selection()
+                     if item not in self.inserted_items]
+        if not vocab_ids:
+            messagebox.showwarning("Warning", "Please select saved words to tag.")
+            return
+        try:
+            if add:
+                tag_words(self.tag_entry.get(), vocab_ids)
+            else:
+                untag_words(self.tag_entry.get().strip(), vocab_ids)
+        except ValueError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        self.show_tags()
+
+    def show_tags(self):
+        tag_counts = ", ".join(f"{tag} ({count})" for tag, count in list_tags())
+        self.tags_label.config(text=f"Tags in use: {tag_counts or 'none'}")
 
     def rename_set(self, new_name):
         # Rename the set in the database
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("UPDATE vocab_sets SET name=? WHERE name=?",
-                      (new_name, self.set_name))
-            conn.commit()
-            c.close()
+        sets.save_set_changes(self.set_id, name=new_name)
         self.set_name = new_name
         self.window.title(f"Edit {new_name}")
 
     def edit_description(self, new_description):
         # Edit the description in the database
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("UPDATE vocab_sets SET description=? WHERE name=?",
-                      (new_description, self.set_name))
-            conn.commit()
-            c.close()
+        sets.save_set_changes(self.set_id, description=new_description)
         self.set_description = new_description
 
-    def fill_vocab_treeview(self):
-        for word in self.vocab_list:
-            self.vocab_treeview.insert(
-                "", tk.END, values=(word, self.vocab_list[word]))
+    def schedule_search(self, event):
+        # Wait for a pause in typing before querying
+        if self.search_after_id is not None:
+            self.window.after_cancel(self.search_after_id)
+        self.search_after_id = self.window.after(200, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        text = self.search_entry.get().strip()
+        if not text:
+            self.search_rows = None
+        else:
+            self.search_rows = [
+                (str(vocab_id), self.updated_rows.get(vocab_id, (word, definition)))
+                for vocab_id, _set_id, word, definition in search_vocab(text, self.set_id, limit=1000)
+                if vocab_id not in self.deleted_ids]
+            # unsaved words aren't indexed yet
+            lowered = text.lower()
+            self.search_rows.extend(
+                (item, values) for item, values in self.inserted_items.items()
+                if lowered in values[0].lower() or lowered in values[1].lower())
+        self.vocab_view.first = 0
+        self.vocab_view.refresh()
+
+    def refresh_vocab_view(self):
+        if self.search_rows is not None:
+            self.run_search()
+        else:
+            self.vocab_view.refresh()
+
+    def count_vocab_rows(self):
+        if self.search_rows is not None:
+            return len(self.search_rows)
+        return self.vocab_pages.count() + len(self.inserted_items)
+
+    def fetch_vocab_rows(self, offset, limit):
+        if self.search_rows is not None:
+            return self.search_rows[offset:offset + limit]
+        # Saved rows (minus deleted ones) come first, then the new rows
+        rows = []
+        for vocab_id, word, definition in self.vocab_pages.rows(offset, limit):
+            rows.append((str(vocab_id),
+                         self.updated_rows.get(vocab_id, (word, definition))))
+        new_offset = max(0, offset + len(rows) - self.vocab_pages.count())
+        new_items = list(self.inserted_items.items())
+        rows.extend(new_items[new_offset:new_offset + limit - len(rows)])
+        return rows
 
     def add_vocab(self):
         # Add vocab to the set
         word = self.word_entry.get()
         definition = self.def_entry.get()
-        self.vocab_treeview.insert("", tk.END, values=(word, definition))
+        self.inserted_items[f"new{self.new_item_count}"] = (word, definition)
+        self.new_item_count += 1
+        if self.search_rows is not None:
+            self.search_entry.delete(0, tk.END)
+            self.search_rows = None
+        self.vocab_view.scroll_to_end()
 
     def edit_vocab_word(self, event):
         # Edit the selected vocab word
@@ -438,8 +626,8 @@ class EditVocabSetWindow:
             return
 
         # open a new edit window
-        word = self.vocab_treeview.item(row_id)["values"][0]
-        definition = self.vocab_treeview.item(row_id)["values"][1]
+        word = self.vocab_treeview.set(row_id, "Word")
+        definition = self.vocab_treeview.set(row_id, "Definition")
         editwindow = tk.Toplevel(self.window)
         editwindow.title("Edit Word")
         editwindow.grid_columnconfigure(0, weight=1)
@@ -466,7 +654,11 @@ class EditVocabSetWindow:
         cancel_button.grid(row=2, column=1)
 
         def save_word(word, definition, row_id):
-            self.vocab_treeview.item(row_id, values=(word, definition))
+            if row_id in self.inserted_items:
+                self.inserted_items[row_id] = (word, definition)
+            else:
+                self.updated_rows[int(row_id)] = (word, definition)
+            self.refresh_vocab_view()
             editwindow.destroy()
 
     def delete_vocab_word(self, event):
@@ -474,29 +666,32 @@ class EditVocabSetWindow:
         row_id = self.vocab_treeview.identify_row(event.y)
         if not row_id:
             return
-        self.vocab_treeview.delete(row_id)
+        if row_id in self.inserted_items:
+            del self.inserted_items[row_id]
+        else:
+            vocab_id = int(row_id)
+            self.updated_rows.pop(vocab_id, None)
+            self.deleted_ids.add(vocab_id)
+            self.vocab_pages.exclude(vocab_id)
+        self.refresh_vocab_view()
 
     def save_vocab(self):
-        # Save the vocab set
-
-        vocab_items = []
-        for item in self.vocab_treeview.get_children():
-            word = self.vocab_treeview.item(item)["values"][0]
-            definition = self.vocab_treeview.item(item)["values"][1]
-            self.vocab_list[word] = definition
-            vocab_items.append((self.set_id, word, definition))
-
-        with Database.get_connection() as conn:
-            c = conn.cursor()
-            c.execute("DELETE FROM vocab WHERE set_id=?", (self.set_id,))
-            c.executemany(
-                "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", vocab_items)
-
-            c.execute("UPDATE vocab_sets SET name=?, description=? WHERE set_id=?",
-                      (self.rename_entry.get(), self.description_entry.get(), self.set_id))
-
-            conn.commit()
-            c.close()
+        # Save only the rows that changed since the set was loaded
+        new_name = self.rename_entry.get()
+        new_description = self.description_entry.get()
+        try:
+            sets.save_set_changes(
+                self.set_id,
+                name=new_name if new_name != self.set_name else None,
+                description=new_description if new_description != self.set_description else None,
+                inserted=self.inserted_items.values(),
+                updated=[(vocab_id, word, definition)
+                         for vocab_id, (word, definition) in self.updated_rows.items()],
+                deleted=self.deleted_ids)
+        except sqlite3.IntegrityError:
+            messagebox.showwarning(
+                "Warning", "Each word and the set name must be unique.")
+            return
 
         self.app.refresh_vocab_sets()
         self.parent.deiconify()
@@ -505,15 +700,31 @@ class EditVocabSetWindow:
 
 class StartTrainingWindow:
     def __init__(self, parent, app):
-        self.settings_file_path = 'settings.json'
         self.default_settings = {
             "interval": 300,
             "number_of_words": 0,
+            # 1 also accepts typos and words in another order; with 0, case,
+            # accents and punctuation are still ignored
+            "fuzzy_grading": 0,
+            # "due" for spaced repetition (only words that are due), "ahead" to
+            # also review words before they are due, "shuffle" to cycle through the set
+            "word_order": "due",
+            # only words answered wrong in this many days; 0 means every word
+            "wrong_in_last_days": 0,
+            # only words with one of these comma-separated tags
+            "tags": "",
+            # 1 adds a button to hear each word, spoken by an offline TTS engine
+            "pronunciation": 1,
+            # TTS voice, e.g. "de" for espeak; empty for the engine's default
+            "voice": "",
         }
 
-        self.settings = self.load_settings()
         self.app = app
         self.parent = parent
+        # settings are kept per learner in the database
+        self.profile_id = app.profile_id
+        self.settings_store = profiles.SettingsStore.get(self.profile_id)
+        self.settings = self.load_settings()
 
         self.window = tk.Toplevel(parent)
         self.window.title("Training")
@@ -546,7 +757,8 @@ class StartTrainingWindow:
         self.vocab_label = tk.Label(
             self.window, text="Vocab Set", font=("Arial", 24))
         self.vocab_label.grid(row=0, column=2)
-        self.vocab_set_listbox = tk.Listbox(self.window)
+        # several sets can be selected and are trained together
+        self.vocab_set_listbox = tk.Listbox(self.window, selectmode=tk.EXTENDED, exportselection=False)
         self.vocab_set_listbox.grid(row=1, column=2, rowspan=r+1)
         self.display_vocab_sets()
 
@@ -560,9 +772,74 @@ class StartTrainingWindow:
         self.stop_button.grid(row=r+2, column=1)
 
         self.cancel_button = tk.Button(
-            self.window, text="Cancel", command=lambda: (self.stop_training(), self.window.destroy(), self.parent.deiconify()))
+            self.window, text="Cancel", command=self.close)
         self.cancel_button.grid(row=r+2, column=2)
-        self.after_id = None
+
+        self.pause_button = tk.Button(
+            self.window, text="Pause", command=self.toggle_pause)
+        self.pause_button.grid(row=r+3, column=1)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.history_view = None
+        # popups, prefetches and the timer label run on session time, which
+        # stops while paused; one pending after() serves all of them
+        self.clock = SessionClock()
+        self.timers = Timers(self.clock)
+        self.timer_pump = TimerPump(self.window, self.timers)
+        self.popup_timer = self.prefetch_timer = self.tick_timer = None
+        self.time_label = None
+        # the timer label only ticks while the window is on screen
+        self.window.bind("<Map>", self.window_mapped)
+        self.window.bind("<Unmap>", self.window_unmapped)
+        # answers are written to review_log in the background
+        self.review_log = ReviewLogWriter()
+        # database and file work runs on worker threads and its results are
+        # picked up by poll_tasks, so the window never waits on the disk
+        self.tasks = TaskRunner(on_error=self.task_failed)
+        self.session = None
+        # training runs are numbered so results of a stopped run are dropped
+        self.run = 0
+        self.next_words = None
+        self.fetching = False
+        self.popup_due = False
+        self.set_ids = []
+        # answers of this training run; the all-time numbers are in the stats tables
+        self.session_correct = 0
+        self.session_total = 0
+        self.dashboard_label = None
+        # pronunciation clips, opened when training starts with pronunciation on
+        self.audio = None
+        # the quiz popup, made when the first batch is shown and then reused
+        self.popup = None
+        self.poll_after_id = None
+
+    def submit_task(self, fn, *args, callback=None):
+        self.tasks.submit(fn, *args, callback=callback)
+        if self.poll_after_id is None:
+            self.poll_after_id = self.window.after(TASK_POLL_MS, self.poll_tasks)
+
+    def poll_tasks(self):
+        # polls only while work is outstanding, so an idle window stays asleep
+        self.tasks.poll()
+        if self.tasks.pending:
+            self.poll_after_id = self.window.after(TASK_POLL_MS, self.poll_tasks)
+        else:
+            self.poll_after_id = None
+
+    def task_failed(self, error):
+        messagebox.showerror("Error", str(error), parent=self.window)
+
+    def close(self):
+        self.stop_training()
+        self.timer_pump.close()
+        if self.poll_after_id is not None:
+            self.window.after_cancel(self.poll_after_id)
+        self.tasks.close()
+        if self.audio is not None:
+            self.audio.close()
+        # writes out any answers still buffered
+        self.review_log.close()
+        self.window.destroy()
+        self.parent.deiconify()
 
     def set_default_settings(self):
         self.reload_default_settings()
@@ -572,79 +849,162 @@ class StartTrainingWindow:
             self.entry_dict[setting].delete(0, tk.END)
             self.entry_dict[setting].insert(0, self.default_settings[setting])
 
-    def reload_settings_from_file(self):
+    def reload_saved_settings(self):
         self.settings = self.load_settings()
         for setting in self.settings:
             self.entry_dict[setting].delete(0, tk.END)
             self.entry_dict[setting].insert(0, self.settings[setting])
 
     def load_settings(self):
-        if not os.path.exists(self.settings_file_path):
-            settings = self.default_settings
-            with open(self.settings_file_path, "w") as f:
-                json.dump(settings, f, indent=4)
-            return settings
-        else:
-            with open(self.settings_file_path, "r") as f:
-                settings = json.load(f)
-                return settings
+        # settings never saved for this learner get their defaults
+        return self.settings_store.values(self.default_settings)
 
     def save_settings(self):
         for setting in self.settings:
             self.settings[setting] = self.entry_dict[setting].get()
-        with open(self.settings_file_path, "w") as f:
-            json.dump(self.settings, f, indent=4)
+        # kept in memory now and written to the database shortly after
+        self.settings_store.update(self.settings)
 
     def display_vocab_sets(self):
         self.vocab_set_listbox.delete(0, tk.END)
         for set_title in self.app.get_vocab_sets():
             self.vocab_set_listbox.insert(tk.END, set_title)
 
-    def schedule_next_popup(self):
-        if self.training_flag:
-            self.after_id = self.window.after(
-                int(self.settings["interval"])*1000, self.show_popup)
+    def schedule_popups(self):
+        # popups fall every interval seconds of session time from the start,
+        # each batch fetched a little before; a late wake-up does not push the
+        # following popups back
+        interval = int(self.settings["interval"])
+        lead = min(PREFETCH_LEAD, interval / 2)
+        self.prefetch_timer = self.timers.every(interval, self.request_batch, first=interval - lead)
+        self.popup_timer = self.timers.every(interval, self.show_popup)
+
+    def request_batch(self):
+        if (not self.training_flag or self.session is None or self.fetching
+                or self.next_words is not None):
+            return
+        self.fetching = True
+        run = self.run
+        # Words most overdue for review first, skipping ones still waiting in
+        # an unanswered popup
+        self.submit_task(self.session.next_batch,
+                          callback=lambda batch: self.batch_ready(run, batch))
+
+    def batch_ready(self, run, batch):
+        if run != self.run:
+            return
+        self.fetching = False
+        if not self.training_flag:
+            self.session.release([vocab_id for vocab_id, _, _ in batch])
+            return
+        self.next_words = batch
+        if self.audio is not None:
+            # generated in the background, so the popup's audio plays at once;
+            # later pages are fetched as the popup reaches them
+            self.audio.prefetch([word for _, word, _ in batch[:PAGE_SIZE]])
+        if self.popup_due and not self.clock.paused:
+            self.show_popup()
 
     def show_popup(self):
-        self.num_display = int(self.settings['number_of_words'])
-        remaining = len(self.vocab_shuffle) - self.curr_index
-        if self.num_display == 0:
-            self.words_to_send = self.vocab_shuffle
-            self.curr_index = 0
-        elif self.num_display > remaining:
-            self.words_to_send = self.vocab_shuffle[self.curr_index:]
-            random.shuffle(self.vocab_shuffle)
-            additional_words = self.num_display - remaining
-            self.words_to_send.extend(self.vocab_shuffle[:additional_words])
-            self.curr_index = additional_words
-        else:
-            self.words_to_send = self.vocab_shuffle[self.curr_index:self.curr_index+self.num_display]
-            self.curr_index += self.num_display
-        TestPopup(self.window, self.app, self.settings,
-                  self.set_title, self.words_to_send, self)
-        self.schedule_next_popup()
+        if self.next_words is None:
+            # shown as soon as the batch arrives
+            self.popup_due = True
+            self.request_batch()
+            return
+        self.popup_due = False
+        words, self.next_words = self.next_words, None
+        if words:
+            with metrics.timer("ui.popup.create"):
+                if self.popup is None:
+                    self.popup = TestPopup(self.window, self)
+                self.popup.add_words(self.set_title, words)
+
+    def release_words(self, vocab_ids):
+        # The popup was closed without checking; its words can be shown again
+        if self.session is not None:
+            self.session.release(vocab_ids)
 
     def start_training(self):
         if self.training_flag:
             messagebox.showwarning(
                 "Warning", "Training is already in progress.")
             return
-        index = self.vocab_set_listbox.curselection()
-        if not index:
+        indices = self.vocab_set_listbox.curselection()
+        if not indices:
             messagebox.showwarning(
                 "Warning", "Please select a vocab set.")
             return
-        self.set_title = self.vocab_set_listbox.get(index)
+        # check the numbers before anything is saved or training starts
+        try:
+            interval = int(self.entry_dict["interval"].get())
+            number_of_words = int(self.entry_dict["number_of_words"].get())
+            wrong_days = float(self.entry_dict["wrong_in_last_days"].get() or 0)
+        except ValueError:
+            messagebox.showwarning(
+                "Warning", "Interval and number of words must be whole numbers "
+                           "and wrong in last days a number.")
+            return
+        if interval < 1 or number_of_words < 0 or wrong_days < 0:
+            messagebox.showwarning(
+                "Warning", "Interval must be at least 1; number of words and "
+                           "wrong in last days cannot be negative.")
+            return
+        set_names = [self.vocab_set_listbox.get(index) for index in indices]
+        self.set_title = ", ".join(set_names)
         self.window.title(f'Training - {self.set_title}')
         self.training_flag = True
         self.save_settings()
-        self.curr_vocab_list = self.app.get_vocab_list_by_name(self.set_title)
-        self.vocab_shuffle = list(self.curr_vocab_list.items())
-        random.shuffle(self.vocab_shuffle)
-        self.curr_index = 0
-        self.show_popup()
+        fuzzy = str(self.settings["fuzzy_grading"]).strip().lower() not in ("0", "false", "no", "")
+        order = str(self.settings["word_order"]).strip().lower()
+        if order not in TrainingSession.ORDERS:
+            order = "due"
+        set_ids = self.set_ids = [self.app.vocab_sets[name][0] for name in set_names]
+        tags = [tag.strip() for tag in str(self.settings["tags"]).split(",") if tag.strip()]
+        set_id, query = session_source(set_ids, tags, wrong_days, self.profile_id)
+        profile_id = self.profile_id
+        if self.popup is not None:
+            # words left from the last run belong to its session
+            self.popup.close()
+        self.run += 1
+        run = self.run
+        self.session = None
+        self.session_correct = self.session_total = 0
+        pronunciation = str(self.settings["pronunciation"]).strip().lower() not in ("0", "false", "no", "")
+        voice = str(self.settings["voice"]).strip()
+        if self.audio is not None and (not pronunciation or self.audio.voice != voice):
+            self.audio.close()
+            self.audio = None
+        if pronunciation and self.audio is None:
+            # reading the cache directory happens off the Tk thread
+            self.submit_task(lambda: audio.AudioCache(voice=voice),
+                             callback=lambda cache: self.audio_ready(run, cache))
+        self.clock.start()
+        self.pause_button.config(text="Pause")
+        self.schedule_popups()
+        self.fetching = False
+        self.popup_due = True
+        # a shuffled session reads the whole set's ids, so it is made off the Tk thread
+        self.submit_task(
+            lambda: TrainingSession(set_id, number_of_words, review_log=self.review_log,
+                                    grader=Grader(GradingOptions(fuzzy=fuzzy)), order=order,
+                                    query=query, profile_id=profile_id),
+            callback=lambda session: self.session_ready(run, session))
         self.start_stats()
 
+    def audio_ready(self, run, cache):
+        if run != self.run or not self.training_flag or not cache.available:
+            cache.close()
+            return
+        self.audio = cache
+        if self.next_words:
+            self.audio.prefetch([word for _, word, _ in self.next_words[:PAGE_SIZE]])
+
+    def session_ready(self, run, session):
+        if run != self.run or not self.training_flag:
+            return
+        self.session = session
+        self.request_batch()
+
     def start_stats(self):
         stats_label = tk.Label(self.window, text="Stats", font=("Arial", 24))
         stats_label.grid(row=0, column=3)
@@ -656,118 +1016,318 @@ class StartTrainingWindow:
         self.time_label = tk.Label(
             timer_frame, text="00:00:00", font=("Arial", 24))
         self.time_label.grid(row=0, column=1)
-        self.update_timer()
-
-    def display_results(self, answer_entry_dict):
-        correct = 0
-        total = 0
-        incorrect_dict = {}
-        for word in answer_entry_dict:
-            if answer_entry_dict[word].get() != self.curr_vocab_list[word]:
-                incorrect_dict[word] = answer_entry_dict[word].get()
-            else:
-                correct += 1
-            total += 1
-        self.numcorrect_label = tk.Label(
-            self.window, text=f"Number correct: {correct} / {total}", font=("Arial", 24))
+        active_label = tk.Label(timer_frame, text="Answering:")
+        active_label.grid(row=1, column=0)
+        self.active_label = tk.Label(timer_frame, text="00:00:00")
+        self.active_label.grid(row=1, column=1)
+        if self.dashboard_label is None:
+            self.dashboard_label = tk.Label(self.window, text="", justify=tk.LEFT)
+            self.dashboard_label.grid(row=3, column=3, sticky='w')
+        self.refresh_dashboard()
+        if metrics.enabled:
+            self.create_metrics_panel()
+        self.start_ticking()
+
+    def refresh_dashboard(self):
+        # the totals are a few rows kept up to date by the database, so this
+        # costs the same however long the history is; the flush makes sure the
+        # answers just checked are counted
+        profile_id, set_ids, review_log = self.profile_id, self.set_ids, self.review_log
+
+        def load():
+            review_log.flush()
+            totals = stats.summary(profile_id, set_ids)
+            lines = stats.summary_lines(totals)
+            for entry in totals["sets"]:
+                lines += stats.weakest_lines(
+                    entry["name"], stats.weakest_words(entry["set_id"], profile_id, limit=3))
+            return lines
+        self.submit_task(load, callback=self.show_dashboard)
+
+    def show_dashboard(self, lines):
+        self.dashboard_label.config(text="\n".join(lines))
+
+    def create_metrics_panel(self):
+        # shown only when the app runs with VOCAB_METRICS set
+        metrics_frame = tk.Frame(self.window)
+        metrics_frame.grid(row=0, column=4, rowspan=3, sticky='n')
+        tk.Label(metrics_frame, text="Metrics", font=("Arial", 24)).grid(row=0, column=0)
+        self.metrics_label = tk.Label(metrics_frame, text="", justify=tk.LEFT, font=("Courier", 9))
+        self.metrics_label.grid(row=1, column=0, sticky='w')
+        dump_button = tk.Button(metrics_frame, text="Dump Metrics", command=self.dump_metrics)
+        dump_button.grid(row=2, column=0)
+
+    def update_metrics_panel(self):
+        lines = metrics.summary()
+        lines.append(", ".join(f"{name}: {n}" for name, n in sorted(metrics.counters.items())))
+        self.metrics_label.config(text="\n".join(lines))
+
+    def dump_metrics(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="Dump Metrics", defaultextension=".json",
+            filetypes=[("JSON", "*.json")])
+        if path:
+            self.submit_task(metrics.dump, path)
+
+    def display_results(self, answers):
+        # grading and recording the answers happen on a worker thread
+        checked_at = time.perf_counter()
+        self.submit_task(
+            self.session.submit, answers,
+            callback=lambda results: self.show_results(results, checked_at))
+
+    def show_results(self, results, checked_at):
+        with metrics.timer("ui.popup.results"):
+            self.update_results(results)
+        self.refresh_dashboard()
+        if metrics.enabled:
+            # from pressing Check to the results being on screen
+            metrics.record("ui.popup.check", time.perf_counter() - checked_at)
+
+    def update_results(self, results):
+        correct = sum(1 for result in results if result[4])
+        total = len(results)
+        self.session_correct += correct
+        self.session_total += total
+        incorrect_rows = [(word, definition, answer)
+                          for _, word, definition, answer, is_correct in results if not is_correct]
+        history_rows = [(word, definition, answer, 'Correct' if is_correct else 'Incorrect')
+                        for _, word, definition, answer, is_correct in results]
+
+        if self.history_view is None:
+            self.create_results_views()
+        self.numcorrect_label.config(
+            text=f"Number correct: {correct} / {total} "
+                 f"(session: {self.session_correct} / {self.session_total})")
+        self.incorrect_rows.rows = incorrect_rows
+        self.last_answer_view.first = 0
+        self.last_answer_view.refresh()
+        # the history keeps every answer of the window, newest at the bottom;
+        # the view only ever draws one screenful of it
+        self.history_rows.rows.extend(history_rows)
+        self.history_view.scroll_to_end()
+
+    def create_results_views(self):
+        self.numcorrect_label = tk.Label(self.window, text="", font=("Arial", 24))
         self.numcorrect_label.grid(row=2, column=3)
         incorrect_words_label = tk.Label(
             self.window, text=f"Incorrect Words", font=("Arial", 24))
         incorrect_words_label.grid(row=4, column=3)
 
         # treeview displaying what words that user got wrong with 3 columns: vocab, definition, and user's answer
-        self.last_answer_treeview = ttk.Treeview(self.window, columns=(
-            'vocab', 'definition', 'answer'), show='headings')
-        self.last_answer_treeview.grid(row=5, column=3)
-        for word in incorrect_dict:
-            self.last_answer_treeview.insert('', 'end', values=(
-                word, self.curr_vocab_list[word], incorrect_dict[word]))
-        self.last_answer_treeview.column('vocab', width=100, anchor='center')
-        self.last_answer_treeview.heading('vocab', text='Vocab')
-        self.last_answer_treeview.heading('definition', text='Definition')
-        self.last_answer_treeview.heading('answer', text='Your Answer')
-
-
+        self.incorrect_rows = ListRows()
+        self.last_answer_view = VirtualTreeview(
+            self.window, columns=('vocab', 'definition', 'answer'),
+            fetch_rows=self.incorrect_rows.fetch, count_rows=self.incorrect_rows.count)
+        self.last_answer_view.grid(row=5, column=3)
+        self.last_answer_view.column('vocab', width=100, anchor='center')
+        self.last_answer_view.heading('vocab', text='Vocab')
+        self.last_answer_view.heading('definition', text='Definition')
+        self.last_answer_view.heading('answer', text='Your Answer')
 
         # display entire history of words with 4 columns: vocab, definition, user's answer, and whether it was correct or not
         history_label = tk.Label(self.window, text=f"History", font=("Arial", 24))
         history_label.grid(row=6, column=3)
-        self.history_treeview = ttk.Treeview(self.window, columns=(
-            'vocab', 'definition', 'answer', 'correct'), show='headings')
-        self.history_treeview.grid(row=7, column=3)
-        for word in answer_entry_dict:
-            if word in incorrect_dict:
-                self.history_treeview.insert('', 'end', values=(
-                    word, self.curr_vocab_list[word], incorrect_dict[word], 'Incorrect'))
-            else:
-                self.history_treeview.insert('', 'end', values=(
-                    word, self.curr_vocab_list[word], self.curr_vocab_list[word], 'Correct'))
-        self.history_treeview.column('vocab', width=100, anchor='center')
-        self.history_treeview.heading('vocab', text='Vocab')
-        self.history_treeview.heading('definition', text='Definition')
-        self.history_treeview.heading('answer', text='Your Answer')
-        self.history_treeview.heading('correct', text='Correct?')
-
-        history_scrollbar = tk.Scrollbar(self.window, orient="vertical", command=self.history_treeview.yview)
-        history_scrollbar.grid(row=7, column=4, sticky="ns")
-        self.history_treeview.configure(yscrollcommand=history_scrollbar.set)
-
-
-    
-
+        self.history_rows = ListRows()
+        self.history_view = VirtualTreeview(
+            self.window, columns=('vocab', 'definition', 'answer', 'correct'),
+            fetch_rows=self.history_rows.fetch, count_rows=self.history_rows.count)
+        self.history_view.grid(row=7, column=3)
+        self.history_view.column('vocab', width=100, anchor='center')
+        self.history_view.heading('vocab', text='Vocab')
+        self.history_view.heading('definition', text='Definition')
+        self.history_view.heading('answer', text='Your Answer')
+        self.history_view.heading('correct', text='Correct?')
+
+    def start_ticking(self):
+        # on whole seconds of session time, so the label never skips or
+        # repeats a second and shares its wake-up with popups that are due
+        self.timers.cancel(self.tick_timer)
+        self.tick_timer = self.timers.every(1, self.update_timer,
+                                            first=1 - self.clock.now() % 1)
+        self.update_timer()
 
+    def window_mapped(self, event):
+        if event.widget is self.window and self.training_flag and self.tick_timer is None:
+            self.start_ticking()
 
+    def window_unmapped(self, event):
+        # minimized, the session only wakes up for its popups
+        if event.widget is self.window:
+            self.timers.cancel(self.tick_timer)
+            self.tick_timer = None
 
     def update_timer(self):
+        self.time_label.config(text=format_duration(self.clock.elapsed()))
+        self.active_label.config(text=format_duration(self.clock.active()))
+        if metrics.enabled:
+            self.update_metrics_panel()
+
+    def toggle_pause(self):
+        # nothing is rescheduled: session time just stops until resumed
         if not self.training_flag:
             return
-
-        current_time_str = self.time_label.cget("text")
-        hours, minutes, seconds = map(int, current_time_str.split(':'))
-        current_time = hours * 3600 + minutes * 60 + seconds
-
-        current_time += 1
-        new_time_str = f"{current_time // 3600:02d}:{(current_time % 3600) // 60:02d}:{current_time % 60:02d}"
-        self.time_label.config(text=new_time_str)
-        self.time_after_id = self.window.after(1000, self.update_timer)
+        if self.clock.paused:
+            self.timers.resume()
+            self.pause_button.config(text="Pause")
+            if self.popup_due and self.next_words is not None:
+                # the batch arrived while paused
+                self.show_popup()
+        else:
+            self.timers.pause()
+            self.pause_button.config(text="Resume")
+        self.update_timer()
 
     def stop_training(self):
-        if self.after_id is not None:
-            self.window.after_cancel(self.after_id)
-            self.after_id = None
+        self.timers.clear()
+        self.timers.pause()
+        self.popup_timer = self.prefetch_timer = self.tick_timer = None
+        if self.training_flag and self.time_label is not None:
+            self.update_timer()
+        if self.next_words:
+            self.session.release([vocab_id for vocab_id, _, _ in self.next_words])
+        self.next_words = None
+        self.popup_due = False
         self.training_flag = False
+        self.pause_button.config(text="Pause")
         self.window.title("Training")
 
 
 class TestPopup:
-    def __init__(self, parent, app, settings, set_title, words, start_training_window):
+    # One quiz window per training window. Batches queue up in it and are
+    # shown PAGE_SIZE words at a time on the same rows of widgets, so showing
+    # a page costs the same however many words are waiting; each page is
+    # graded when it is checked.
+    def __init__(self, parent, start_training_window):
         self.window = tk.Toplevel(parent)
-        self.window.title(F'Test Popup - {set_title}')
-        self.settings = settings
-        self.set_title = set_title
-        self.parent = parent
-        self.app = app
-        self.vocab_list = words
+        self.window.withdraw()
         self.start_training_window = start_training_window
-
-        self.answer_entry_dict = {}
-        for r, (vocab, definition) in enumerate(self.vocab_list):
-            word_label = tk.Label(self.window, text=vocab)
-            word_label.grid(row=r, column=0)
-            word_entry = tk.Entry(self.window)
-            word_entry.grid(row=r, column=1)
-            self.answer_entry_dict[vocab] = word_entry
+        # words in the format [(vocab_id, word, definition)]; the page shown
+        # starts at first
+        self.words = []
+        self.first = 0
+        self.page = []
+        self.page_number = 1
+        # [(word label, answer entry, play button)], made as pages need them
+        self.rows = []
+        self.shown = False
 
         self.check_button = tk.Button(
             self.window, text="Check", command=self.check_answer)
-        self.check_button.grid(row=r+1, column=0)
+        self.check_button.grid(row=PAGE_SIZE, column=0)
+        self.page_label = tk.Label(self.window, text="")
+        self.page_label.grid(row=PAGE_SIZE, column=1)
+        self.window.bind("<Return>", lambda event: self.check_answer())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def add_words(self, set_title, words):
+        self.words.extend(words)
+        if self.shown:
+            # answered once the pages before them are
+            self.update_page_label()
+            return
+        self.window.title(F'Test Popup - {set_title}')
+        self.show_page()
+        self.window.deiconify()
+        self.shown = True
+        # active study time runs while the popup is open
+        self.start_training_window.clock.begin_active()
+
+    def row(self, r):
+        while len(self.rows) <= r:
+            i = len(self.rows)
+            word_label = tk.Label(self.window)
+            word_label.grid(row=i, column=0)
+            word_entry = tk.Entry(self.window)
+            word_entry.grid(row=i, column=1)
+            play_button = tk.Button(self.window, text="Play", command=lambda i=i: self.play(i))
+            play_button.grid(row=i, column=2)
+            self.rows.append((word_label, word_entry, play_button))
+        return self.rows[r]
+
+    def show_page(self):
+        self.page = self.words[self.first:self.first + PAGE_SIZE]
+        audio_cache = self.start_training_window.audio
+        for r, (_, vocab, definition) in enumerate(self.page):
+            word_label, word_entry, play_button = self.row(r)
+            word_label.config(text=vocab)
+            word_label.grid()
+            word_entry.delete(0, tk.END)
+            word_entry.grid()
+            if audio_cache is not None:
+                play_button.grid()
+            else:
+                play_button.grid_remove()
+        for row in self.rows[len(self.page):]:
+            for widget in row:
+                widget.grid_remove()
+        if self.page:
+            self.rows[0][1].focus_set()
+        if audio_cache is not None:
+            following = self.first + PAGE_SIZE
+            audio_cache.prefetch([vocab for _, vocab, _ in self.words[following:following + PAGE_SIZE]])
+        self.update_page_label()
+
+    def update_page_label(self):
+        remaining = len(self.words) - self.first
+        pages = self.page_number - 1 + -(-remaining // PAGE_SIZE)
+        self.page_label.config(text=f"Page {self.page_number} of {pages} ({remaining} words left)")
+
+    def play(self, r):
+        # usually prefetched already; otherwise it plays once it is generated
+        audio_cache = self.start_training_window.audio
+        if audio_cache is None or r >= len(self.page):
+            return
+        word = self.page[r][1]
+        path = audio_cache.clip(word)
+        if path is not None:
+            audio.play(path)
+        else:
+            audio_cache.request(word, callback=lambda path: path and audio.play(path))
 
     def check_answer(self):
-        self.start_training_window.display_results(self.answer_entry_dict)
-        self.window.destroy()
+        if not self.page:
+            return
+        self.start_training_window.display_results(
+            {vocab_id: word_entry.get()
+             for (vocab_id, _, _), (_, word_entry, _) in zip(self.page, self.rows)})
+        self.first += len(self.page)
+        self.page_number += 1
+        if self.first >= len(self.words):
+            self.hide()
+            return
+        if self.first > len(self.words) // 2:
+            # drop the answered words once they are the larger part
+            del self.words[:self.first]
+            self.first = 0
+        self.show_page()
+
+    def hide(self):
+        self.words = []
+        self.first = 0
+        self.page = []
+        self.page_number = 1
+        self.window.withdraw()
+        if self.shown:
+            self.shown = False
+            self.start_training_window.clock.end_active()
+
+    def close(self):
+        # closed without checking; the words not answered yet can be shown again
+        self.start_training_window.release_words(
+            [vocab_id for vocab_id, _, _ in self.words[self.first:]])
+        self.hide()
 
 
 if __name__ == "__main__":
+    Database.open()
+    # settings used to live in a settings.json next to the database
+    profiles.import_settings_file(
+        os.path.join(os.path.dirname(Database.manager().db_path), 'settings.json'))
     root = tk.Tk()
     app = App(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        profiles.SettingsStore.flush_all()
+        Database.close()
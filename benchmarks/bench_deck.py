@@ -0,0 +1,92 @@
+"""Compare the memory and time of an id-only Deck with a list of (word, definition) pairs.
+
+    python benchmarks/bench_deck.py [--words 1000000] [--batch 10]
+
+Builds a one-set database, then for each representation measures the memory
+it holds (tracemalloc), the time to load it, to reshuffle it, and to take a
+popup batch including the word and definition text.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.deck import Deck  # noqa: E402
+
+
+def build_db(path, words, rng):
+    Database.open(path)
+    with Database.transaction() as conn:
+        set_id = conn.execute("INSERT INTO vocab_sets (name) VALUES ('bench')").lastrowid
+        conn.executemany(
+            "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+            ((set_id, f"{''.join(rng.choices(string.ascii_lowercase, k=8))}{i}",
+              " ".join("".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(3)))
+             for i in range(words)))
+    return set_id
+
+
+def load_pairs(set_id):
+    # What the training window used to hold: every pair of the set in memory
+    c = Database.get_connection().execute(
+        "SELECT word, definition FROM vocab WHERE set_id=? ORDER BY vocab_id", (set_id,))
+    pairs = list(dict(c.fetchall()).items())
+    c.close()
+    return pairs
+
+
+def measure(label, load, shuffle, batch):
+    tracemalloc.start()
+    start = time.perf_counter()
+    deck = load()
+    load_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    shuffle(deck)
+    shuffle_time = time.perf_counter() - start
+    times = []
+    for _ in range(100):
+        start = time.perf_counter()
+        batch(deck)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"{label:<8}{memory / 2**20:>10.1f}{load_time:>9.2f}{shuffle_time:>12.2f}"
+          f"{times[50] * 1e6:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        set_id = build_db(os.path.join(tmp, "deck.db"), args.words, rng)
+        print(f"{'deck':<8}{'MB held':>10}{'load s':>9}{'shuffle s':>12}{'batch us':>11}")
+
+        position = {"at": 0}
+
+        def pair_batch(pairs):
+            # the old loop copied a slice of the pair list for every popup
+            at = position["at"]
+            position["at"] = (at + args.batch) % len(pairs)
+            return pairs[at:at + args.batch]
+
+        measure("pairs", lambda: load_pairs(set_id), rng.shuffle, pair_batch)
+        measure("ids", lambda: Deck(set_id, rng), Deck.shuffle,
+                lambda deck: deck.next_batch(args.batch))
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Time grading a popup's worth of answers.
+
+    python benchmarks/bench_grading.py [--words 500]
+
+Grades --words answers (a mix of exact, reordered, misspelled and wrong) with
+exact and fuzzy options and reports microseconds per answer, both for the
+first grade of each definition (which prepares it) and for later grades that
+reuse the cached preparation.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.grading import Grader, GradingOptions  # noqa: E402
+
+
+def make_answers(rng, words):
+    rows = []
+    for vocab_id in range(words):
+        tokens = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+                  for _ in range(rng.randint(1, 4))]
+        definition = " ".join(tokens)
+        kind = vocab_id % 4
+        if kind == 0:
+            answer = definition.upper()
+        elif kind == 1:
+            answer = " ".join(reversed(tokens))
+        elif kind == 2:
+            i = rng.randrange(len(definition))
+            answer = definition[:i] + definition[i + 1:]
+        else:
+            answer = "something else entirely"
+        rows.append((vocab_id, answer, definition))
+    return rows
+
+
+def time_grading(grader, rows):
+    start = time.perf_counter()
+    correct = sum(grader.grade(vocab_id, answer, definition)
+                  for vocab_id, answer, definition in rows)
+    return (time.perf_counter() - start) / len(rows), correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = make_answers(random.Random(args.seed), args.words)
+    print(f"{'options':<8}{'first us':>10}{'cached us':>11}{'correct':>9}")
+    for label, options in (("exact", GradingOptions(fuzzy=False)),
+                           ("fuzzy", GradingOptions(fuzzy=True))):
+        grader = Grader(options)
+        first, _ = time_grading(grader, rows)
+        cached, correct = time_grading(grader, rows)
+        print(f"{label:<8}{first * 1e6:>10.1f}{cached * 1e6:>11.1f}{correct:>6}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Measure bulk import throughput in rows per second.
+
+    python benchmarks/bench_import.py [--rows 200000] [--chunk-sizes 1000 5000 20000]
+
+Writes a CSV deck of --rows words and imports it into a fresh database once
+per chunk size.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.importer import import_file  # noqa: E402
+
+
+def write_deck(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("word", "definition"))
+        writer.writerows((f"word {i}", f"definition of word {i}, with a comma")
+                         for i in range(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+",
+                        default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    print(f"{'chunk size':>10} {'rows':>9} {'seconds':>8} {'rows/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = os.path.join(tmp, "deck.csv")
+        write_deck(deck, args.rows)
+        for chunk_size in args.chunk_sizes:
+            Database.open(os.path.join(tmp, f"import_{chunk_size}.db"))
+            start = time.perf_counter()
+            count = import_file(deck, "bench", chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            Database.close()
+            print(f"{chunk_size:>10} {count:>9} {elapsed:>8.2f} {count / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
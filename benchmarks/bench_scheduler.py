@@ -0,0 +1,130 @@
+"""Simulate a learner to compare the spaced-repetition scheduler with a uniform shuffle.
+
+    python benchmarks/bench_scheduler.py [--words 300] [--days 60] [--reviews-per-day 200]
+
+The simulated learner forgets each word along an exponential curve whose
+stability grows with every correct answer. Each day the learner answers a
+fixed number of words in popups of --batch words. Retention is the mean recall
+probability over all words at the end of a day; the report shows how many
+reviews each strategy needed to reach each retention target, plus the time
+taken to pick a batch.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.scheduler import DAY, QUALITY_CORRECT, QUALITY_INCORRECT, Scheduler  # noqa: E402
+
+TARGETS = (0.5, 0.7, 0.8, 0.9)
+
+
+class Learner:
+    def __init__(self, vocab_ids, seed):
+        self.random = random.Random(seed)
+        self.stability = {vocab_id: 0.0 for vocab_id in vocab_ids}
+        self.last_seen = {}
+
+    def recall_probability(self, vocab_id, now):
+        if vocab_id not in self.last_seen:
+            return 0.0
+        elapsed = (now - self.last_seen[vocab_id]) / DAY
+        return math.exp(-elapsed / self.stability[vocab_id])
+
+    def answer(self, vocab_id, now):
+        correct = self.random.random() < self.recall_probability(vocab_id, now)
+        if correct:
+            self.stability[vocab_id] *= 3
+        else:
+            self.stability[vocab_id] = max(1.0, self.stability[vocab_id] * 0.5)
+        self.last_seen[vocab_id] = now
+        return correct
+
+    def retention(self, now):
+        return sum(self.recall_probability(v, now)
+                   for v in self.stability) / len(self.stability)
+
+
+def build_db(path, num_words):
+    Database.open(path)
+    with Database.transaction() as conn:
+        set_id = conn.execute(
+            "INSERT INTO vocab_sets (name) VALUES ('simulation')").lastrowid
+        conn.executemany(
+            "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+            ((set_id, f"word {i}", f"definition {i}") for i in range(num_words)))
+    vocab_ids = [row[0] for row in Database.get_connection().execute(
+        "SELECT vocab_id FROM vocab WHERE set_id = ?", (set_id,))]
+    return set_id, vocab_ids
+
+
+def run(strategy, args, tmp):
+    set_id, vocab_ids = build_db(
+        os.path.join(tmp, f"{strategy}.db"), args.words)
+    learner = Learner(vocab_ids, args.seed)
+    clock = {"now": 0.0}
+    scheduler = Scheduler(set_id, clock=lambda: clock["now"])
+    shuffled = []
+    pick_times = []
+    reached = {}
+    reviews = 0
+
+    popups_per_day = args.reviews_per_day // args.batch
+    for day in range(args.days):
+        for popup in range(popups_per_day):
+            clock["now"] = day * DAY + popup * args.interval
+            start = time.perf_counter()
+            if strategy == "scheduler":
+                batch = [row[0] for row in scheduler.next_batch(args.batch)]
+            else:
+                batch = []
+                while len(batch) < args.batch:
+                    if not shuffled:
+                        shuffled = list(vocab_ids)
+                        learner.random.shuffle(shuffled)
+                    batch.append(shuffled.pop())
+            pick_times.append(time.perf_counter() - start)
+
+            answers = [(vocab_id, QUALITY_CORRECT if learner.answer(vocab_id, clock["now"])
+                        else QUALITY_INCORRECT) for vocab_id in batch]
+            if strategy == "scheduler":
+                scheduler.record(answers)
+            reviews += len(batch)
+
+        retention = learner.retention((day + 1) * DAY)
+        for target in TARGETS:
+            if retention >= target and target not in reached:
+                reached[target] = reviews
+    Database.close()
+    pick_times.sort()
+    return reached, retention, pick_times[len(pick_times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--reviews-per-day", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=300,
+                        help="seconds between popups")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    header = "".join(f"{f'{int(t * 100)}% after':>13}" for t in TARGETS)
+    print(f"{'strategy':<10}{header}{'final':>8}{'pick ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for strategy in ("scheduler", "shuffle"):
+            reached, retention, pick_time = run(strategy, args, tmp)
+            cells = "".join(f"{reached.get(t, '-'):>13}" for t in TARGETS)
+            print(f"{strategy:<10}{cells}{retention:>8.2f}{pick_time * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time full-text search latency over a large vocab table.
+
+    python benchmarks/bench_search.py [--rows 1000000] [--queries 200]
+
+Builds a database of random words, indexes it through the migrations, then
+runs prefix and whole-word searches across all sets and within one set.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.search import search_vocab  # noqa: E402
+
+SET_SIZE = 5000
+
+
+def random_word(rng):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def build_db(path, rows, rng):
+    Database.open(path)
+    num_sets = max(1, rows // SET_SIZE)
+    words = []
+    with Database.transaction() as conn:
+        conn.executemany("INSERT INTO vocab_sets (set_id, name) VALUES (?, ?)",
+                         ((i, f"set {i}") for i in range(1, num_sets + 1)))
+        batch = []
+        for i in range(rows):
+            word = f"{random_word(rng)}{i}"
+            if i % 1000 == 0:
+                words.append(word)
+            batch.append((i % num_sets + 1, word,
+                          " ".join(random_word(rng) for _ in range(4))))
+            if len(batch) == 50_000:
+                conn.executemany(
+                    "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", batch)
+                batch = []
+        conn.executemany(
+            "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", batch)
+    return num_sets, words
+
+
+def time_queries(queries, set_id=None):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        search_vocab(query, set_id=set_id, limit=50)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        num_sets, words = build_db(os.path.join(tmp, "search.db"), args.rows, rng)
+        print(f"built and indexed {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        prefixes = [rng.choice(words)[:3] for _ in range(args.queries)]
+        whole = [rng.choice(words) for _ in range(args.queries)]
+        print(f"{'query':<28}{'p50 ms':>10}{'p99 ms':>10}")
+        for label, queries, set_id in (
+                ("3-letter prefix, all sets", prefixes, None),
+                ("3-letter prefix, one set", prefixes, num_sets // 2 + 1),
+                ("whole word, all sets", whole, None)):
+            p50, p99 = time_queries(queries, set_id)
+            print(f"{label:<28}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
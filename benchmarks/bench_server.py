@@ -0,0 +1,180 @@
+"""Load-test the HTTP API and report p50/p99 latency and requests per second.
+
+    python benchmarks/bench_server.py [--clients 32] [--duration 10] [--words 100000]
+    python benchmarks/bench_server.py --target 127.0.0.1:8765
+
+Without --target a server is started in-process on a synthetic database. Each
+client keeps one connection open and loops over a mix of set listing, set
+page reads, quiz batches and answer submissions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.server import APIServer, VocabAPI  # noqa: E402
+
+
+def build_db(path, num_words, num_sets):
+    Database.open(path)
+    with Database.transaction() as conn:
+        conn.executemany("INSERT INTO vocab_sets (set_id, name) VALUES (?, ?)",
+                         ((i, f"set {i}") for i in range(1, num_sets + 1)))
+        conn.executemany(
+            "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+            ((i % num_sets + 1, f"word {i}", f"definition {i}") for i in range(num_words)))
+
+
+def start_server(workers):
+    # Run the server's event loop on its own thread so it doesn't share a
+    # loop with the clients
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        server = APIServer(VocabAPI(), "127.0.0.1", 0, workers)
+        loop.run_until_complete(server.start())
+        state["server"] = server
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(server.close())
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["loop"].stop)
+        thread.join()
+    return state["server"].port, stop
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length))
+        return status, payload
+
+    def close(self):
+        self.writer.close()
+
+
+async def client_loop(host, port, set_ids, deadline, latencies, errors):
+    client = Client(host, port)
+    await client.connect()
+    rng = random.Random()
+    session_id = None
+
+    async def timed(method, path, body=None):
+        start = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append((status, payload))
+        return payload
+
+    try:
+        while time.perf_counter() < deadline:
+            choice = rng.random()
+            if choice < 0.2:
+                await timed("GET", "/sets")
+            elif choice < 0.6:
+                await timed("GET", f"/sets/{rng.choice(set_ids)}?offset={rng.randrange(500)}&limit=50")
+            else:
+                if session_id is None:
+                    session_id = (await timed("POST", "/sessions", {
+                        "set_id": rng.choice(set_ids), "number_of_words": 10}))["session_id"]
+                words = (await timed("GET", f"/sessions/{session_id}/batch"))["words"]
+                await timed("POST", f"/sessions/{session_id}/answers",
+                            {"answers": {word: "guess" for word in words}})
+    finally:
+        client.close()
+
+
+async def run_load(host, port, clients, duration):
+    probe = Client(host, port)
+    await probe.connect()
+    _, sets = await probe.request("GET", "/sets")
+    probe.close()
+    set_ids = [s["set_id"] for s in sets]
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(host, port, set_ids, start + duration, latencies, errors)
+                           for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="host:port of a running server")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--words", type=int, default=100_000)
+    parser.add_argument("--sets", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stop = None
+        if args.target:
+            host, port = args.target.rsplit(":", 1)
+            port = int(port)
+        else:
+            build_db(os.path.join(tmp, "bench.db"), args.words, args.sets)
+            host = "127.0.0.1"
+            port, stop = start_server(args.workers)
+        try:
+            latencies, errors, elapsed = asyncio.run(
+                run_load(host, port, args.clients, args.duration))
+        finally:
+            if stop is not None:
+                stop()
+                Database.close()
+
+    latencies.sort()
+    print(f"requests {len(latencies)}  errors {len(errors)}  "
+          f"rps {len(latencies) / elapsed:.0f}  "
+          f"p50 {percentile(latencies, 0.50) * 1000:.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+    if errors:
+        print("first error:", errors[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Time loading one vocab set as the total number of vocab rows grows.
+
+    python benchmarks/bench_set_load.py [--sizes 10000 100000 1000000]
+
+Each size is measured twice: on the original unindexed schema (user_version 0)
+and after running the migrations. With the indexes in place the load time for
+a fixed-size set should stay flat as the table grows.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core.database import ConnectionManager  # noqa: E402
+from vocab_core.migrations import migrate  # noqa: E402
+
+SET_SIZE = 1000
+
+
+def build_unindexed_db(path, total_rows):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE vocab_sets (
+            set_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT
+        );
+        CREATE TABLE vocab (
+            vocab_id INTEGER PRIMARY KEY,
+            set_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            definition TEXT NOT NULL,
+            FOREIGN KEY (set_id) REFERENCES vocab_sets(set_id) ON DELETE CASCADE
+        );
+    """)
+    num_sets = max(1, total_rows // SET_SIZE)
+    conn.executemany("INSERT INTO vocab_sets (set_id, name) VALUES (?, ?)",
+                     ((i, f"set {i}") for i in range(1, num_sets + 1)))
+    # interleave the sets so a set's rows are spread across the whole table
+    conn.executemany(
+        "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+        ((i % num_sets + 1, f"word {i}", f"definition of word {i}")
+         for i in range(total_rows)))
+    conn.commit()
+    conn.close()
+    return num_sets
+
+
+def time_set_load(conn, set_id, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dict(conn.execute(
+            "SELECT word, definition FROM vocab WHERE set_id=? ORDER BY vocab_id",
+            (set_id,)).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'total rows':>12} {'unindexed ms':>14} {'migrated ms':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"vocab_{size}.db")
+            num_sets = build_unindexed_db(path, size)
+            set_id = num_sets // 2 + 1
+
+            manager = ConnectionManager(path)
+            before = time_set_load(manager.connection(), set_id, args.repeat)
+            migrate(manager)
+            after = time_set_load(manager.connection(), set_id, args.repeat)
+            manager.close_all()
+
+            print(f"{size:>12} {before * 1000:>14.2f} {after * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
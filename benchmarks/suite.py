@@ -0,0 +1,299 @@
+"""Run the core operations against synthetic databases and record comparable timings.
+
+    python benchmarks/suite.py [--sizes 1000 10000 100000 1000000] [--output results.json]
+    python benchmarks/suite.py --output new.json --compare old.json [--threshold 1.25]
+
+For each size a database of that many words is generated from --seed through
+the migrations (so it matches schema.sql), split into sets of --set-size
+words. Each benchmark runs --repeat times after one warm-up run and reports
+min/p50/p90/mean milliseconds. Generated databases are kept in --cache-dir
+and copied before each size, so runs are repeatable and start from the same
+data. Results are JSON with the commit, Python and SQLite versions; with
+--compare the p50s are set against an earlier results file, and the exit
+status is 1 if any got slower than --threshold times.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocab_core import sets, stats  # noqa: E402
+from vocab_core.cache import set_cache  # noqa: E402
+from vocab_core.database import Database  # noqa: E402
+from vocab_core.deck import Deck  # noqa: E402
+from vocab_core.deckquery import DeckQuery  # noqa: E402
+from vocab_core.exporter import export_vocab  # noqa: E402
+from vocab_core.grading import Grader  # noqa: E402
+from vocab_core.importer import import_file  # noqa: E402
+from vocab_core.migrations import latest_version  # noqa: E402
+from vocab_core.paging import VocabPages  # noqa: E402
+from vocab_core.scheduler import Scheduler  # noqa: E402
+from vocab_core.search import search_vocab  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSERT_BATCH = 50_000
+
+
+def random_text(rng, words, low=3, high=9):
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+                    for _ in range(words))
+
+
+def generate_db(path, size, set_size, seed):
+    rng = random.Random(seed)
+    Database.open(path)
+    num_sets = max(1, -(-size // set_size))
+    with Database.transaction() as conn:
+        conn.executemany("INSERT INTO vocab_sets (set_id, name, description) VALUES (?, ?, ?)",
+                         ((i, f"set {i}", random_text(rng, 4)) for i in range(1, num_sets + 1)))
+        batch = []
+        for i in range(size):
+            batch.append((i // set_size + 1, f"{random_text(rng, 1)}{i}",
+                          random_text(rng, rng.randint(1, 4))))
+            if len(batch) == INSERT_BATCH:
+                conn.executemany(
+                    "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)", batch)
+    Database.close()
+
+
+def cached_db(cache_dir, size, set_size, seed):
+    # named by schema version too, so a new migration gets a fresh database
+    path = os.path.join(cache_dir, f"synthetic-v{latest_version()}-{size}-{set_size}-{seed}.db")
+    if not os.path.exists(path):
+        partial = path + ".partial"
+        for leftover in (partial, partial + "-wal", partial + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        generate_db(partial, size, set_size, seed)
+        os.replace(partial, path)
+    return path
+
+
+class Benchmarks:
+    """The operations timed for one database; each bench_* method returns a
+    callable that runs the operation once."""
+
+    def __init__(self, work_dir, set_size, seed):
+        self.work_dir = work_dir
+        self.rng = random.Random(seed)
+        conn = Database.get_connection()
+        self.set_ids = [set_id for set_id, in conn.execute(
+            "SELECT set_id FROM vocab_sets ORDER BY set_id")]
+        # a set in the middle, so it is neither first nor last in the table
+        self.set_id = self.set_ids[len(self.set_ids) // 2]
+        self.words = [word for word, in conn.execute(
+            "SELECT word FROM vocab WHERE set_id=? LIMIT 100", (self.set_id,))]
+        self.set_size = set_size
+
+    def bench_list_sets(self):
+        def run():
+            set_cache.invalidate()
+            sets.list_sets()
+        return run
+
+    def bench_load_set(self):
+        def run():
+            set_cache.invalidate()
+            sets.get_vocab_list(self.set_id)
+        return run
+
+    def bench_dashboard(self):
+        # what the training window shows after each popup
+        return lambda: stats.summary(set_ids=[self.set_id])
+
+    def bench_editor_page(self):
+        # what the editor does on opening: count the set and fetch the first page
+        def run():
+            pages = VocabPages(self.set_id)
+            pages.rows(0, 20)
+        return run
+
+    def bench_editor_save(self):
+        state = {"run": 0, "inserted": []}
+        conn = Database.get_connection()
+
+        def run():
+            n = state["run"] = state["run"] + 1
+            updated = conn.execute(
+                "SELECT vocab_id, word FROM vocab WHERE set_id=? LIMIT 10", (self.set_id,)).fetchall()
+            sets.save_set_changes(
+                self.set_id,
+                inserted=[(f"bench-{n}-{i}", "new definition") for i in range(10)],
+                updated=[(vocab_id, word, f"edited {n}") for vocab_id, word in updated],
+                deleted=state["inserted"])
+            state["inserted"] = [vocab_id for vocab_id, in conn.execute(
+                "SELECT vocab_id FROM vocab WHERE set_id=? AND word LIKE ?",
+                (self.set_id, f"bench-{n}-%"))]
+        return run
+
+    def bench_batch_due(self):
+        scheduler = Scheduler(self.set_id)
+        return lambda: scheduler.next_batch(10)
+
+    def bench_batch_multi_set(self):
+        query = DeckQuery(set_ids=self.set_ids[:5])
+        return lambda: query.next_batch(10)
+
+    def bench_batch_shuffled(self):
+        deck = Deck(self.set_id, self.rng)
+        return lambda: deck.next_batch(10)
+
+    def bench_grade_500(self):
+        rows = Database.get_connection().execute(
+            "SELECT vocab_id, definition FROM vocab WHERE set_id=? LIMIT 500",
+            (self.set_id,)).fetchall()
+        answers = [(vocab_id, definition[:-1] if i % 2 else definition, definition)
+                   for i, (vocab_id, definition) in enumerate(rows)]
+
+        def run():
+            grader = Grader()
+            for vocab_id, answer, definition in answers:
+                grader.grade(vocab_id, answer, definition)
+        return run
+
+    def bench_search(self):
+        prefixes = [word[:3] for word in self.words]
+        state = {"i": 0}
+
+        def run():
+            state["i"] += 1
+            search_vocab(prefixes[state["i"] % len(prefixes)], limit=50)
+        return run
+
+    def bench_import_1k(self):
+        path = os.path.join(self.work_dir, "import.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(1000):
+                f.write(f"import{i},{random_text(self.rng, 3)}\n")
+        state = {"run": 0}
+
+        def run():
+            state["run"] += 1
+            import_file(path, f"imported {state['run']}")
+        return run
+
+    def bench_export_set(self):
+        path = os.path.join(self.work_dir, "export.csv")
+        name = f"set {self.set_id}"
+        return lambda: export_vocab(path, name)
+
+
+def time_benchmark(run, repeat):
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "runs": repeat,
+        "min_ms": times[0],
+        "p50_ms": times[len(times) // 2],
+        "p90_ms": times[min(len(times) - 1, int(len(times) * 0.9))],
+        "mean_ms": statistics.fmean(times),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # prints p50 ratios against baseline; returns the number of regressions
+    old = {(r["size"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n{'size':>8} {'benchmark':<20}{'old p50':>10}{'new p50':>10}{'ratio':>8}")
+    for result in results["results"]:
+        before = old.get((result["size"], result["benchmark"]))
+        if before is None:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  slower"
+        print(f"{result['size']:>8} {result['benchmark']:<20}{before['p50_ms']:>10.2f}"
+              f"{result['p50_ms']:>10.2f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--set-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", metavar="BENCHMARK",
+                        help="run only these benchmarks, e.g. list_sets grade_500")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "vocab-bench"))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    names = sorted(name[len("bench_"):] for name in dir(Benchmarks) if name.startswith("bench_"))
+    if args.only:
+        unknown = set(args.only) - set(names)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        names = [name for name in names if name in args.only]
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "set_size": args.set_size,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    print(f"{'size':>8} {'benchmark':<20}{'min ms':>10}{'p50 ms':>10}{'p90 ms':>10}")
+    for size in args.sizes:
+        source = cached_db(args.cache_dir, size, args.set_size, args.seed)
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, "bench.db")
+            shutil.copyfile(source, path)
+            Database.open(path)
+            benchmarks = Benchmarks(work_dir, args.set_size, args.seed)
+            for name in names:
+                timing = time_benchmark(getattr(benchmarks, f"bench_{name}")(), args.repeat)
+                results["results"].append({"size": size, "benchmark": name, **timing})
+                print(f"{size:>8} {name:<20}{timing['min_ms']:>10.2f}{timing['p50_ms']:>10.2f}"
+                      f"{timing['p90_ms']:>10.2f}")
+            Database.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
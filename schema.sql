@@ -1,13 +1,395 @@
+-- The schema of a database at the latest version (PRAGMA user_version 11).
+-- Databases are created and upgraded by the migrations in
+-- vocab_core/migrations.py, which also add the default profile and the
+-- sync_clock row; this file is the resulting schema in one place.
+
+-- Vocab sets and their words. uid (the same in every copy), stamp (Lamport
+-- clock of the last change), site (copy that made it) and seq (local change
+-- number) are kept for sync by the *_sync_* triggers below.
 CREATE TABLE vocab_sets (
-set_id INTEGER PRIMARY KEY,
-name TEXT NOT NULL UNIQUE,
-description TEXT
+    set_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    uid TEXT,
+    stamp INTEGER NOT NULL DEFAULT 0,
+    site TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE vocab (
-vocab_id INTEGER PRIMARY KEY,
-set_id INTEGER NOT NULL,
-word TEXT NOT NULL,
-definition TEXT NOT NULL,
-FOREIGN KEY (set_id) REFERENCES vocab_sets(set_id) ON DELETE CASCADE
-);
\ No newline at end of file
+    vocab_id INTEGER PRIMARY KEY,
+    set_id INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    uid TEXT,
+    stamp INTEGER NOT NULL DEFAULT 0,
+    site TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (set_id) REFERENCES vocab_sets(set_id) ON DELETE CASCADE
+);
+
+CREATE UNIQUE INDEX vocab_set_word ON vocab (set_id, word);
+
+CREATE INDEX vocab_set_cover ON vocab (set_id, vocab_id, word, definition);
+
+CREATE UNIQUE INDEX vocab_sets_uid ON vocab_sets (uid);
+
+CREATE INDEX vocab_sets_seq ON vocab_sets (seq);
+
+CREATE UNIQUE INDEX vocab_uid ON vocab (uid);
+
+CREATE INDEX vocab_seq ON vocab (seq);
+
+
+-- Full-text index over vocab (left out when SQLite has no FTS5), kept in
+-- step by triggers
+CREATE VIRTUAL TABLE vocab_fts USING fts5 (
+    word, definition,
+    content='vocab', content_rowid='vocab_id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER vocab_fts_insert AFTER INSERT ON vocab
+BEGIN
+    INSERT INTO vocab_fts (rowid, word, definition)
+    VALUES (new.vocab_id, new.word, new.definition);
+END;
+
+CREATE TRIGGER vocab_fts_delete AFTER DELETE ON vocab
+BEGIN
+    INSERT INTO vocab_fts (vocab_fts, rowid, word, definition)
+    VALUES ('delete', old.vocab_id, old.word, old.definition);
+END;
+
+CREATE TRIGGER vocab_fts_update AFTER UPDATE OF word, definition ON vocab
+BEGIN
+    INSERT INTO vocab_fts (vocab_fts, rowid, word, definition)
+    VALUES ('delete', old.vocab_id, old.word, old.definition);
+    INSERT INTO vocab_fts (rowid, word, definition)
+    VALUES (new.vocab_id, new.word, new.definition);
+END;
+
+
+-- Tags on words, used to filter training decks, and accepted answers for a
+-- word besides its definition
+CREATE TABLE vocab_tags (
+    tag TEXT NOT NULL,
+    vocab_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, vocab_id),
+    FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX vocab_tags_vocab ON vocab_tags (vocab_id);
+
+CREATE TABLE vocab_synonyms (
+    vocab_id INTEGER NOT NULL,
+    synonym TEXT NOT NULL,
+    PRIMARY KEY (vocab_id, synonym),
+    FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+
+-- Learner profiles and their settings
+CREATE TABLE profiles (
+    profile_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    last_used REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE settings (
+    profile_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (profile_id, key),
+    FOREIGN KEY (profile_id) REFERENCES profiles(profile_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+
+-- Spaced-repetition state, one row per profile and word
+CREATE TABLE review_state (
+    profile_id INTEGER NOT NULL,
+    vocab_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    ease REAL NOT NULL DEFAULT 2.5,
+    interval REAL NOT NULL DEFAULT 0,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    due REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile_id, vocab_id),
+    FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE,
+    FOREIGN KEY (profile_id) REFERENCES profiles(profile_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX review_state_due ON review_state (profile_id, set_id, due);
+
+CREATE INDEX review_state_vocab ON review_state (vocab_id);
+
+CREATE TRIGGER vocab_review_state AFTER INSERT ON vocab
+BEGIN
+    INSERT INTO review_state (profile_id, vocab_id, set_id)
+    SELECT profile_id, new.vocab_id, new.set_id FROM profiles;
+END;
+
+
+-- Answer history, compacted into daily rollups
+CREATE TABLE review_log (
+    review_id INTEGER PRIMARY KEY,
+    vocab_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    reviewed_at REAL NOT NULL,
+    answer TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX review_log_time ON review_log (reviewed_at);
+
+CREATE INDEX review_log_profile_time ON review_log (profile_id, reviewed_at);
+
+CREATE TABLE review_rollup (
+    profile_id INTEGER NOT NULL,
+    vocab_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    reviews INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, vocab_id, day)
+) WITHOUT ROWID;
+
+
+-- Running statistics, kept up to date by the triggers below. A word is
+-- mastered after 3 correct answers in a row; days are UTC days since the epoch.
+CREATE TABLE word_stats (
+    profile_id INTEGER NOT NULL,
+    vocab_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    streak INTEGER NOT NULL DEFAULT 0,
+    last_reviewed REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile_id, vocab_id)
+) WITHOUT ROWID;
+
+CREATE INDEX word_stats_set ON word_stats (profile_id, set_id);
+
+CREATE INDEX word_stats_vocab ON word_stats (vocab_id);
+
+CREATE TABLE set_stats (
+    profile_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    mastered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile_id, set_id)
+) WITHOUT ROWID;
+
+CREATE TABLE daily_stats (
+    profile_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE profile_stats (
+    profile_id INTEGER PRIMARY KEY,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    answer_streak INTEGER NOT NULL DEFAULT 0,
+    best_answer_streak INTEGER NOT NULL DEFAULT 0,
+    day_streak INTEGER NOT NULL DEFAULT 0,
+    best_day_streak INTEGER NOT NULL DEFAULT 0,
+    last_day INTEGER
+);
+
+CREATE TRIGGER review_log_stats AFTER INSERT ON review_log
+BEGIN
+    INSERT INTO set_stats (profile_id, set_id, reviews, correct, mastered)
+    VALUES (new.profile_id, new.set_id, 1, new.correct,
+            new.correct AND 3 = 1)
+    ON CONFLICT (profile_id, set_id) DO UPDATE SET
+        reviews = reviews + 1,
+        correct = correct + new.correct,
+        mastered = mastered + COALESCE((
+            SELECT CASE
+                WHEN new.correct AND w.streak = 3 - 1 THEN 1
+                WHEN NOT new.correct AND w.streak >= 3 THEN -1
+                ELSE 0 END
+            FROM word_stats w
+            WHERE w.profile_id = new.profile_id AND w.vocab_id = new.vocab_id),
+            new.correct AND 3 = 1);
+    INSERT INTO word_stats (profile_id, vocab_id, set_id, reviews, correct, streak,
+                            last_reviewed)
+    VALUES (new.profile_id, new.vocab_id, new.set_id, 1, new.correct, new.correct,
+            new.reviewed_at)
+    ON CONFLICT (profile_id, vocab_id) DO UPDATE SET
+        reviews = reviews + 1,
+        correct = correct + new.correct,
+        streak = CASE WHEN new.correct THEN streak + 1 ELSE 0 END,
+        last_reviewed = MAX(last_reviewed, new.reviewed_at);
+    INSERT INTO daily_stats (profile_id, day, reviews, correct)
+    VALUES (new.profile_id, CAST(new.reviewed_at / 86400 AS INTEGER), 1,
+            new.correct)
+    ON CONFLICT (profile_id, day) DO UPDATE SET
+        reviews = reviews + 1,
+        correct = correct + new.correct;
+    INSERT OR IGNORE INTO profile_stats (profile_id) VALUES (new.profile_id);
+    UPDATE profile_stats SET
+        day_streak = CASE
+            WHEN last_day IS NULL
+              OR CAST(new.reviewed_at / 86400 AS INTEGER) > last_day + 1 THEN 1
+            WHEN CAST(new.reviewed_at / 86400 AS INTEGER) = last_day + 1
+              THEN day_streak + 1
+            ELSE day_streak END,
+        last_day = MAX(COALESCE(last_day, 0),
+                       CAST(new.reviewed_at / 86400 AS INTEGER))
+    WHERE profile_id = new.profile_id;
+    UPDATE profile_stats SET
+        reviews = reviews + 1,
+        correct = correct + new.correct,
+        answer_streak = CASE WHEN new.correct THEN answer_streak + 1 ELSE 0 END,
+        best_answer_streak = MAX(best_answer_streak,
+                                 CASE WHEN new.correct THEN answer_streak + 1 ELSE 0 END),
+        best_day_streak = MAX(best_day_streak, day_streak)
+    WHERE profile_id = new.profile_id;
+END;
+
+CREATE TRIGGER vocab_word_stats AFTER DELETE ON vocab
+BEGIN
+    UPDATE set_stats SET mastered = mastered - 1
+    WHERE set_id = old.set_id AND profile_id IN (
+        SELECT profile_id FROM word_stats
+        WHERE vocab_id = old.vocab_id AND streak >= 3);
+    DELETE FROM word_stats WHERE vocab_id = old.vocab_id;
+END;
+
+CREATE TRIGGER vocab_sets_stats AFTER DELETE ON vocab_sets
+BEGIN
+    DELETE FROM set_stats WHERE set_id = old.set_id;
+END;
+
+CREATE TRIGGER vocab_moved AFTER UPDATE OF set_id ON vocab
+WHEN new.set_id <> old.set_id
+BEGIN
+    UPDATE review_state SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+    UPDATE review_log SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+    UPDATE review_rollup SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+    INSERT INTO set_stats (profile_id, set_id, reviews, correct, mastered)
+    SELECT profile_id, new.set_id, reviews, correct, streak >= 3
+    FROM word_stats WHERE vocab_id = new.vocab_id
+    ON CONFLICT (profile_id, set_id) DO UPDATE SET
+        reviews = reviews + excluded.reviews,
+        correct = correct + excluded.correct,
+        mastered = mastered + excluded.mastered;
+    UPDATE set_stats SET
+        reviews = reviews - (SELECT w.reviews FROM word_stats w
+                             WHERE w.vocab_id = new.vocab_id
+                               AND w.profile_id = set_stats.profile_id),
+        correct = correct - (SELECT w.correct FROM word_stats w
+                             WHERE w.vocab_id = new.vocab_id
+                               AND w.profile_id = set_stats.profile_id),
+        mastered = mastered - (SELECT w.streak >= 3 FROM word_stats w
+                               WHERE w.vocab_id = new.vocab_id
+                                 AND w.profile_id = set_stats.profile_id)
+    WHERE set_id = old.set_id AND profile_id IN (
+        SELECT profile_id FROM word_stats WHERE vocab_id = new.vocab_id);
+    UPDATE word_stats SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+END;
+
+
+-- Sync between copies of the database (vocab_core/sync.py)
+CREATE TABLE sync_clock (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    site TEXT NOT NULL,
+    counter INTEGER NOT NULL,
+    seq INTEGER NOT NULL
+);
+
+CREATE TABLE sync_tombstones (
+    uid TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    stamp INTEGER NOT NULL,
+    site TEXT NOT NULL,
+    seq INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX sync_tombstones_seq ON sync_tombstones (seq);
+
+CREATE TABLE sync_aliases (
+    uid TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    seq INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX sync_aliases_seq ON sync_aliases (seq);
+
+CREATE TABLE sync_peers (
+    site TEXT PRIMARY KEY,
+    received INTEGER NOT NULL DEFAULT 0,
+    acked INTEGER NOT NULL DEFAULT 0,
+    last_sync REAL
+) WITHOUT ROWID;
+
+CREATE TRIGGER vocab_sets_sync_insert AFTER INSERT ON vocab_sets
+WHEN new.uid IS NULL
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    UPDATE vocab_sets SET uid = lower(hex(randomblob(16))),
+        stamp = (SELECT counter FROM sync_clock),
+        site = (SELECT site FROM sync_clock),
+        seq = (SELECT seq FROM sync_clock)
+    WHERE set_id = new.set_id;
+END;
+
+CREATE TRIGGER vocab_sets_sync_update
+AFTER UPDATE OF name, description ON vocab_sets
+WHEN new.seq = old.seq
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    UPDATE vocab_sets SET
+        stamp = (SELECT counter FROM sync_clock),
+        site = (SELECT site FROM sync_clock),
+        seq = (SELECT seq FROM sync_clock)
+    WHERE set_id = new.set_id;
+END;
+
+CREATE TRIGGER vocab_sets_sync_delete AFTER DELETE ON vocab_sets
+WHEN NOT EXISTS (SELECT 1 FROM sync_aliases WHERE uid = old.uid)
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    INSERT INTO sync_tombstones (uid, kind, stamp, site, seq)
+    SELECT old.uid, 'set', counter, site, seq FROM sync_clock WHERE true
+    ON CONFLICT (uid) DO NOTHING;
+END;
+
+CREATE TRIGGER vocab_sync_insert AFTER INSERT ON vocab
+WHEN new.uid IS NULL
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    UPDATE vocab SET uid = lower(hex(randomblob(16))),
+        stamp = (SELECT counter FROM sync_clock),
+        site = (SELECT site FROM sync_clock),
+        seq = (SELECT seq FROM sync_clock)
+    WHERE vocab_id = new.vocab_id;
+END;
+
+CREATE TRIGGER vocab_sync_update
+AFTER UPDATE OF set_id, word, definition ON vocab
+WHEN new.seq = old.seq
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    UPDATE vocab SET
+        stamp = (SELECT counter FROM sync_clock),
+        site = (SELECT site FROM sync_clock),
+        seq = (SELECT seq FROM sync_clock)
+    WHERE vocab_id = new.vocab_id;
+END;
+
+CREATE TRIGGER vocab_sync_delete AFTER DELETE ON vocab
+WHEN EXISTS (SELECT 1 FROM vocab_sets WHERE set_id = old.set_id)
+ AND NOT EXISTS (SELECT 1 FROM sync_aliases WHERE uid = old.uid)
+BEGIN
+    UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;
+    INSERT INTO sync_tombstones (uid, kind, stamp, site, seq)
+    SELECT old.uid, 'vocab', counter, site, seq FROM sync_clock WHERE true
+    ON CONFLICT (uid) DO NOTHING;
+END;
@@ -0,0 +1,27 @@
+import pytest
+
+from vocab_core.database import Database
+from vocab_core.review_log import ReviewLogWriter
+
+
+@pytest.fixture
+def db(tmp_path):
+    # a new, empty database at the latest schema version
+    path = str(tmp_path / "vocabulary.db")
+    Database.open(path)
+    yield path
+    Database.close()
+
+
+@pytest.fixture
+def answer():
+    # answer(set_id, [(vocab_id, correct)]) logs the answers and waits until
+    # they are written
+    def log(set_id, answers, profile_id=1):
+        review_log = ReviewLogWriter()
+        try:
+            for vocab_id, correct in answers:
+                review_log.log(vocab_id, set_id, "answer", correct, profile_id=profile_id)
+        finally:
+            review_log.close()
+    return log
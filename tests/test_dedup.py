@@ -0,0 +1,90 @@
+import pytest
+
+from vocab_core.database import Database
+from vocab_core.dedup import find_duplicates, merge_duplicates
+from vocab_core.sets import create_set, get_vocab_id, get_vocab_list
+from vocab_core.stats import set_mastery, word_accuracy
+from vocab_core.synonyms import add_synonyms, synonyms_for
+from vocab_core.tags import tag_words
+
+
+@pytest.fixture
+def decks(db):
+    first = create_set("First", "", [("cat", "die Katze"), ("Cat", "die katze!"),
+                                     ("dog", "der Hund"), ("house", "das Haus")])
+    second = create_set("Second", "", [("cat", "Die Katze"), ("dog", "der Hund, der Köter"),
+                                       ("tree", "der Baum")])
+    return first, second
+
+
+def ids(set_id, *words):
+    return [get_vocab_id(set_id, word) for word in words]
+
+
+def test_exact_duplicates(decks):
+    first, second = decks
+    cats = sorted(ids(first, "cat", "Cat") + ids(second, "cat"))
+    assert find_duplicates() == [("exact", cats)]
+    assert find_duplicates(per_set=True) == [("exact", sorted(ids(first, "cat", "Cat")))]
+    assert find_duplicates(set_ids=[second]) == []
+    assert find_duplicates(set_ids=[first, second]) == [("exact", cats)]
+
+
+def test_near_duplicates(decks):
+    first, second = decks
+    groups = find_duplicates(near=True, threshold=0.3)
+    assert ("near", sorted(ids(first, "dog") + ids(second, "dog"))) in groups
+    assert ("exact", sorted(ids(first, "cat", "Cat") + ids(second, "cat"))) in groups
+    assert ("near", sorted(ids(first, "dog") + ids(second, "dog"))) not in find_duplicates(
+        near=True, threshold=0.95)
+
+
+def test_merge_within_a_set(decks, answer):
+    first, second = decks
+    cat, big_cat = ids(first, "cat", "Cat")
+    tag_words("animals", [big_cat])
+    add_synonyms(big_cat, ["die Mieze"])
+    answer(first, [(cat, True), (big_cat, True), (big_cat, False)])
+
+    assert merge_duplicates(find_duplicates(per_set=True)) == 1
+    assert "Cat" not in get_vocab_list(first)
+    assert "cat" in get_vocab_list(second)
+    # the oldest row is kept and takes over the other's history, tags and synonyms
+    assert word_accuracy([cat]) == {cat: (3, 2, 1)}
+    conn = Database.get_connection()
+    assert conn.execute("SELECT vocab_id FROM vocab_tags WHERE tag='animals'").fetchall() == [(cat,)]
+    assert synonyms_for([cat]) == {cat: ("die Mieze",)}
+    assert conn.execute("SELECT COUNT(*) FROM review_log WHERE vocab_id=?",
+                        (cat,)).fetchone()[0] == 3
+
+
+def test_merge_across_sets_moves_set_totals(decks, answer):
+    first, second = decks
+    (cat,) = ids(first, "cat")
+    (other_cat,) = ids(second, "cat")
+    answer(second, [(other_cat, True), (other_cat, True)])
+
+    removed = merge_duplicates([("exact", [cat, other_cat])], prefer=[first])
+    assert removed == 1
+    assert "cat" not in get_vocab_list(second)
+    totals = {entry["name"]: (entry["reviews"], entry["correct"]) for entry in set_mastery()}
+    assert totals == {"First": (2, 2), "Second": (0, 0)}
+
+
+def test_merge_prefers_the_given_set(decks):
+    first, second = decks
+    (cat,) = ids(first, "cat")
+    (other_cat,) = ids(second, "cat")
+    merge_duplicates([("exact", [cat, other_cat])], prefer=[second])
+    assert "cat" in get_vocab_list(second)
+    assert "cat" not in get_vocab_list(first)
+
+
+def test_merge_skips_rows_deleted_since(decks):
+    first, _second = decks
+    cat, big_cat = ids(first, "cat", "Cat")
+    groups = find_duplicates(per_set=True)
+    with Database.transaction() as conn:
+        conn.execute("DELETE FROM vocab WHERE vocab_id=?", (big_cat,))
+    assert merge_duplicates(groups) == 0
+    assert "cat" in get_vocab_list(first)
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from vocab_core.grading import Grader, GradingOptions, within_distance
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def grade(answer, definition, fuzzy=False):
+    return Grader(GradingOptions(fuzzy=fuzzy)).grade(1, answer, definition)
+
+
+@pytest.mark.parametrize("answer, definition", [
+    ("die Katze", "die Katze"),
+    ("  DIE katze! ", "die Katze"),
+    ("cafe", "Café"),
+    ("the kitty", "the cat; the kitty"),
+    ("the cat", "the cat | the kitty"),
+    ("the cat; the kitty", "the cat; the kitty"),
+    ("km/h", "km/h"),
+    ("and or", "and/or"),
+])
+def test_accepted(answer, definition):
+    assert grade(answer, definition)
+
+
+@pytest.mark.parametrize("answer, definition", [
+    ("", "die Katze"),
+    ("!?", "die Katze"),
+    ("die Katz", "die Katze"),
+    ("Katze die", "die Katze"),
+    # "/" is part of an answer, not a separator
+    ("h", "km/h"),
+    ("or", "and/or"),
+    ("the", "the cat; the kitty"),
+])
+def test_rejected(answer, definition):
+    assert not grade(answer, definition)
+
+
+def test_fuzzy_is_off_by_default():
+    assert not GradingOptions().fuzzy
+
+
+def test_fuzzy_accepts_typos_and_word_order():
+    assert grade("die Katz", "die Katze", fuzzy=True)
+    assert grade("Katze die", "die Katze", fuzzy=True)
+    assert grade("the kity", "the cat; the kitty", fuzzy=True)
+    # one typo is allowed per 1 / typo_ratio letters
+    assert not grade("dei Kazte", "die Katze", fuzzy=True)
+    assert not grade("cta", "cat", fuzzy=True)
+
+
+def test_fuzzy_typos_are_capped():
+    definition = "a very long definition with many words in it"
+    options = GradingOptions(fuzzy=True)
+    assert options.allowed_typos(len(definition)) == options.max_typos
+    assert grade(definition[:-3], definition, fuzzy=True)
+    assert not grade(definition[:-4], definition, fuzzy=True)
+
+
+def test_synonyms():
+    grader = Grader()
+    grader.prepare([(1, "to go"), (2, "to run")], {1: ("to walk",)})
+    assert grader.grade(1, "to walk", "to go")
+    assert grader.grade(1, "to go", "to go")
+    assert not grader.grade(2, "to walk", "to run")
+    # preparing again without the synonym drops it
+    grader.prepare([(1, "to go")])
+    assert not grader.grade(1, "to walk", "to go")
+
+
+def test_edited_definition_is_prepared_again():
+    grader = Grader()
+    grader.prepare([(1, "der Hund")])
+    assert grader.grade(1, "der Hund", "der Hund")
+    assert grader.grade(1, "die Katze", "die Katze")
+    assert not grader.grade(1, "der Hund", "die Katze")
+
+
+@pytest.mark.parametrize("a, b, k, expected", [
+    ("", "", 0, True),
+    ("", "abc", 3, True),
+    ("", "abc", 2, False),
+    ("abc", "abc", 0, True),
+    ("abc", "abd", 0, False),
+    ("kitten", "sitting", 3, True),
+    ("kitten", "sitting", 2, False),
+    ("flaw", "lawn", 2, True),
+    ("abcdef", "ab", 3, False),
+])
+def test_within_distance(a, b, k, expected):
+    assert within_distance(a, b, k) == expected
+    assert within_distance(b, a, k) == expected
+
+
+def test_within_distance_matches_levenshtein():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randrange(8)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randrange(8)))
+        k = rng.randrange(5)
+        assert within_distance(a, b, k) == (levenshtein(a, b) <= k), (a, b, k)
@@ -0,0 +1,168 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from vocab_core.database import ConnectionManager, Database
+from vocab_core.migrations import MIGRATIONS, MigrationError, get_version, latest_version
+from vocab_core.profiles import DEFAULT_PROFILE
+from vocab_core.search import search_vocab
+from vocab_core.sets import get_set_id, get_vocab_id, get_vocab_list
+from vocab_core import stats
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SHIPPED_DB = os.path.join(ROOT, "vocabulary.db")
+
+
+def migrate_to(path, version):
+    # a database as an older version of the app left it
+    manager = ConnectionManager(path)
+    for number, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if number > version:
+            break
+        with manager.transaction() as conn:
+            func(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return manager
+
+
+def check_upgraded(words):
+    conn = Database.get_connection()
+    assert get_version(conn) == latest_version()
+    set_id = get_set_id("German")
+    assert dict(get_vocab_list(set_id)) == words
+    vocab_ids = [get_vocab_id(set_id, word) for word in words]
+    # every word has a review state for the default profile, and a sync uid
+    assert conn.execute(
+        "SELECT COUNT(*) FROM review_state WHERE profile_id=? AND set_id=?",
+        (DEFAULT_PROFILE, set_id)).fetchone()[0] == len(words)
+    uids = [row[0] for row in conn.execute("SELECT uid FROM vocab")]
+    assert None not in uids and len(set(uids)) == len(uids)
+    assert conn.execute("SELECT uid FROM vocab_sets WHERE set_id=?", (set_id,)).fetchone()[0]
+    # the search index covers the old rows
+    assert [row[2] for row in search_vocab("Katze")] == ["cat"]
+    assert stats.summary(DEFAULT_PROFILE, [set_id])["sets"][0]["words"] == len(words)
+    return set_id, vocab_ids
+
+
+def test_new_database(db):
+    conn = Database.get_connection()
+    assert get_version(conn) == latest_version()
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for table in ("vocab_sets", "vocab", "review_state", "review_log", "vocab_tags",
+                  "profiles", "settings", "word_stats", "sync_clock", "vocab_synonyms"):
+        assert table in tables
+
+
+def schema_objects(conn):
+    # {(type, name)} of the tables, indexes and triggers, without those
+    # SQLite makes itself
+    return {row for row in conn.execute("""
+        SELECT type, name FROM sqlite_master
+        WHERE name NOT LIKE 'sqlite_%' AND (tbl_name <> 'vocab_fts' OR name = 'vocab_fts')
+          AND name NOT IN (SELECT name FROM sqlite_master WHERE type = 'table'
+                           AND name LIKE 'vocab_fts_%')""")}
+
+
+def test_schema_sql_is_the_latest_schema(db):
+    # schema.sql loads on its own and holds what the migrations create
+    with open(os.path.join(ROOT, "schema.sql")) as f:
+        schema = f.read()
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(schema)
+    assert schema_objects(conn) == schema_objects(Database.get_connection())
+    assert f"PRAGMA user_version {latest_version()}" in schema
+
+
+def test_migrations_are_numbered_in_order():
+    assert sorted(version for version, _ in MIGRATIONS) == list(range(1, latest_version() + 1))
+
+
+def test_shipped_database(tmp_path):
+    path = str(tmp_path / "vocabulary.db")
+    shutil.copy(SHIPPED_DB, path)
+    conn = sqlite3.connect(path)
+    assert get_version(conn) == 0
+    conn.close()
+    Database.open(path)
+    try:
+        check_upgraded({"cat": "die Katze", "dog": "der Hund"})
+        # opening it again changes nothing
+        Database.open(path)
+        check_upgraded({"cat": "die Katze", "dog": "der Hund"})
+    finally:
+        Database.close()
+
+
+@pytest.mark.parametrize("version", range(1, latest_version()))
+def test_upgrade_from(tmp_path, version):
+    path = str(tmp_path / "vocabulary.db")
+    manager = migrate_to(path, version)
+    with manager.transaction() as conn:
+        set_id = conn.execute(
+            "INSERT INTO vocab_sets (name, description) VALUES ('German', '')").lastrowid
+        conn.executemany("INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+                         [(set_id, "cat", "die Katze"), (set_id, "dog", "der Hund")])
+    manager.close_all()
+    Database.open(path)
+    try:
+        check_upgraded({"cat": "die Katze", "dog": "der Hund"})
+    finally:
+        Database.close()
+
+
+def test_duplicate_words_keep_every_definition(tmp_path, capsys):
+    # before migration 2 a set could hold a word twice; the last row is kept
+    # and the other definitions become alternative answers
+    path = str(tmp_path / "vocabulary.db")
+    manager = migrate_to(path, 1)
+    with manager.transaction() as conn:
+        conn.execute("INSERT INTO vocab_sets (name, description) VALUES ('German', '')")
+        conn.executemany("INSERT INTO vocab (set_id, word, definition) VALUES (1, ?, ?)",
+                         [("cat", "die Mieze"), ("cat", "die Katze"), ("dog", "der Hund"),
+                          ("dog", "der Hund")])
+    manager.close_all()
+    Database.open(path)
+    try:
+        check_upgraded({"cat": "die Katze; die Mieze", "dog": "der Hund"})
+        assert get_vocab_id(get_set_id("German"), "cat") == 2
+    finally:
+        Database.close()
+    err = capsys.readouterr().err
+    assert "Merged 1 duplicate rows of 'cat' in set 1: die Katze; die Mieze" in err
+    assert "'dog'" in err
+
+
+def test_review_history_is_counted(tmp_path):
+    # answers logged before migration 8 show up in the statistics it adds
+    path = str(tmp_path / "vocabulary.db")
+    manager = migrate_to(path, 7)
+    with manager.transaction() as conn:
+        conn.execute("INSERT INTO vocab_sets (name, description) VALUES ('German', '')")
+        conn.executemany("INSERT INTO vocab (set_id, word, definition) VALUES (1, ?, ?)",
+                         [("cat", "die Katze"), ("dog", "der Hund")])
+        conn.executemany("""
+            INSERT INTO review_log (vocab_id, set_id, reviewed_at, answer, correct)
+            VALUES (?, 1, ?, '', ?)""",
+                         [(1, 100, 1), (1, 200, 1), (1, 300, 1), (2, 400, 0)])
+    manager.close_all()
+    Database.open(path)
+    try:
+        set_id, _vocab_ids = check_upgraded({"cat": "die Katze", "dog": "der Hund"})
+        totals = stats.summary(DEFAULT_PROFILE, [set_id])
+        assert (totals["reviews"], totals["correct"]) == (4, 3)
+        assert totals["sets"][0]["mastered"] == 1
+        assert stats.word_accuracy([1, 2]) == {1: (3, 3, 3), 2: (1, 0, 0)}
+    finally:
+        Database.close()
+
+
+def test_newer_database_is_refused(tmp_path):
+    path = str(tmp_path / "vocabulary.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version = {latest_version() + 1}")
+    conn.close()
+    with pytest.raises(MigrationError):
+        Database.open(path)
+    Database.close()
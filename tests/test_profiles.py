@@ -0,0 +1,35 @@
+import pytest
+
+from vocab_core.database import Database
+from vocab_core.deckquery import session_source
+from vocab_core.profiles import (DEFAULT_PROFILE, ProfileExistsError, create_profile,
+                                 delete_profile, list_profiles)
+from vocab_core.sets import create_set, get_vocab_id
+from vocab_core import stats
+
+
+def test_create_and_delete(db):
+    profile_id = create_profile("Ann")
+    assert (profile_id, "Ann") in list_profiles()
+    with pytest.raises(ProfileExistsError):
+        create_profile("Ann")
+    delete_profile(profile_id)
+    assert [name for _id, name in list_profiles()] == ["default"]
+    with pytest.raises(ValueError):
+        delete_profile(DEFAULT_PROFILE)
+
+
+def test_new_profile_starts_from_scratch(db, answer):
+    set_id = create_set("German", "", [("cat", "die Katze"), ("dog", "der Hund")])
+    cat = get_vocab_id(set_id, "cat")
+    ann = create_profile("Ann")
+    answer(set_id, [(cat, False)], profile_id=ann)
+    delete_profile(ann)
+    # the next profile gets the freed id, but none of Ann's history
+    bob = create_profile("Bob")
+    assert bob == ann
+    assert stats.summary(bob, [set_id])["reviews"] == 0
+    assert Database.get_connection().execute(
+        "SELECT COUNT(*) FROM review_log WHERE profile_id=?", (bob,)).fetchone()[0] == 0
+    _set_id, query = session_source([set_id], [], 7, bob)
+    assert query.next_batch(0) == []
@@ -0,0 +1,88 @@
+import pytest
+
+from vocab_core.scheduler import (DAY, LAPSE_DELAY, MIN_EASE, QUALITY_CORRECT,
+                                  QUALITY_INCORRECT, Scheduler, due_time, sm2)
+from vocab_core.sets import create_set, get_vocab_id
+
+NOW = 1_700_000_000
+
+
+def test_sm2_intervals_grow():
+    ease, interval, repetitions = 2.5, 0, 0
+    ease, interval, repetitions = sm2(ease, interval, repetitions, QUALITY_CORRECT)
+    assert (interval, repetitions) == (1, 1)
+    ease, interval, repetitions = sm2(ease, interval, repetitions, QUALITY_CORRECT)
+    assert (interval, repetitions) == (6, 2)
+    ease, interval, repetitions = sm2(ease, interval, repetitions, QUALITY_CORRECT)
+    assert interval == pytest.approx(6 * ease)
+    assert repetitions == 3
+
+
+def test_sm2_quality_changes_ease():
+    assert sm2(2.5, 6, 2, 5)[0] == pytest.approx(2.6)
+    assert sm2(2.5, 6, 2, 4)[0] == pytest.approx(2.5)
+    assert sm2(2.5, 6, 2, 3)[0] == pytest.approx(2.36)
+
+
+def test_sm2_failure_restarts_the_word():
+    ease, interval, repetitions = sm2(2.5, 15, 4, QUALITY_INCORRECT)
+    assert (interval, repetitions) == (0, 0)
+    assert ease < 2.5
+
+
+def test_sm2_ease_never_drops_below_minimum():
+    ease, interval, repetitions = 2.5, 0, 0
+    for _ in range(20):
+        ease, interval, repetitions = sm2(ease, interval, repetitions, 0)
+    assert ease == MIN_EASE
+    assert sm2(MIN_EASE, 6, 2, QUALITY_CORRECT)[1] == pytest.approx(6 * MIN_EASE)
+
+
+def test_due_time():
+    assert due_time(NOW, 0) == NOW + LAPSE_DELAY
+    assert due_time(NOW, 1) == NOW + DAY
+    assert due_time(NOW, 2.5) == NOW + 2.5 * DAY
+
+
+@pytest.fixture
+def deck(db):
+    set_id = create_set("German", "", [("cat", "die Katze"), ("dog", "der Hund"),
+                                       ("house", "das Haus")])
+    return set_id, {word: get_vocab_id(set_id, word) for word in ("cat", "dog", "house")}
+
+
+def words(batch):
+    return [word for _vocab_id, word, _definition in batch]
+
+
+def test_new_words_are_due(deck):
+    set_id, _ids = deck
+    scheduler = Scheduler(set_id, clock=lambda: NOW)
+    assert scheduler.due_count() == 3
+    assert sorted(words(scheduler.next_batch(0))) == ["cat", "dog", "house"]
+    assert len(scheduler.next_batch(2)) == 2
+
+
+def test_answered_words_wait_until_due(deck):
+    set_id, ids = deck
+    scheduler = Scheduler(set_id, clock=lambda: NOW)
+    scheduler.record([(ids["cat"], QUALITY_CORRECT), (ids["dog"], QUALITY_INCORRECT)])
+    assert words(scheduler.next_batch(0)) == ["house"]
+    assert scheduler.due_count() == 1
+    # a wrong answer is back after LAPSE_DELAY, a right one after a day
+    assert sorted(words(scheduler.next_batch(0, now=NOW + LAPSE_DELAY))) == ["dog", "house"]
+    assert words(scheduler.next_batch(0, now=NOW + DAY)) == ["house", "dog", "cat"]
+
+
+def test_ahead_fills_with_the_words_due_soonest(deck):
+    set_id, ids = deck
+    scheduler = Scheduler(set_id, clock=lambda: NOW)
+    scheduler.record([(ids["cat"], QUALITY_CORRECT), (ids["dog"], QUALITY_INCORRECT)])
+    assert words(scheduler.next_batch(3, ahead=True)) == ["house", "dog", "cat"]
+    assert words(scheduler.next_batch(2, ahead=True, exclude=[ids["house"]])) == ["dog", "cat"]
+
+
+def test_exclude(deck):
+    set_id, ids = deck
+    scheduler = Scheduler(set_id, clock=lambda: NOW)
+    assert words(scheduler.next_batch(0, exclude=[ids["cat"], ids["dog"]])) == ["house"]
@@ -0,0 +1,35 @@
+from vocab_core.deckquery import session_source
+from vocab_core.review_log import ReviewLogWriter
+from vocab_core.session import TrainingSession
+from vocab_core.sets import create_set, get_vocab_id
+from vocab_core.stats import word_accuracy
+
+
+def test_same_word_from_two_sets(db):
+    german = create_set("German", "", [("cat", "die Katze")])
+    french = create_set("French", "", [("cat", "le chat")])
+    set_id, query = session_source([german, french])
+    review_log = ReviewLogWriter()
+    session = TrainingSession(set_id, review_log=review_log, query=query)
+    batch = session.next_batch()
+    assert sorted((word, definition) for _id, word, definition in batch) == [
+        ("cat", "die Katze"), ("cat", "le chat")]
+    cat_de, cat_fr = get_vocab_id(german, "cat"), get_vocab_id(french, "cat")
+    results = session.submit({cat_de: "die Katze", cat_fr: "die Katze"})
+    review_log.close()
+    assert sorted((vocab_id, correct) for vocab_id, _w, _d, _a, correct in results) == [
+        (cat_de, True), (cat_fr, False)]
+    assert word_accuracy([cat_de, cat_fr]) == {cat_de: (1, 1, 1), cat_fr: (1, 0, 0)}
+
+
+def test_pending_words_are_not_handed_out_twice(db):
+    set_id = create_set("German", "", [("cat", "die Katze"), ("dog", "der Hund")])
+    session = TrainingSession(set_id, number_of_words=1)
+    first = session.next_batch()
+    second = session.next_batch()
+    assert len(first) == len(second) == 1 and first != second
+    assert session.next_batch() == []
+    # released words can be handed out again; unknown answers are ignored
+    session.release([first[0][0]])
+    assert session.next_batch() == first
+    assert session.submit({-1: "x"}) == []
@@ -0,0 +1,270 @@
+import pytest
+
+from vocab_core.database import Database
+from vocab_core.scheduler import Scheduler
+from vocab_core.sets import (create_set, delete_set, get_set_id, get_vocab_id,
+                             save_set_changes)
+from vocab_core.stats import set_mastery
+from vocab_core.sync import (SyncError, apply_changes, changes_since, local_site,
+                             read_changes, write_changes)
+
+
+@pytest.fixture
+def copies(tmp_path):
+    # two copies of the database, as on two machines
+    paths = str(tmp_path / "a.db"), str(tmp_path / "b.db")
+    for path in paths:
+        Database.open(path)
+    yield paths
+    Database.close()
+
+
+def exchange(source, target):
+    Database.open(source)
+    changes = changes_since(0)
+    Database.open(target)
+    return apply_changes(changes)
+
+
+def sync(a, b):
+    # as `sync connect` does: both changesets are made before either is applied
+    Database.open(a)
+    from_a = changes_since(0)
+    Database.open(b)
+    from_b = changes_since(0)
+    apply_changes(from_a)
+    Database.open(a)
+    apply_changes(from_b)
+
+
+def contents(path):
+    Database.open(path)
+    conn = Database.get_connection()
+    return (
+        sorted(conn.execute("SELECT uid, name, description FROM vocab_sets")),
+        sorted(conn.execute("""
+            SELECT v.uid, s.uid, v.word, v.definition
+            FROM vocab v JOIN vocab_sets s ON s.set_id = v.set_id""")),
+    )
+
+
+def words(path, set_name):
+    Database.open(path)
+    set_id = get_set_id(set_name)
+    return dict(Database.get_connection().execute(
+        "SELECT word, definition FROM vocab WHERE set_id=?", (set_id,)))
+
+
+def test_copies_have_their_own_site(copies):
+    a, b = copies
+    Database.open(a)
+    site_a = local_site()
+    Database.open(b)
+    assert local_site() != site_a
+
+
+def test_changes_reach_the_other_copy(copies):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "german vocab", [("cat", "die Katze"), ("dog", "der Hund")])
+    sync(a, b)
+    assert words(b, "German") == {"cat": "die Katze", "dog": "der Hund"}
+    assert contents(a) == contents(b)
+
+    Database.open(b)
+    set_id = get_set_id("German")
+    save_set_changes(set_id, description="Deutsch",
+                     inserted=[("house", "das Haus")],
+                     updated=[(get_vocab_id(set_id, "cat"), "cat", "die Mieze")],
+                     deleted=[get_vocab_id(set_id, "dog")])
+    sync(a, b)
+    assert words(a, "German") == {"cat": "die Mieze", "house": "das Haus"}
+    assert contents(a) == contents(b)
+
+
+def test_applying_twice_changes_nothing(copies):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "", [("cat", "die Katze")])
+    assert exchange(a, b) == (2, 0)
+    assert exchange(a, b) == (0, 2)
+    assert contents(a) == contents(b)
+
+
+def test_files_carry_only_what_the_peer_has_not_seen(copies, tmp_path):
+    a, b = copies
+    changes = str(tmp_path / "changes.json.gz")
+    Database.open(a)
+    site_a = local_site()
+    create_set("German", "", [("cat", "die Katze"), ("dog", "der Hund")])
+    Database.open(b)
+    site_b = local_site()
+
+    def send(source, target, peer):
+        Database.open(source)
+        sent = write_changes(changes, peer=peer)
+        Database.open(target)
+        apply_changes(read_changes(changes))
+        return len(sent["sets"]) + len(sent["vocab"]) + len(sent["tombstones"])
+
+    assert send(a, b, site_b) == 3
+    # b's reply tells a what b has received
+    send(b, a, site_a)
+    assert send(a, b, site_b) == 0
+    Database.open(a)
+    save_set_changes(get_set_id("German"), inserted=[("house", "das Haus")])
+    assert send(a, b, site_b) == 1
+    assert contents(a) == contents(b)
+
+
+def test_own_changes_are_refused(copies):
+    a, _b = copies
+    Database.open(a)
+    with pytest.raises(SyncError):
+        apply_changes(changes_since(0))
+
+
+def test_same_name_sets_are_merged(copies, answer):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "from a", [("cat", "die Katze"), ("dog", "der Hund")])
+    Database.open(b)
+    set_id = create_set("German", "from b", [("cat", "die Mieze"), ("house", "das Haus")])
+    # progress stays with each copy, also for a word merged with the other's
+    answer(set_id, [(get_vocab_id(set_id, "cat"), True)])
+
+    sync(a, b)
+    assert contents(a) == contents(b)
+    sets, _vocab = contents(a)
+    assert len(sets) == 1
+    merged = words(a, "German")
+    assert merged.keys() == {"cat", "dog", "house"}
+    assert merged["cat"] in ("die Katze", "die Mieze")
+
+    for path in (a, b):
+        Database.open(path)
+        set_id = get_set_id("German")
+        # the moved words are quizzed and counted in the set they are in now
+        assert sorted(word for _id, word, _definition in Scheduler(set_id).next_batch(0)) == [
+            "cat", "dog", "house"]
+        conn = Database.get_connection()
+        for table in ("review_state", "review_log", "word_stats"):
+            assert conn.execute(f"""
+                SELECT COUNT(*) FROM {table} t JOIN vocab v ON v.vocab_id = t.vocab_id
+                WHERE t.set_id <> v.set_id""").fetchone()[0] == 0
+    cat = get_vocab_id(set_id, "cat")
+    assert conn.execute(
+        "SELECT COUNT(*) FROM review_log WHERE vocab_id=?", (cat,)).fetchone()[0] == 1
+    assert set_mastery(set_ids=[set_id])[0]["reviews"] == 1
+
+    # the merged copies keep in step afterwards
+    save_set_changes(get_set_id("German"), inserted=[("tree", "der Baum")])
+    sync(a, b)
+    assert "tree" in words(a, "German")
+    assert contents(a) == contents(b)
+
+
+def stamp(path, table, uid):
+    Database.open(path)
+    conn = Database.get_connection()
+    row = conn.execute(f"SELECT stamp, site FROM {table} WHERE uid=?", (uid,)).fetchone()
+    return tuple(row) if row else None
+
+
+@pytest.mark.parametrize("delete_wins", [True, False])
+def test_delete_against_edit(copies, delete_wins):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "", [("cat", "die Katze"), ("dog", "der Hund")])
+    sync(a, b)
+    _sets, vocab = contents(a)
+    cat = next(uid for uid, _set_uid, word, _definition in vocab if word == "cat")
+
+    # a deletes the word while b edits it; the copy with more changes behind
+    # it has the later Lamport stamp
+    Database.open(a)
+    set_id = get_set_id("German")
+    if delete_wins:
+        save_set_changes(set_id, description="edited in a")
+    save_set_changes(set_id, deleted=[get_vocab_id(set_id, "cat")])
+    Database.open(b)
+    set_id = get_set_id("German")
+    if not delete_wins:
+        save_set_changes(set_id, description="edited in b")
+    save_set_changes(set_id, updated=[(get_vocab_id(set_id, "cat"), "cat", "die Mieze")])
+    assert (stamp(a, "sync_tombstones", cat) > stamp(b, "vocab", cat)) == delete_wins
+
+    sync(a, b)
+    assert contents(a) == contents(b)
+    if delete_wins:
+        assert words(a, "German") == {"dog": "der Hund"}
+    else:
+        assert words(a, "German") == {"cat": "die Mieze", "dog": "der Hund"}
+
+
+def test_deleted_set_takes_its_words(copies):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "", [("cat", "die Katze")])
+    sync(a, b)
+    Database.open(a)
+    delete_set("German")
+    Database.open(b)
+    save_set_changes(get_set_id("German"), inserted=[("dog", "der Hund")])
+    sync(a, b)
+    assert contents(a) == contents(b)
+    Database.open(a)
+    assert Database.get_connection().execute(
+        "SELECT COUNT(*) FROM vocab v LEFT JOIN vocab_sets s ON s.set_id = v.set_id "
+        "WHERE s.set_id IS NULL").fetchone()[0] == 0
+
+
+def test_three_copies_converge(tmp_path):
+    paths = [str(tmp_path / f"{name}.db") for name in "abc"]
+    try:
+        for i, path in enumerate(paths):
+            Database.open(path)
+            create_set("German", f"copy {i}", [("cat", f"Katze {i}"), (f"word {i}", "x")])
+        for _ in range(2):
+            sync(paths[0], paths[1])
+            sync(paths[1], paths[2])
+            sync(paths[2], paths[0])
+        assert contents(paths[0]) == contents(paths[1]) == contents(paths[2])
+        assert words(paths[0], "German").keys() == {"cat", "word 0", "word 1", "word 2"}
+    finally:
+        Database.close()
+
+
+def test_deleted_set_replaced_by_a_renamed_one(copies):
+    a, b = copies
+    Database.open(a)
+    create_set("German", "", [("cat", "die Katze")])
+    create_set("Deutsch", "", [("dog", "der Hund")])
+    sync(a, b)
+    Database.open(a)
+    delete_set("German")
+    save_set_changes(get_set_id("Deutsch"), name="German")
+    sync(a, b)
+    assert words(a, "German") == {"dog": "der Hund"}
+    assert contents(a) == contents(b)
+    Database.open(b)
+    assert Database.get_connection().execute(
+        "SELECT COUNT(*) FROM review_state WHERE vocab_id NOT IN (SELECT vocab_id FROM vocab)"
+    ).fetchone()[0] == 0
+
+
+def test_moved_word_takes_its_progress(copies, answer):
+    # sync moves a word by changing its set_id
+    a, _b = copies
+    Database.open(a)
+    first = create_set("German", "", [("cat", "die Katze")])
+    second = create_set("Deutsch", "", [("dog", "der Hund")])
+    cat = get_vocab_id(first, "cat")
+    answer(first, [(cat, True)] * 3)
+    with Database.transaction() as conn:
+        conn.execute("UPDATE vocab SET set_id=? WHERE vocab_id=?", (second, cat))
+    assert sorted(word for _id, word, _definition in Scheduler(second).next_batch(0)) == [
+        "cat", "dog"]
+    assert Scheduler(first).next_batch(0) == []
+    totals = {entry["name"]: (entry["reviews"], entry["mastered"]) for entry in set_mastery()}
+    assert totals == {"German": (0, 0), "Deutsch": (3, 1)}
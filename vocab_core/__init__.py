@@ -0,0 +1,3 @@
+"""GUI-free core of the vocab trainer: storage, scheduling, grading and
+import/export. Nothing in this package imports tkinter; app.py builds the GUI
+on top of it and vocab_core.cli is the command line entry point."""
@@ -0,0 +1,241 @@
+"""Pronunciation audio: an on-disk cache filled by an offline TTS engine.
+
+Clips are stored under the SHA-256 of (engine, voice, word), so the same word
+spoken by the same voice is generated once and shared by every set. Clips
+are made lazily in a process pool and the least recently played are deleted
+once the cache outgrows its size budget. Clips imported from audio files are
+kept apart and never evicted, and are preferred to generated ones.
+
+Engines are external programs found on PATH (espeak-ng or espeak, or say on
+macOS); with none installed the cache stays empty and nothing is generated.
+"""
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+
+from .database import Database
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+GENERATE_TIMEOUT = 30
+
+# engine name: (program, file extension)
+ENGINES = {
+    "espeak-ng": ("espeak-ng", ".wav"),
+    "espeak": ("espeak", ".wav"),
+    "say": ("say", ".aiff"),
+}
+PLAYERS = ("afplay", "paplay", "aplay", "ffplay")
+
+
+def find_engine():
+    # the first TTS engine installed, or None
+    for name, (program, _extension) in ENGINES.items():
+        if shutil.which(program):
+            return name
+    return None
+
+
+def default_cache_dir():
+    # next to the database: vocabulary.db -> vocabulary-audio
+    return os.path.splitext(Database.manager().db_path)[0] + "-audio"
+
+
+def clip_key(engine, voice, word):
+    return hashlib.sha256(f"{engine}\0{voice}\0{word}".encode("utf-8")).hexdigest()
+
+
+def synthesize(engine, voice, word, path):
+    """Speak word into the audio file at path; runs in a pool process.
+
+    Writes to a temporary name first, so a clip is either complete or absent.
+    Returns the size of the file.
+    """
+    program, _extension = ENGINES[engine]
+    partial = f"{path}.{os.getpid()}.partial"
+    # the word goes in on stdin, so one starting with "-" is not read as an option
+    if engine == "say":
+        command = [program, "-o", partial, "-f", "-"]
+    else:
+        command = [program, "-w", partial, "--stdin"]
+    if voice:
+        command += ["-v", voice]
+    try:
+        subprocess.run(command, input=word.encode("utf-8"), check=True, timeout=GENERATE_TIMEOUT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return os.path.getsize(path)
+
+
+def play(path):
+    # start playing an audio file without waiting for it; False if there is no player
+    if sys.platform == "win32":
+        import winsound
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        return True
+    for player in PLAYERS:
+        program = shutil.which(player)
+        if program:
+            command = [program, path]
+            if player == "ffplay":
+                command[1:1] = ["-nodisp", "-autoexit", "-loglevel", "quiet"]
+            subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+    return False
+
+
+class AudioCache:
+    """Pronunciation clips on disk, generated on demand and evicted LRU.
+
+    clip(word) returns the path of a clip that is ready, or None. request()
+    and prefetch() start generating missing clips in a process pool (started
+    on first use) and return at once; request's callback gets the path, or
+    None if generation failed, and is called on a pool thread. Generated
+    clips live in directory/ab/<key><ext>, imported ones in directory/imported.
+    """
+
+    def __init__(self, directory=None, engine=None, voice="", max_bytes=DEFAULT_MAX_BYTES,
+                 workers=1):
+        self.directory = directory or default_cache_dir()
+        self.engine = engine if engine is not None else find_engine()
+        self.voice = voice
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None
+        # {key: future} for clips being generated
+        self._pending = {}
+        self.imported_dir = os.path.join(self.directory, "imported")
+        os.makedirs(self.imported_dir, exist_ok=True)
+        # {key: path} of imported clips
+        self._imported = {os.path.splitext(filename)[0]: os.path.join(self.imported_dir, filename)
+                          for filename in os.listdir(self.imported_dir)}
+        self._load()
+
+    def _load(self):
+        # {key: (path, size)}, least recently used first, from file mtimes
+        entries = []
+        for name in os.listdir(self.directory):
+            subdir = os.path.join(self.directory, name)
+            if len(name) != 2 or not os.path.isdir(subdir):
+                continue
+            for filename in os.listdir(subdir):
+                path = os.path.join(subdir, filename)
+                if filename.endswith(".partial"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, os.path.splitext(filename)[0], path, stat.st_size))
+        entries.sort()
+        self._clips = OrderedDict((key, (path, size)) for _mtime, key, path, size in entries)
+        self.total_bytes = sum(size for _path, size in self._clips.values())
+        self._evict()
+
+    @property
+    def available(self):
+        return self.engine is not None
+
+    def _key(self, word):
+        return clip_key(self.engine or "", self.voice, word)
+
+    def clip(self, word):
+        # imported clips are keyed by word alone, for any engine or voice
+        path = self._imported.get(clip_key("imported", "", word))
+        if path is not None:
+            return path
+        key = self._key(word)
+        with self._lock:
+            entry = self._clips.get(key)
+            if entry is None:
+                return None
+            self._clips.move_to_end(key)
+        path = entry[0]
+        try:
+            # the mtime orders the clips again next time the cache is opened
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+        return path
+
+    def import_clip(self, word, source):
+        # copy an audio file in as the word's pronunciation, replacing any earlier one
+        key = clip_key("imported", "", word)
+        old = self._imported.pop(key, None)
+        if old is not None:
+            os.remove(old)
+        extension = os.path.splitext(source)[1].lower() or ".wav"
+        path = os.path.join(self.imported_dir, key + extension)
+        shutil.copyfile(source, path)
+        self._imported[key] = path
+        return path
+
+    def request(self, word, callback=None):
+        path = self.clip(word)
+        if path is not None or not self.available:
+            if callback is not None:
+                callback(path)
+            return None
+        key = self._key(word)
+        path = os.path.join(self.directory, key[:2], key + ENGINES[self.engine][1])
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                if self._pool is None:
+                    # spawned rather than forked, since the GUI process has threads
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                future = self._pool.submit(synthesize, self.engine, self.voice, word, path)
+                self._pending[key] = future
+                future.add_done_callback(lambda f: self._generated(key, path, f))
+        if callback is not None:
+            future.add_done_callback(
+                lambda f: callback(None if f.cancelled() or f.exception() else path))
+        return future
+
+    def prefetch(self, words):
+        # start generating every missing clip of the words, e.g. the next popup's
+        for word in words:
+            self.request(word)
+
+    def _generated(self, key, path, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._forget(key)
+            self._clips[key] = (path, future.result())
+            self.total_bytes += future.result()
+            self._evict()
+
+    def _forget(self, key):
+        entry = self._clips.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def _evict(self):
+        # drop least recently used clips until the cache fits its budget
+        while self.total_bytes > self.max_bytes and self._clips:
+            key, (path, size) = self._clips.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        # clips still being generated are abandoned
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+
+class SetCache:
+    """A size-bounded LRU cache of set contents and set metadata.
+
+    Entries are keyed by set_id, what was loaded, and the set's data version,
+    a counter bumped by invalidate() after every write to the set, so a reader
+    never gets rows from before the last write. Metadata about every set
+    (names, descriptions, word counts) is cached under METADATA, whose version
+    is bumped by any write. Entries are bounded both in number and in the
+    total number of words they hold.
+
+    Writes made by another process are not seen until the cache is cleared.
+    Database.open() and Database.close() clear it.
+    """
+
+    METADATA = "metadata"
+
+    def __init__(self, max_entries=16, max_words=500_000):
+        self.max_entries = max_entries
+        self.max_words = max_words
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._versions = {}
+        # bumped when every set is invalidated at once
+        self._epoch = 0
+        # {key: (value, words)}
+        self._entries = OrderedDict()
+        self._words = 0
+
+    def version(self, set_id):
+        return (self._epoch, self._versions.get(set_id, 0))
+
+    def get(self, set_id, kind, load, size=len):
+        """Return the cached value of kind for set_id, calling load() on a miss.
+
+        size(value) is the number of words the value holds; values larger
+        than max_words are returned without being cached.
+        """
+        with self._lock:
+            key = (set_id, kind, self.version(set_id))
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            # Only keep it if nothing was written while it was loading
+            if key[2] == self.version(set_id):
+                self._store(key, value, size(value))
+        return value
+
+    def _store(self, key, value, words):
+        if words > self.max_words:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._words -= old[1]
+        self._entries[key] = (value, words)
+        self._words += words
+        while len(self._entries) > self.max_entries or self._words > self.max_words:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._words -= evicted
+
+    def _drop(self, stale):
+        for key in stale:
+            self._words -= self._entries.pop(key)[1]
+
+    def invalidate(self, set_id=None):
+        # Called after a write to set_id, or to every set when None
+        with self._lock:
+            if set_id is None:
+                self._epoch += 1
+                self._drop(list(self._entries))
+                return
+            for changed in (set_id, self.METADATA):
+                self._versions[changed] = self._versions.get(changed, 0) + 1
+            self._drop([key for key in self._entries
+                        if key[0] == set_id or key[0] == self.METADATA])
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "words": self._words}
+
+
+set_cache = SetCache()
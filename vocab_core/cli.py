@@ -0,0 +1,338 @@
+"""Command line interface to the vocab trainer; never loads tkinter.
+
+    python -m vocab_core list
+    python -m vocab_core import deck.csv --set "My Deck"
+    python -m vocab_core export words.csv [--set NAME]
+    python -m vocab_core quiz "My Deck" ["Other Deck"] [--words 10] [--rounds 1] [--order due]
+                              [--tag verbs] [--wrong-days 7] [--profile NAME] [--fuzzy]
+    python -m vocab_core tag verbs --set "My Deck" [--words gehen laufen] [--remove]
+    python -m vocab_core tags
+    python -m vocab_core synonyms gehen --set "My Deck" [--add "to walk"] [--remove "to go"]
+    python -m vocab_core profiles [--add NAME] [--delete NAME]
+    python -m vocab_core stats ["My Deck"] [--days 14] [--weakest 5] [--profile NAME]
+    python -m vocab_core audio [--import DIR] [--set "My Deck"] [--voice de]
+    python -m vocab_core dedup [--near] [--merge [--across-sets]] [--prefer "My Deck"]
+    python -m vocab_core sync export changes.json | import changes.json | serve | connect
+    python -m vocab_core search katz [--set "My Deck"] [--profile NAME]
+    python -m vocab_core serve [--port 8765]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Subcommands import what they need when they run, so `list` and `quiz`
+# start without loading the import/export code.
+
+
+def cmd_list(args):
+    from .sets import list_sets
+
+    for _set_id, name, description, word_count in list_sets():
+        line = f"{name} ({word_count} words)"
+        if description:
+            line += f" - {description}"
+        print(line)
+
+
+def cmd_search(args):
+    from .profiles import DEFAULT_PROFILE, get_profile_id
+    from .search import search_vocab
+    from .sets import get_set_id, get_vocab_sets
+    from .stats import word_accuracy
+
+    profile_id = DEFAULT_PROFILE
+    if args.profile is not None:
+        profile_id = get_profile_id(args.profile)
+        if profile_id is None:
+            sys.exit(f"No profile named {args.profile!r}")
+    set_id = None
+    if args.set_name is not None:
+        set_id = get_set_id(args.set_name)
+        if set_id is None:
+            sys.exit(f"No vocab set named {args.set_name!r}")
+    set_names = {set_id: name for name, (set_id, _) in get_vocab_sets().items()}
+    results = search_vocab(args.text, set_id, args.limit)
+    accuracy = word_accuracy([vocab_id for vocab_id, *_ in results], profile_id)
+    for vocab_id, set_id, word, definition in results:
+        answered = ""
+        if vocab_id in accuracy:
+            reviews, correct, _streak = accuracy[vocab_id]
+            answered = f" ({correct} / {reviews} correct)"
+        print(f"{word}: {definition} [{set_names.get(set_id)}]{answered}")
+
+
+def cmd_quiz(args):
+    from .grading import Grader, GradingOptions
+    from .review_log import ReviewLogWriter
+    from .session import TrainingSession
+    from .deckquery import session_source
+    from .profiles import DEFAULT_PROFILE, get_profile_id
+    from .sets import get_set_id
+
+    profile_id = DEFAULT_PROFILE
+    if args.profile is not None:
+        profile_id = get_profile_id(args.profile)
+        if profile_id is None:
+            sys.exit(f"No profile named {args.profile!r}")
+    set_ids = []
+    for set_name in args.set_names:
+        set_id = get_set_id(set_name)
+        if set_id is None:
+            sys.exit(f"No vocab set named {set_name!r}")
+        set_ids.append(set_id)
+
+    set_id, query = session_source(set_ids, args.tags, args.wrong_days, profile_id)
+    review_log = ReviewLogWriter()
+    session = TrainingSession(set_id, args.words, review_log, order=args.order, query=query,
+                              profile_id=profile_id,
+                              grader=Grader(GradingOptions(fuzzy=args.fuzzy)))
+    correct = total = 0
+    try:
+        for _ in range(args.rounds):
+            batch = session.next_batch()
+            if not batch:
+                print("No words to quiz." if args.order != "due" else
+                      "No words are due; --order ahead reviews the ones due soonest.")
+                break
+            answers = {}
+            for vocab_id, word, _definition in batch:
+                answers[vocab_id] = input(f"{word}: ").strip()
+            for _vocab_id, word, definition, answer, is_correct in session.submit(answers):
+                total += 1
+                if is_correct:
+                    correct += 1
+                else:
+                    print(f"  {word}: {definition} (you answered {answer!r})")
+    except (EOFError, KeyboardInterrupt):
+        print()
+    finally:
+        review_log.close()
+    print(f"Number correct: {correct} / {total}")
+
+
+def cmd_profiles(args):
+    from .profiles import (ProfileExistsError, create_profile, delete_profile,
+                           get_profile_id, list_profiles)
+
+    if args.add is not None:
+        try:
+            create_profile(args.add)
+        except ProfileExistsError as e:
+            sys.exit(str(e))
+    if args.delete is not None:
+        profile_id = get_profile_id(args.delete)
+        if profile_id is None:
+            sys.exit(f"No profile named {args.delete!r}")
+        try:
+            delete_profile(profile_id)
+        except ValueError as e:
+            sys.exit(str(e))
+    for _profile_id, name in list_profiles():
+        print(name)
+
+
+def cmd_stats(args):
+    from .profiles import DEFAULT_PROFILE, get_profile_id
+    from .sets import get_set_id
+    from . import stats
+
+    profile_id = DEFAULT_PROFILE
+    if args.profile is not None:
+        profile_id = get_profile_id(args.profile)
+        if profile_id is None:
+            sys.exit(f"No profile named {args.profile!r}")
+    set_ids = []
+    for set_name in args.set_names:
+        set_id = get_set_id(set_name)
+        if set_id is None:
+            sys.exit(f"No vocab set named {set_name!r}")
+        set_ids.append(set_id)
+
+    totals = stats.summary(profile_id, set_ids)
+    for line in stats.summary_lines(totals):
+        print(line)
+    if set_ids and args.weakest > 0:
+        for entry in totals["sets"]:
+            words = stats.weakest_words(entry["set_id"], profile_id, args.weakest)
+            for line in stats.weakest_lines(entry["name"], words):
+                print(line)
+    if args.days > 0:
+        print()
+        for day, reviews, correct in stats.reviews_per_day(profile_id, args.days):
+            date = time.strftime("%Y-%m-%d", time.gmtime(day))
+            print(f"{date}: {correct} / {reviews} correct")
+
+
+def cmd_audio(args):
+    from .audio import AudioCache
+    from .sets import get_set_id, get_vocab_list
+
+    cache = AudioCache(voice=args.voice)
+    try:
+        if args.import_dir is not None:
+            # clips named after their word, e.g. Katze.mp3
+            imported = 0
+            for filename in sorted(os.listdir(args.import_dir)):
+                path = os.path.join(args.import_dir, filename)
+                if os.path.isfile(path):
+                    cache.import_clip(os.path.splitext(filename)[0], path)
+                    imported += 1
+            print(f"Imported {imported} clips")
+        if args.set_name is not None:
+            set_id = get_set_id(args.set_name)
+            if set_id is None:
+                sys.exit(f"No vocab set named {args.set_name!r}")
+            if not cache.available:
+                sys.exit("No TTS engine found; install espeak-ng to generate clips")
+            futures = [future for future in map(cache.request, get_vocab_list(set_id))
+                       if future is not None]
+            failed = sum(1 for future in futures if future.exception() is not None)
+            print(f"Generated {len(futures) - failed} clips" + (f", {failed} failed" if failed else ""))
+    finally:
+        cache.close()
+    print(f"{cache.directory}: {cache.total_bytes / 1024 / 1024:.1f} MB "
+          f"(engine: {cache.engine or 'none'})")
+
+
+def cmd_tag(args):
+    from .sets import get_set_id, get_vocab_id, get_vocab_list
+    from .tags import tag_set, untag_words
+
+    set_id = get_set_id(args.set_name)
+    if set_id is None:
+        sys.exit(f"No vocab set named {args.set_name!r}")
+    if not args.remove:
+        tagged = tag_set(args.tag, set_id, args.words)
+        print(f"Tagged {tagged} words with {args.tag!r}")
+        return
+    words = args.words if args.words is not None else get_vocab_list(set_id)
+    vocab_ids = [vocab_id for vocab_id in (get_vocab_id(set_id, word) for word in words)
+                 if vocab_id is not None]
+    untag_words(args.tag, vocab_ids)
+    print(f"Removed {args.tag!r} from {len(vocab_ids)} words")
+
+
+def cmd_tags(args):
+    from .tags import list_tags
+
+    for tag, count in list_tags():
+        print(f"{tag} ({count} words)")
+
+
+def cmd_synonyms(args):
+    from .sets import get_set_id, get_vocab_id
+    from .synonyms import add_synonyms, remove_synonyms, synonyms_for
+
+    set_id = get_set_id(args.set_name)
+    if set_id is None:
+        sys.exit(f"No vocab set named {args.set_name!r}")
+    vocab_id = get_vocab_id(set_id, args.word)
+    if vocab_id is None:
+        sys.exit(f"No word {args.word!r} in {args.set_name!r}")
+    if args.add:
+        add_synonyms(vocab_id, args.add)
+    if args.remove:
+        remove_synonyms(vocab_id, args.remove)
+    synonyms = synonyms_for([vocab_id]).get(vocab_id, ())
+    print(f"{args.word}: " + ("; ".join(synonyms) if synonyms else "no synonyms"))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # import, export, serve, dedup and sync have their own argument parsers
+    if argv and argv[0] == "import":
+        from .importer import main as import_main
+        return import_main(argv[1:], prog="vocab_core import")
+    if argv and argv[0] == "export":
+        from .exporter import main as export_main
+        return export_main(argv[1:], prog="vocab_core export")
+    if argv and argv[0] == "serve":
+        from .server import main as serve_main
+        return serve_main(argv[1:], prog="vocab_core serve")
+    if argv and argv[0] == "dedup":
+        from .dedup import main as dedup_main
+        return dedup_main(argv[1:], prog="vocab_core dedup")
+    if argv and argv[0] == "sync":
+        from .sync import main as sync_main
+        return sync_main(argv[1:], prog="vocab_core sync")
+
+    parser = argparse.ArgumentParser(
+        prog="vocab_core", description=__doc__.splitlines()[0],
+        epilog="import, export, serve, dedup and sync take --help for their own options.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_sets = commands.add_parser("list", help="list vocab sets")
+    list_sets.set_defaults(func=cmd_list)
+    commands.add_parser("import", help="import a CSV, TSV or Anki deck")
+    commands.add_parser("export", help="export sets or review history")
+    commands.add_parser("serve", help="run the local HTTP/JSON API")
+    commands.add_parser("dedup", help="find and merge duplicate words")
+    commands.add_parser("sync", help="exchange changes with another copy of the database")
+    quiz = commands.add_parser("quiz", help="quiz yourself on a set in the terminal")
+    quiz.add_argument("set_names", nargs="*", metavar="set_name",
+                      help="sets to draw from (default: every set)")
+    quiz.add_argument("--words", type=int, default=10,
+                      help="words per round, 0 for the whole set (default: 10)")
+    quiz.add_argument("--rounds", type=int, default=1)
+    quiz.add_argument("--order", choices=("due", "ahead", "shuffle"), default="due",
+                      help="only due words; due words first, then those due soonest; "
+                           "or the whole set in random order")
+    quiz.add_argument("--tag", dest="tags", action="append", default=[],
+                      help="only words with this tag; may be repeated")
+    quiz.add_argument("--wrong-days", type=float,
+                      help="only words answered wrong in this many days")
+    quiz.add_argument("--profile", help="learner whose progress to use (default: default)")
+    quiz.add_argument("--fuzzy", action="store_true",
+                      help="also accept small typos and words in another order")
+    quiz.set_defaults(func=cmd_quiz)
+    search = commands.add_parser("search", help="search words and definitions")
+    search.add_argument("text")
+    search.add_argument("--set", dest="set_name", help="only search this vocab set")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--profile", help="learner whose answers to show (default: default)")
+    search.set_defaults(func=cmd_search)
+    tag = commands.add_parser("tag", help="tag words of a set")
+    tag.add_argument("tag")
+    tag.add_argument("--set", dest="set_name", required=True)
+    tag.add_argument("--words", nargs="+", help="words to tag (default: the whole set)")
+    tag.add_argument("--remove", action="store_true", help="take the tag off instead")
+    tag.set_defaults(func=cmd_tag)
+    tags = commands.add_parser("tags", help="list tags and how many words have them")
+    tags.set_defaults(func=cmd_tags)
+    synonyms = commands.add_parser("synonyms", help="list or change a word's accepted synonyms")
+    synonyms.add_argument("word")
+    synonyms.add_argument("--set", dest="set_name", required=True)
+    synonyms.add_argument("--add", nargs="+", metavar="SYNONYM", help="also accept these answers")
+    synonyms.add_argument("--remove", nargs="+", metavar="SYNONYM")
+    synonyms.set_defaults(func=cmd_synonyms)
+    profiles = commands.add_parser("profiles", help="list learner profiles")
+    profiles.add_argument("--add", metavar="NAME", help="create a profile first")
+    profiles.add_argument("--delete", metavar="NAME",
+                          help="delete a profile and its progress and settings first")
+    profiles.set_defaults(func=cmd_profiles)
+    stats = commands.add_parser("stats", help="show accuracy, streaks and mastery")
+    stats.add_argument("set_names", nargs="*", metavar="set_name",
+                       help="sets to show mastery for (default: every set)")
+    stats.add_argument("--days", type=int, default=14,
+                       help="reviews per day for this many days (default: 14)")
+    stats.add_argument("--profile", help="learner to show (default: default)")
+    stats.add_argument("--weakest", type=int, default=5,
+                       help="words with the lowest accuracy to list per set (0 for none)")
+    stats.set_defaults(func=cmd_stats)
+    audio = commands.add_parser("audio", help="import or generate pronunciation clips")
+    audio.add_argument("--import", dest="import_dir", metavar="DIR",
+                       help="import audio files named after their words")
+    audio.add_argument("--set", dest="set_name", help="generate clips for every word of a set")
+    audio.add_argument("--voice", default="", help="TTS voice, e.g. de (default: the engine's)")
+    audio.set_defaults(func=cmd_audio)
+    for command in (list_sets, quiz, search, tag, tags, synonyms, profiles, stats, audio):
+        command.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    from .database import Database
+
+    Database.open(args.db)
+    try:
+        args.func(args)
+    finally:
+        Database.close()
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+from .cache import set_cache
+from .metrics import ProfiledConnection, count_statement, metrics
+from .migrations import migrate
+
+
+# Applied to every connection when it is opened. WAL lets readers run while a
+# writer holds the database, and NORMAL sync is safe under WAL.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -16000),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("busy_timeout", 5000),
+)
+
+
+def default_db_path():
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # vocabulary.db lives next to app.py, one level above this package
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    return os.path.join(base_path, 'vocabulary.db')
+
+
+class ConnectionManager:
+    """Keeps one long-lived sqlite3 connection per thread.
+
+    A thread that is about to exit calls release() to close its connection.
+    Connections of threads that exited without doing so are closed by
+    release_finished(), which also runs whenever a connection is opened, so
+    there are never many more connections than live threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # {connection: thread that opened it}
+        self._connections = {}
+
+    def _connect(self):
+        # isolation_level=None: transactions are opened explicitly in transaction()
+        if metrics.enabled:
+            conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                   check_same_thread=False, factory=ProfiledConnection)
+            conn.set_trace_callback(count_statement)
+            metrics.count("db.connections")
+        else:
+            conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                   check_same_thread=False)
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        self.release_finished()
+        with self._lock:
+            self._connections[conn] = threading.current_thread()
+        return conn
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in a single write transaction on this thread's connection.
+
+        Nested uses join the outermost transaction, which commits when it exits
+        and rolls everything back if an exception escapes.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    @contextmanager
+    def snapshot(self):
+        """Read a consistent view of the database without taking the write lock.
+
+        Under WAL, writers on other connections carry on while the block runs.
+        Inside a transaction() this just joins it.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            yield conn
+            return
+
+        conn.execute("BEGIN DEFERRED")
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.depth = 0
+            conn.execute("COMMIT")
+
+    def release(self):
+        # close the calling thread's connection, if it has one; the next
+        # connection() call on this thread opens a new one
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if self._connections.pop(conn, None) is None:
+                # already closed by close_all() or release_finished()
+                return
+        conn.close()
+
+    def release_finished(self):
+        # close the connections of threads that have exited; returns how many
+        with self._lock:
+            finished = [conn for conn, thread in self._connections.items()
+                        if not thread.is_alive()]
+            for conn in finished:
+                del self._connections[conn]
+        for conn in finished:
+            conn.close()
+        return len(finished)
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = list(self._connections), {}
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class Database:
+    _manager = None
+    _manager_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db_path=None):
+        with cls._manager_lock:
+            if cls._manager is not None:
+                cls._manager.close_all()
+            cls._manager = ConnectionManager(db_path or default_db_path())
+            # cached sets belong to whichever database was open before
+            set_cache.invalidate()
+            # open the main thread's connection now so the pragmas and any
+            # pending schema upgrades run at startup
+            migrate(cls._manager)
+            return cls._manager
+
+    @classmethod
+    def manager(cls):
+        if cls._manager is None:
+            return cls.open()
+        return cls._manager
+
+    @classmethod
+    def get_connection(cls):
+        if metrics.enabled:
+            with metrics.timer("db.get_connection"):
+                return cls.manager().connection()
+        return cls.manager().connection()
+
+    @classmethod
+    def transaction(cls):
+        if metrics.enabled:
+            metrics.count("db.transactions")
+        return cls.manager().transaction()
+
+    @classmethod
+    def snapshot(cls):
+        return cls.manager().snapshot()
+
+    @classmethod
+    def release(cls):
+        # called by a worker thread when it is done with the database
+        manager = cls._manager
+        if manager is not None:
+            manager.release()
+
+    @classmethod
+    def release_finished(cls):
+        manager = cls._manager
+        if manager is not None:
+            manager.release_finished()
+
+    @classmethod
+    def close(cls):
+        with cls._manager_lock:
+            if cls._manager is not None:
+                cls._manager.close_all()
+                cls._manager = None
+            set_cache.invalidate()
@@ -0,0 +1,106 @@
+import json
+import random
+from array import array
+from collections import OrderedDict
+
+from .cache import set_cache
+from .database import Database
+
+
+FETCH_SIZE = 10000
+
+
+class Deck:
+    """Cycles through a set's words in shuffled order, holding only their ids.
+
+    The vocab_ids live in an array('i') (4 bytes each) that is shuffled in
+    place and read through memoryview slices, so neither a reshuffle nor a
+    batch copies the deck. Word and definition text is read from SQLite only
+    for the words a batch actually shows, with the most recent kept in a
+    small cache. The deck is reloaded when the set's data version changes.
+
+    Given a DeckQuery, the deck holds the words it matches instead of one
+    set's, and is reloaded after a write to any set.
+    """
+
+    def __init__(self, set_id, rng=None, max_cached=2048, query=None):
+        self.set_id = set_id
+        self.random = rng or random.Random()
+        self.max_cached = max_cached
+        self.query = query
+        self._version_key = set_id if query is None else set_cache.METADATA
+        self.load()
+
+    def load(self):
+        self.version = set_cache.version(self._version_key)
+        self.ids = array("i")
+        if self.query is not None:
+            self.ids.extend(self.query.iter_ids())
+        else:
+            c = Database.get_connection().execute(
+                "SELECT vocab_id FROM vocab WHERE set_id=? ORDER BY vocab_id", (self.set_id,))
+            while True:
+                rows = c.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                self.ids.extend(vocab_id for vocab_id, in rows)
+            c.close()
+        # {vocab_id: (word, definition)}
+        self._text = OrderedDict()
+        self.shuffle()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def shuffle(self):
+        self.random.shuffle(self.ids)
+        self.position = 0
+
+    def next_ids(self, number_of_words, exclude=()):
+        # the next number_of_words ids, reshuffling when the deck runs out;
+        # 0 means every word. Ids in exclude are skipped.
+        if self.version != set_cache.version(self._version_key):
+            self.load()
+        size = len(self.ids)
+        wanted = size if number_of_words <= 0 else min(number_of_words, size)
+        skip = set(exclude)
+        batch = []
+        scanned = 0
+        while len(batch) < wanted and scanned < size:
+            if self.position >= size:
+                self.shuffle()
+            end = min(size, self.position + wanted - len(batch))
+            with memoryview(self.ids)[self.position:end] as view:
+                for vocab_id in view:
+                    if vocab_id not in skip:
+                        skip.add(vocab_id)
+                        batch.append(vocab_id)
+            scanned += end - self.position
+            self.position = end
+        return batch
+
+    def rows(self, vocab_ids):
+        # rows in the format [(vocab_id, word, definition)], in the order given;
+        # ids deleted since the deck was loaded are left out
+        missing = [vocab_id for vocab_id in vocab_ids if vocab_id not in self._text]
+        if missing:
+            c = Database.get_connection().execute(
+                "SELECT vocab_id, word, definition FROM vocab "
+                "WHERE vocab_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(missing),))
+            for vocab_id, word, definition in c.fetchall():
+                self._text[vocab_id] = (word, definition)
+            c.close()
+        rows = []
+        for vocab_id in vocab_ids:
+            text = self._text.get(vocab_id)
+            if text is not None:
+                self._text.move_to_end(vocab_id)
+                rows.append((vocab_id, *text))
+        while len(self._text) > self.max_cached:
+            self._text.popitem(last=False)
+        return rows
+
+    def next_batch(self, number_of_words, exclude=()):
+        # Same shape as Scheduler.next_batch, so a session can use either
+        return self.rows(self.next_ids(number_of_words, exclude))
@@ -0,0 +1,125 @@
+import json
+import time
+
+from .database import Database
+from .profiles import DEFAULT_PROFILE
+from .review_log import KEEP_DAYS
+from .scheduler import DAY
+
+
+FETCH_SIZE = 10000
+
+
+class DeckQuery:
+    """Which words a training session draws from, compiled into one SQL query.
+
+    Filters combine with AND and an empty filter matches everything:
+    set_ids keeps words of any of those sets, tags words carrying any of those
+    tags, and wrong_since/wrong_until (unix times) words answered wrong in
+    that window. The query walks the profile's review_state, so batches come
+    out earliest due first, the same as Scheduler's, and ids are streamed
+    rather than loaded set by set.
+    """
+
+    def __init__(self, set_ids=(), tags=(), wrong_since=None, wrong_until=None,
+                 profile_id=DEFAULT_PROFILE):
+        self.profile_id = profile_id
+        self.set_ids = list(set_ids)
+        self.tags = list(tags)
+        self.wrong_since = wrong_since
+        self.wrong_until = wrong_until
+
+    @classmethod
+    def wrong_in_last(cls, days, now=None, **filters):
+        now = time.time() if now is None else now
+        return cls(wrong_since=now - days * DAY, **filters)
+
+    def _where(self, exclude=(), due_by=None):
+        clauses = ["r.profile_id = ?"]
+        params = [self.profile_id]
+        if len(self.set_ids) == 1:
+            # a single set walks the (set_id, due) index in order
+            clauses.append("r.set_id = ?")
+            params.append(self.set_ids[0])
+        elif self.set_ids:
+            clauses.append("r.set_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(self.set_ids))
+        if self.tags:
+            clauses.append("""r.vocab_id IN (
+                SELECT vocab_id FROM vocab_tags
+                WHERE tag IN (SELECT value FROM json_each(?)))""")
+            params.append(json.dumps(self.tags))
+        if self.wrong_since is not None or self.wrong_until is not None:
+            since = self.wrong_since if self.wrong_since is not None else 0
+            until = self.wrong_until if self.wrong_until is not None else float("inf")
+            wrong = """SELECT vocab_id FROM review_log
+                       WHERE profile_id = ? AND reviewed_at >= ? AND reviewed_at < ?
+                         AND correct = 0"""
+            params += [self.profile_id, since, until]
+            # Answers older than the log keeps are only in the daily rollups
+            if since < time.time() - KEEP_DAYS * DAY:
+                wrong += """ UNION SELECT vocab_id FROM review_rollup
+                             WHERE profile_id = ? AND day >= ? AND day * ? < ?
+                               AND correct < reviews"""
+                params += [self.profile_id, int(since // DAY), DAY, until]
+            clauses.append(f"r.vocab_id IN ({wrong})")
+        if exclude:
+            clauses.append("r.vocab_id NOT IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(exclude)))
+        if due_by is not None:
+            clauses.append("r.due <= ?")
+            params.append(due_by)
+        return " AND ".join(clauses), params
+
+    def next_batch(self, number_of_words, exclude=(), ahead=False, now=None):
+        # rows in the format [(vocab_id, word, definition)], earliest due
+        # first; 0 means every matching word. Only words due by now, unless
+        # ahead, as in Scheduler.next_batch.
+        due_by = None if ahead else (time.time() if now is None else now)
+        where, params = self._where(exclude, due_by)
+        c = Database.get_connection().execute(f"""
+            SELECT v.vocab_id, v.word, v.definition
+            FROM review_state r JOIN vocab v ON v.vocab_id = r.vocab_id
+            WHERE {where}
+            ORDER BY r.due
+            LIMIT ?""", params + [number_of_words if number_of_words > 0 else -1])
+        batch = c.fetchall()
+        c.close()
+        return batch
+
+    def iter_ids(self):
+        # every matching vocab_id, fetched FETCH_SIZE at a time
+        where, params = self._where()
+        c = Database.get_connection().execute(
+            f"SELECT r.vocab_id FROM review_state r WHERE {where} ORDER BY r.vocab_id", params)
+        try:
+            while True:
+                rows = c.fetchmany(FETCH_SIZE)
+                if not rows:
+                    return
+                for vocab_id, in rows:
+                    yield vocab_id
+        finally:
+            c.close()
+
+    def count(self):
+        where, params = self._where()
+        return Database.get_connection().execute(
+            f"SELECT COUNT(*) FROM review_state r WHERE {where}", params).fetchone()[0]
+
+
+def session_source(set_ids, tags=(), wrong_days=None, profile_id=DEFAULT_PROFILE):
+    """Return the (set_id, query) to start a TrainingSession with.
+
+    One set without filters is scheduled directly (query is None); anything
+    else becomes a DeckQuery and set_id is None unless there is a single set.
+    """
+    set_ids = list(set_ids)
+    tags = list(tags)
+    set_id = set_ids[0] if len(set_ids) == 1 else None
+    if wrong_days:
+        return set_id, DeckQuery.wrong_in_last(wrong_days, set_ids=set_ids, tags=tags,
+                                               profile_id=profile_id)
+    if set_id is None or tags:
+        return set_id, DeckQuery(set_ids=set_ids, tags=tags, profile_id=profile_id)
+    return set_id, None
@@ -0,0 +1,368 @@
+"""Find duplicate words, within or across vocab sets, and merge them.
+
+    python -m vocab_core dedup [--near] [--threshold 0.8] [--merge [--across-sets]]
+                               [--prefer "My Deck"]
+
+Exact duplicates are rows whose word and definition are equal after the
+grading normalization (case, accents, punctuation and spacing). They are
+found by hashing each row into a temporary table and grouping on the hash.
+
+Near duplicates are the same word with similar definitions: the Jaccard
+similarity of their character trigrams is at least the threshold. Each
+definition gets a one-permutation MinHash signature of NUM_BINS values;
+LSH puts rows in the same bucket when any band of ROWS_PER_BAND values
+matches, and only rows sharing a bucket are ever compared, so nothing is
+compared all-pairs. Rows are streamed and the hashes live in SQLite temp
+tables, so memory stays flat however many rows there are.
+"""
+import argparse
+import json
+import sys
+from itertools import combinations
+
+from .cache import set_cache
+from .database import Database
+from .grading import GradingOptions
+
+
+FETCH_SIZE = 10000
+NUM_BINS = 16
+ROWS_PER_BAND = 4
+# buckets bigger than this are skipped rather than compared pairwise
+MAX_BUCKET = 200
+# groups merged per transaction
+MERGE_BATCH = 500
+MASK = (1 << 63) - 1
+
+
+def shingles(text):
+    # character trigrams of the normalized text, padded so short words count
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+def signature(grams):
+    # one-permutation MinHash: each trigram's hash goes to one of NUM_BINS
+    # bins and a bin keeps its smallest; empty bins stay None
+    bins = [None] * NUM_BINS
+    for gram in grams:
+        h = hash(gram) & MASK
+        i = h % NUM_BINS
+        if bins[i] is None or h < bins[i]:
+            bins[i] = h
+    return bins
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _Groups:
+    # union-find over vocab_ids
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent.setdefault(x, x)
+        while parent != x:
+            grandparent = self.parent[parent]
+            self.parent[x] = grandparent
+            x, parent = parent, grandparent
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def groups(self):
+        members = {}
+        for x in self.parent:
+            members.setdefault(self.find(x), []).append(x)
+        return [sorted(ids) for ids in members.values() if len(ids) > 1]
+
+
+def _rows(conn, set_ids):
+    # (vocab_id, set_id, word, definition) in vocab_id order, FETCH_SIZE at a time
+    if set_ids:
+        c = conn.execute("""
+            SELECT vocab_id, set_id, word, definition FROM vocab
+            WHERE set_id IN (SELECT value FROM json_each(?)) ORDER BY vocab_id""",
+            (json.dumps(list(set_ids)),))
+    else:
+        c = conn.execute("SELECT vocab_id, set_id, word, definition FROM vocab ORDER BY vocab_id")
+    try:
+        while True:
+            rows = c.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            yield rows
+    finally:
+        c.close()
+
+
+def _fetch(conn, vocab_ids):
+    # {vocab_id: (set_id, word, definition)}
+    found = {}
+    vocab_ids = list(vocab_ids)
+    for start in range(0, len(vocab_ids), FETCH_SIZE):
+        c = conn.execute("""
+            SELECT vocab_id, set_id, word, definition FROM vocab
+            WHERE vocab_id IN (SELECT value FROM json_each(?))""",
+            (json.dumps(vocab_ids[start:start + FETCH_SIZE]),))
+        found.update((vocab_id, rest) for vocab_id, *rest in c.fetchall())
+        c.close()
+    return found
+
+
+def _chunks(c):
+    # the JSON id lists of a bucket query as lists, FETCH_SIZE buckets at a time
+    try:
+        while True:
+            rows = c.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            yield [json.loads(ids) for ids, in rows]
+    finally:
+        c.close()
+
+
+def find_duplicates(set_ids=(), near=False, threshold=0.8, per_set=False, options=None):
+    """Return duplicate groups as [(kind, [vocab_id])], kind "exact" or "near".
+
+    set_ids limits the search to those sets (default: every set); per_set
+    only groups rows of the same set. With near, rows with the same word and
+    definitions at least `threshold` similar are grouped too; a group is
+    "exact" only if all of its rows are exact duplicates of each other.
+    """
+    options = options or GradingOptions()
+    conn = Database.get_connection()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_exact (key INTEGER, vocab_id INTEGER)")
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS dedup_bands (key INTEGER, exact INTEGER, vocab_id INTEGER)""")
+    conn.execute("DELETE FROM temp.dedup_exact")
+    conn.execute("DELETE FROM temp.dedup_bands")
+    try:
+        for rows in _rows(conn, set_ids):
+            exact = []
+            bands = []
+            for vocab_id, set_id, word, definition in rows:
+                scope = set_id if per_set else 0
+                word = options.normalize(word)
+                definition = options.normalize(definition)
+                exact_key = hash((scope, word, definition))
+                exact.append((exact_key, vocab_id))
+                if near:
+                    bins = signature(shingles(definition))
+                    for band in range(0, NUM_BINS, ROWS_PER_BAND):
+                        key = hash((scope, word, band, tuple(bins[band:band + ROWS_PER_BAND])))
+                        bands.append((key, exact_key, vocab_id))
+            conn.executemany("INSERT INTO temp.dedup_exact VALUES (?, ?)", exact)
+            conn.executemany("INSERT INTO temp.dedup_bands VALUES (?, ?, ?)", bands)
+
+        groups = _Groups()
+        exact_pairs = _Groups()
+        c = conn.execute("""
+            SELECT json_group_array(vocab_id) FROM temp.dedup_exact
+            GROUP BY key HAVING COUNT(*) > 1""")
+        for buckets in _chunks(c):
+            # hashes can collide, so members are checked against each other
+            texts = _fetch(conn, {vocab_id for ids in buckets for vocab_id in ids})
+            for ids in buckets:
+                by_text = {}
+                for vocab_id in ids:
+                    set_id, word, definition = texts[vocab_id]
+                    scope = set_id if per_set else 0
+                    key = (scope, options.normalize(word), options.normalize(definition))
+                    by_text.setdefault(key, []).append(vocab_id)
+                for same in by_text.values():
+                    for vocab_id in same[1:]:
+                        groups.union(same[0], vocab_id)
+                        exact_pairs.union(same[0], vocab_id)
+
+        if near:
+            # exact duplicates are already grouped, so a bucket holds one row
+            # of each; many copies of a word then never fill a bucket
+            c = conn.execute("""
+                SELECT json_group_array(vocab_id) FROM (
+                    SELECT key, MIN(vocab_id) AS vocab_id FROM temp.dedup_bands
+                    GROUP BY key, exact)
+                GROUP BY key HAVING COUNT(*) BETWEEN 2 AND ?""", (MAX_BUCKET,))
+            for buckets in _chunks(c):
+                texts = _fetch(conn, {vocab_id for ids in buckets for vocab_id in ids})
+                grams = {vocab_id: shingles(options.normalize(definition))
+                         for vocab_id, (_set_id, _word, definition) in texts.items()}
+                for ids in buckets:
+                    for a, b in combinations(ids, 2):
+                        if a in grams and b in grams and groups.find(a) != groups.find(b):
+                            if jaccard(grams[a], grams[b]) >= threshold:
+                                groups.union(a, b)
+    finally:
+        conn.execute("DELETE FROM temp.dedup_exact")
+        conn.execute("DELETE FROM temp.dedup_bands")
+
+    result = []
+    for ids in groups.groups():
+        root = exact_pairs.find(ids[0])
+        kind = "exact" if all(exact_pairs.find(vocab_id) == root for vocab_id in ids) else "near"
+        result.append((kind, ids))
+    result.sort(key=lambda group: group[1][0])
+    return result
+
+
+def merge_rows(conn, moves):
+    """Fold rows into others inside the caller's transaction.
+
+    moves is [(kept vocab_id, its set_id, removed vocab_id)]. The removed
+    rows' review history, statistics (their set_stats share included), tags
+    and synonyms move to the kept rows, each profile keeps the further
+    advanced review state, and the removed rows are deleted.
+    """
+    conn.executemany(
+        "UPDATE review_log SET vocab_id = ?, set_id = ? WHERE vocab_id = ?", moves)
+    conn.executemany("""
+        INSERT INTO review_rollup (profile_id, vocab_id, day, set_id, reviews, correct)
+        SELECT profile_id, ?1, day, ?2, reviews, correct FROM review_rollup
+        WHERE vocab_id = ?3
+        ON CONFLICT (profile_id, vocab_id, day) DO UPDATE SET
+            reviews = reviews + excluded.reviews,
+            correct = correct + excluded.correct""", moves)
+    conn.executemany(
+        "DELETE FROM review_rollup WHERE vocab_id = ?",
+        [(vocab_id,) for _keeper, _set_id, vocab_id in moves])
+    # a removed word's totals in set_stats go with it to the kept word's set
+    conn.executemany("""
+        INSERT INTO set_stats (profile_id, set_id, reviews, correct)
+        SELECT profile_id, ?2, reviews, correct FROM word_stats
+        WHERE vocab_id = ?3 AND set_id <> ?2
+        ON CONFLICT (profile_id, set_id) DO UPDATE SET
+            reviews = reviews + excluded.reviews,
+            correct = correct + excluded.correct""", moves)
+    conn.executemany("""
+        UPDATE set_stats AS s SET reviews = s.reviews - w.reviews, correct = s.correct - w.correct
+        FROM word_stats AS w
+        WHERE w.vocab_id = ?3 AND w.set_id <> ?2
+          AND s.profile_id = w.profile_id AND s.set_id = w.set_id""", moves)
+    # the kept word's streak (and so its set's mastered count) stays its own
+    conn.executemany("""
+        INSERT INTO word_stats (profile_id, vocab_id, set_id, reviews, correct, streak,
+                                last_reviewed)
+        SELECT profile_id, ?1, ?2, reviews, correct, 0, last_reviewed FROM word_stats
+        WHERE vocab_id = ?3
+        ON CONFLICT (profile_id, vocab_id) DO UPDATE SET
+            reviews = reviews + excluded.reviews,
+            correct = correct + excluded.correct,
+            last_reviewed = MAX(last_reviewed, excluded.last_reviewed)""", moves)
+    pairs = [(keeper, vocab_id) for keeper, _set_id, vocab_id in moves]
+    conn.executemany("""
+        UPDATE review_state AS k SET
+            ease = d.ease, interval = d.interval,
+            repetitions = d.repetitions, due = d.due
+        FROM review_state AS d
+        WHERE k.vocab_id = ?1 AND d.vocab_id = ?2 AND d.profile_id = k.profile_id
+          AND d.repetitions > k.repetitions""", pairs)
+    conn.executemany("""
+        INSERT OR IGNORE INTO vocab_tags (tag, vocab_id)
+        SELECT tag, ?1 FROM vocab_tags WHERE vocab_id = ?2""", pairs)
+    conn.executemany("""
+        INSERT OR IGNORE INTO vocab_synonyms (vocab_id, synonym)
+        SELECT ?1, synonym FROM vocab_synonyms WHERE vocab_id = ?2""", pairs)
+    conn.executemany(
+        "DELETE FROM vocab WHERE vocab_id = ?", [(vocab_id,) for _keeper, vocab_id in pairs])
+
+
+def merge_duplicates(groups, prefer=(), batch_size=MERGE_BATCH):
+    """Keep one row of each group and fold the others into it.
+
+    The kept row is the one in the set listed first in prefer (set_ids),
+    else the oldest. The others' review history, statistics and tags move to
+    it, and each profile keeps the further advanced of their review states;
+    then the others are deleted. Runs batch_size groups per transaction, so a
+    long merge never holds the write lock for long; rows deleted since the
+    groups were found are skipped. Returns the number of rows removed.
+    """
+    rank = {set_id: i for i, set_id in enumerate(prefer)}
+    removed = 0
+    groups = [ids for _kind, ids in groups]
+    for start in range(0, len(groups), batch_size):
+        touched = set()
+        with Database.transaction() as conn:
+            batch = groups[start:start + batch_size]
+            existing = _fetch(conn, {vocab_id for ids in batch for vocab_id in ids})
+            # (keeper, keeper's set_id, removed)
+            moves = []
+            for ids in batch:
+                ids = [vocab_id for vocab_id in ids if vocab_id in existing]
+                if len(ids) < 2:
+                    continue
+                keeper = min(ids, key=lambda vocab_id: (
+                    rank.get(existing[vocab_id][0], len(rank)), vocab_id))
+                keeper_set = existing[keeper][0]
+                for vocab_id in ids:
+                    touched.add(existing[vocab_id][0])
+                    if vocab_id != keeper:
+                        moves.append((keeper, keeper_set, vocab_id))
+            if not moves:
+                continue
+            merge_rows(conn, moves)
+            removed += len(moves)
+        for set_id in touched:
+            set_cache.invalidate(set_id)
+    return removed
+
+
+def main(argv=None, prog=None):
+    from .sets import get_set_id, get_vocab_sets
+
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("--set", dest="set_names", action="append", default=[],
+                        help="only look in this set; may be repeated (default: every set)")
+    parser.add_argument("--near", action="store_true",
+                        help="also group the same word with similar definitions")
+    parser.add_argument("--threshold", type=float, default=0.8,
+                        help="trigram similarity for --near, 0 to 1 (default: 0.8)")
+    parser.add_argument("--per-set", action="store_true",
+                        help="only group duplicates within the same set")
+    parser.add_argument("--merge", action="store_true",
+                        help="merge each group into one row instead of just listing them; "
+                             "only within a set unless --across-sets is given")
+    parser.add_argument("--across-sets", action="store_true",
+                        help="with --merge, also merge copies in different sets, "
+                             "removing them from all but one set")
+    parser.add_argument("--prefer", action="append", default=[], metavar="SET",
+                        help="keep the row from this set when merging; may be repeated")
+    parser.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        set_ids = []
+        for set_name in args.set_names + args.prefer:
+            set_id = get_set_id(set_name)
+            if set_id is None:
+                sys.exit(f"No vocab set named {set_name!r}")
+            set_ids.append(set_id)
+        # merging across sets takes words out of sets, so it must be asked for
+        per_set = args.per_set or (args.merge and not args.across_sets)
+        groups = find_duplicates(set_ids[:len(args.set_names)], near=args.near,
+                                 threshold=args.threshold, per_set=per_set)
+        set_names = {set_id: name for name, (set_id, _) in get_vocab_sets().items()}
+        rows = _fetch(Database.get_connection(), {vocab_id for _kind, ids in groups for vocab_id in ids})
+        for kind, ids in groups:
+            print(f"{kind}:")
+            for vocab_id in ids:
+                set_id, word, definition = rows[vocab_id]
+                print(f"  {word}: {definition} [{set_names.get(set_id)}]")
+        print(f"{len(groups)} groups, {sum(len(ids) - 1 for _kind, ids in groups)} duplicate rows")
+        if args.merge and groups:
+            removed = merge_duplicates(groups, prefer=set_ids[len(args.set_names):])
+            print(f"Merged; removed {removed} rows")
+    finally:
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
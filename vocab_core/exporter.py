@@ -0,0 +1,158 @@
+"""Stream vocab sets and review history out of the database as CSV or JSON Lines.
+
+    python -m vocab_core export words.csv [--set NAME]
+    python -m vocab_core export history.jsonl.gz --history
+    python -m vocab_core export backup.zip --archive
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+import time
+import zipfile
+
+from .database import Database
+
+
+FETCH_SIZE = 1000
+
+VOCAB_FIELDS = ("set_name", "word", "definition")
+SET_FIELDS = ("set_id", "name", "description")
+HISTORY_FIELDS = ("review_id", "vocab_id", "set_id", "reviewed_at", "answer", "correct",
+                  "profile_id")
+
+
+def iter_query(conn, sql, params=(), fetch_size=FETCH_SIZE):
+    # Rows are pulled fetch_size at a time, so memory stays flat however
+    # large the table is
+    c = conn.execute(sql, params)
+    try:
+        while True:
+            rows = c.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        c.close()
+
+
+def iter_vocab(conn, set_name=None):
+    sql = """
+        SELECT s.name, v.word, v.definition
+        FROM vocab v JOIN vocab_sets s ON s.set_id = v.set_id"""
+    if set_name is None:
+        return iter_query(conn, sql + " ORDER BY v.set_id, v.vocab_id")
+    return iter_query(conn, sql + " WHERE s.name = ? ORDER BY v.vocab_id", (set_name,))
+
+
+def iter_sets(conn):
+    return iter_query(conn, "SELECT set_id, name, description FROM vocab_sets ORDER BY set_id")
+
+
+def iter_history(conn):
+    return iter_query(conn, """
+        SELECT review_id, vocab_id, set_id, reviewed_at, answer, correct, profile_id
+        FROM review_log ORDER BY review_id""")
+
+
+def write_rows(f, fields, rows, fmt):
+    """Write rows to a text file as csv or jsonl; returns the number written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    elif fmt == "jsonl":
+        for row in rows:
+            f.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return count
+
+
+def format_for(path):
+    # words.csv, words.jsonl and their .gz versions
+    name = path[:-3] if path.endswith(".gz") else path
+    for fmt in ("csv", "jsonl"):
+        if name.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Can't tell the export format from {path}; use .csv or .jsonl")
+
+
+def open_output(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export_vocab(path, set_name=None):
+    fmt = format_for(path)
+    with Database.snapshot() as conn, open_output(path) as f:
+        return write_rows(f, VOCAB_FIELDS, iter_vocab(conn, set_name), fmt)
+
+
+def export_history(path):
+    fmt = format_for(path)
+    with Database.snapshot() as conn, open_output(path) as f:
+        return write_rows(f, HISTORY_FIELDS, iter_history(conn), fmt)
+
+
+def export_archive(path):
+    """Write every set, word and review to a deflate-compressed zip.
+
+    All three files come from one snapshot, and each is streamed into the
+    archive as it is read.
+    """
+    counts = {}
+    with Database.snapshot() as conn, \
+            zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, fields, rows, fmt in (
+                ("sets.jsonl", SET_FIELDS, iter_sets(conn), "jsonl"),
+                ("vocab.csv", VOCAB_FIELDS, iter_vocab(conn), "csv"),
+                ("review_log.jsonl", HISTORY_FIELDS, iter_history(conn), "jsonl")):
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, "w", force_zip64=True) as raw:
+                f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                counts[name] = write_rows(f, fields, rows, fmt)
+                f.flush()
+                f.detach()
+    return counts
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="output file (.csv, .jsonl, optionally .gz; .zip with --archive)")
+    what = parser.add_mutually_exclusive_group()
+    what.add_argument("--set", dest="set_name", help="only export this vocab set")
+    what.add_argument("--history", action="store_true", help="export the review log")
+    what.add_argument("--archive", action="store_true",
+                      help="write sets, words and review log to one zip")
+    parser.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        if args.archive:
+            counts = export_archive(args.path)
+            summary = ", ".join(f"{count} rows to {name}" for name, count in counts.items())
+        elif args.history:
+            summary = f"{export_history(args.path)} reviews"
+        else:
+            summary = f"{export_vocab(args.path, args.set_name)} words"
+    except (ValueError, OSError, sqlite3.Error) as e:
+        parser.exit(1, f"Export failed: {e}\n")
+    finally:
+        Database.close()
+    print(f"Exported {summary}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import re
+import string
+import unicodedata
+
+
+# A definition can list several accepted answers, e.g. "the cat; the kitty".
+# "/" is not a separator: "km/h" and "and/or" are single answers.
+ALTERNATIVE_SEPARATORS = re.compile(r"\s*[;|]\s*")
+PUNCTUATION = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
+
+class GradingOptions:
+    """How forgiving grading is.
+
+    With fuzzy off (the default), an answer must equal the definition (or
+    one of its alternatives) after normalization. With fuzzy on, the same words in any
+    order are accepted, as are answers within typo_ratio * length edits
+    (at most max_typos) of an alternative.
+    """
+
+    def __init__(self, casefold=True, strip_accents=True, strip_punctuation=True,
+                 fuzzy=False, typo_ratio=0.15, max_typos=3):
+        self.casefold = casefold
+        self.strip_accents = strip_accents
+        self.strip_punctuation = strip_punctuation
+        self.fuzzy = fuzzy
+        self.typo_ratio = typo_ratio
+        self.max_typos = max_typos
+
+    def normalize(self, text):
+        if self.strip_accents:
+            text = "".join(c for c in unicodedata.normalize("NFKD", text)
+                           if not unicodedata.combining(c))
+        if self.casefold:
+            text = text.casefold()
+        if self.strip_punctuation:
+            text = text.translate(PUNCTUATION)
+        return " ".join(text.split())
+
+    def allowed_typos(self, length):
+        return min(self.max_typos, int(length * self.typo_ratio))
+
+
+def within_distance(a, b, k):
+    """Return whether the Levenshtein distance between a and b is at most k.
+
+    Only the diagonal band of width 2k + 1 is computed, and the scan stops as
+    soon as every cell in a row exceeds k, so the cost is O(k * len) at worst
+    and usually far less.
+    """
+    if abs(len(a) - len(b)) > k:
+        return False
+    if k == 0:
+        return a == b
+    if len(a) > len(b):
+        a, b = b, a
+    too_far = k + 1
+    previous = [j if j <= k else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - k)
+        hi = min(len(b), i + k)
+        current = [too_far] * (len(b) + 1)
+        if i <= k:
+            current[0] = i
+        row_min = current[0]
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > k:
+            return False
+        previous = current
+    return previous[len(b)] <= k
+
+
+class PreparedDefinition:
+    """A definition's accepted answers, normalized once and reused for every grade."""
+
+    __slots__ = ("definition", "synonyms", "exact", "token_sets", "alternatives")
+
+    def __init__(self, definition, options, synonyms=()):
+        self.definition = definition
+        self.synonyms = synonyms
+        alternatives = [definition]
+        alternatives += [alt for alt in ALTERNATIVE_SEPARATORS.split(definition) if alt]
+        alternatives += synonyms
+        normalized = {options.normalize(alt) for alt in alternatives}
+        normalized.discard("")
+        self.exact = frozenset(normalized)
+        self.token_sets = frozenset(frozenset(alt.split()) for alt in normalized)
+        self.alternatives = tuple(normalized)
+
+
+class Grader:
+    """Grades answers against definitions, caching each prepared definition.
+
+    The cache is keyed by vocab_id and checked against the definition text
+    and synonyms, so an edited word is prepared again rather than graded stale.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or GradingOptions()
+        self._prepared = {}
+        # {vocab_id: (synonym, ...)} as last given to prepare()
+        self._synonyms = {}
+
+    def prepare(self, rows, synonyms=None):
+        # rows in the format [(vocab_id, definition)], e.g. a whole set up front;
+        # synonyms is {vocab_id: (synonym, ...)} from vocab_synonyms for those rows
+        synonyms = synonyms or {}
+        for vocab_id, definition in rows:
+            if vocab_id in synonyms:
+                self._synonyms[vocab_id] = tuple(synonyms[vocab_id])
+            else:
+                self._synonyms.pop(vocab_id, None)
+            self._prepared_for(vocab_id, definition)
+
+    def _prepared_for(self, vocab_id, definition):
+        prepared = self._prepared.get(vocab_id)
+        synonyms = self._synonyms.get(vocab_id, ())
+        if (prepared is None or prepared.definition != definition
+                or prepared.synonyms != synonyms):
+            prepared = PreparedDefinition(definition, self.options, synonyms)
+            self._prepared[vocab_id] = prepared
+        return prepared
+
+    def grade(self, vocab_id, answer, definition):
+        prepared = self._prepared_for(vocab_id, definition)
+        options = self.options
+        answer = options.normalize(answer)
+        if not answer:
+            return False
+        if answer in prepared.exact:
+            return True
+        if not options.fuzzy:
+            return False
+        if frozenset(answer.split()) in prepared.token_sets:
+            return True
+        for alternative in prepared.alternatives:
+            if within_distance(answer, alternative, options.allowed_typos(len(alternative))):
+                return True
+        return False
@@ -0,0 +1,208 @@
+"""Stream word/definition pairs from CSV, TSV or Anki files into a vocab set.
+
+    python -m vocab_core import deck.csv --set "My Deck"
+"""
+import argparse
+import csv
+import html
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from itertools import islice
+
+from .cache import set_cache
+from .database import Database
+
+
+CHUNK_SIZE = 5000
+
+# (set_id, word) is unique; a repeated word keeps the last definition imported
+# The rows are stamped here from a clock ticked once per chunk, rather than
+# one row at a time by the sync triggers (migration 9)
+TICK_CLOCK = "UPDATE sync_clock SET counter = counter + 1, seq = seq + 1"
+VOCAB_UPSERT = """
+    INSERT INTO vocab (set_id, word, definition, uid, stamp, site, seq)
+    SELECT ?, ?, ?, lower(hex(randomblob(16))), counter, site, seq FROM sync_clock WHERE true
+    ON CONFLICT (set_id, word) DO UPDATE SET
+        definition = excluded.definition, stamp = excluded.stamp,
+        site = excluded.site, seq = excluded.seq"""
+
+TAG_RE = re.compile(r"<[^>]+>")
+# Header lines at the top of Anki's text export, e.g. "#separator:tab"
+ANKI_HEADER_RE = re.compile(
+    r"#(separator|html|tags|tags column|columns|notetype|notetype column|deck|deck column"
+    r"|guid column|if matches):")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".apkg":
+        return "apkg"
+    if ext in (".tsv", ".tab"):
+        return "tsv"
+    if ext == ".txt":
+        # Anki's "Notes in Plain Text" export is tab separated
+        return "tsv"
+    if ext == ".csv":
+        return "csv"
+    raise ImportFormatError(f"Unsupported file type: {ext or path}")
+
+
+def clean_field(text):
+    # Anki fields hold HTML
+    return html.unescape(TAG_RE.sub("", text)).strip()
+
+
+def skip_anki_header(lines):
+    # Only the leading block is Anki's header; a line like it further down
+    # is data, or part of a quoted field
+    lines = iter(lines)
+    for line in lines:
+        if not ANKI_HEADER_RE.match(line):
+            yield line
+            break
+    yield from lines
+
+
+def read_delimited(path, delimiter):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = csv.reader(skip_anki_header(f), delimiter=delimiter)
+        for i, row in enumerate(rows):
+            if len(row) < 2:
+                continue
+            word, definition = clean_field(row[0]), clean_field(row[1])
+            if i == 0 and (word.lower(), definition.lower()) == ("word", "definition"):
+                continue
+            if word and definition:
+                yield word, definition
+
+
+def read_apkg(path):
+    # An .apkg is a zip holding the Anki collection as a SQLite database; the
+    # fields of a note are separated by \x1f
+    with zipfile.ZipFile(path) as archive, tempfile.TemporaryDirectory() as tmp:
+        names = set(archive.namelist())
+        for name in ("collection.anki21", "collection.anki2"):
+            if name in names:
+                break
+        else:
+            raise ImportFormatError(
+                "No readable collection in the Anki package (only collection.anki2 "
+                "and collection.anki21 are supported).")
+        collection_path = os.path.join(tmp, name)
+        with archive.open(name) as src, open(collection_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+        conn = sqlite3.connect(collection_path)
+        try:
+            for (fields,) in conn.execute("SELECT flds FROM notes ORDER BY id"):
+                fields = fields.split("\x1f")
+                if len(fields) < 2:
+                    continue
+                word, definition = clean_field(fields[0]), clean_field(fields[1])
+                if word and definition:
+                    yield word, definition
+        finally:
+            conn.close()
+
+
+def read_rows(path, fmt=None):
+    """Yield (word, definition) pairs from a file without reading it all in."""
+    fmt = fmt or detect_format(path)
+    if fmt == "csv":
+        return read_delimited(path, ",")
+    if fmt == "tsv":
+        return read_delimited(path, "\t")
+    if fmt == "apkg":
+        return read_apkg(path)
+    raise ImportFormatError(f"Unsupported format: {fmt}")
+
+
+def get_or_create_set(name, description=""):
+    with Database.transaction() as conn:
+        row = conn.execute(
+            "SELECT set_id FROM vocab_sets WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        set_id = conn.execute(
+            "INSERT INTO vocab_sets (name, description) VALUES (?, ?)",
+            (name, description)).lastrowid
+    set_cache.invalidate(set_id)
+    return set_id
+
+
+def import_rows(set_id, rows, chunk_size=CHUNK_SIZE, progress=None, cancelled=None):
+    """Insert (word, definition) pairs into a set, committing every chunk_size rows.
+
+    progress(count) is called after each chunk with the number of rows
+    imported so far. If cancelled() returns true the import stops after the
+    current chunk; the chunks already committed are kept.
+    """
+    rows = iter(rows)
+    count = 0
+    while True:
+        chunk = [(set_id, word, definition)
+                 for word, definition in islice(rows, chunk_size)]
+        if not chunk:
+            break
+        with Database.transaction() as conn:
+            conn.execute(TICK_CLOCK)
+            conn.executemany(VOCAB_UPSERT, chunk)
+        set_cache.invalidate(set_id)
+        count += len(chunk)
+        if progress is not None:
+            progress(count)
+        if cancelled is not None and cancelled():
+            break
+    return count
+
+
+def import_file(path, set_name, fmt=None, chunk_size=CHUNK_SIZE, progress=None,
+                cancelled=None):
+    rows = read_rows(path, fmt)
+    # fail before creating the set; the readers only open the file lazily
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No such file: {path}")
+    set_id = get_or_create_set(set_name)
+    return import_rows(set_id, rows, chunk_size, progress, cancelled)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--set", dest="set_name",
+                        help="vocab set to import into (default: the file name)")
+    parser.add_argument("--format", choices=("csv", "tsv", "apkg"))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    set_name = args.set_name or os.path.splitext(os.path.basename(args.path))[0]
+    Database.open(args.db)
+    start = time.perf_counter()
+
+    def progress(count):
+        print(f"\rImported {count} rows", end="", file=sys.stderr)
+
+    try:
+        count = import_file(args.path, set_name, args.format, args.chunk_size, progress)
+    except (ValueError, OSError, csv.Error, zipfile.BadZipFile, sqlite3.Error) as e:
+        parser.exit(1, f"Import failed: {e}\n")
+    finally:
+        Database.close()
+    elapsed = time.perf_counter() - start
+    print(f"\rImported {count} rows into '{set_name}' in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
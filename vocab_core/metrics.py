@@ -0,0 +1,174 @@
+"""Opt-in timings and counters for the database and UI hot paths.
+
+Set VOCAB_METRICS=1 to turn recording on, or VOCAB_METRICS_FILE=path to turn
+it on and have the results written there as JSON when the process exits.
+With neither set, timer() hands back a shared no-op context and nothing is
+recorded.
+"""
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+
+# Bucket i holds durations below 2**i microseconds; the last one is unbounded
+BUCKETS = 32
+VERB_RE = re.compile(r"\s*(\w+)")
+TABLE_RE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE|INDEX|TRIGGER)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)",
+    re.IGNORECASE)
+
+
+class Histogram:
+    """Durations in power-of-two microsecond buckets, plus exact count, sum, min and max."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        micros = int(seconds * 1_000_000)
+        self.buckets[min(micros.bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the given fraction, capped at max
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(2 ** i / 1_000_000, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "min_ms": (self.min or 0.0) * 1000,
+            "max_ms": (self.max or 0.0) * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p90_ms": self.percentile(0.9) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            # {upper bound in microseconds: count}, empty buckets left out
+            "buckets_us": {str(2 ** i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.histograms = {}
+            self.counters = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def timer(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_s": time.time() - self.started,
+                "histograms": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def summary(self, limit=8):
+        # lines for the slowest histograms by total time, for a stats panel
+        with self._lock:
+            slowest = sorted(self.histograms.items(), key=lambda item: -item[1].total)[:limit]
+            return [f"{name}: {h.count}x p50 {h.percentile(0.5) * 1000:.2f} ms "
+                    f"max {h.max * 1000:.1f} ms" for name, h in slowest]
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+metrics = Metrics(bool(os.environ.get("VOCAB_METRICS") or os.environ.get("VOCAB_METRICS_FILE")))
+if os.environ.get("VOCAB_METRICS_FILE"):
+    atexit.register(metrics.dump, os.environ["VOCAB_METRICS_FILE"])
+
+
+@lru_cache(maxsize=1024)
+def statement_name(sql):
+    # "db.SELECT vocab" for "SELECT ... FROM vocab ..."
+    verb = VERB_RE.match(sql)
+    if verb is None:
+        return "db.other"
+    table = TABLE_RE.search(sql)
+    if table is None:
+        return f"db.{verb.group(1).upper()}"
+    return f"db.{verb.group(1).upper()} {table.group(1)}"
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """A connection that times every execute() and executemany() by statement kind.
+
+    Only execute calls are timed; rows fetched later are not included.
+    """
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            metrics.record(statement_name(sql), time.perf_counter() - start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            metrics.record(statement_name(sql), time.perf_counter() - start)
+
+
+def count_statement(sql):
+    # trace callback: counts every statement run, including through cursors
+    metrics.count("db.statements")
@@ -0,0 +1,609 @@
+import sqlite3
+import sys
+
+
+class MigrationError(Exception):
+    pass
+
+
+# Each migration upgrades the schema from version - 1 to version. The applied
+# version is stored in PRAGMA user_version, so an existing vocabulary.db is
+# upgraded in place the next time it is opened.
+MIGRATIONS = []
+
+# Correct answers in a row for a word to count as mastered; it is built into
+# the review_log_stats trigger, so changing it needs a new migration
+MASTERED_STREAK = 3
+DAY_SECONDS = 24 * 60 * 60
+
+
+def migration(version):
+    def register(func):
+        MIGRATIONS.append((version, func))
+        return func
+    return register
+
+
+@migration(1)
+def create_base_tables(conn):
+    # The original schema.sql; already present in databases created before
+    # migrations existed.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vocab_sets (
+            set_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vocab (
+            vocab_id INTEGER PRIMARY KEY,
+            set_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            definition TEXT NOT NULL,
+            FOREIGN KEY (set_id) REFERENCES vocab_sets(set_id) ON DELETE CASCADE
+        )""")
+
+
+@migration(2)
+def index_vocab_by_set(conn):
+    # Duplicate words in a set used to collapse to the last one loaded, so keep
+    # that row before enforcing uniqueness. Definitions that differ are added to
+    # it as alternative answers rather than lost.
+    duplicates = conn.execute("""
+        SELECT set_id, word, vocab_id, definition FROM vocab
+        WHERE (set_id, word) IN (
+            SELECT set_id, word FROM vocab GROUP BY set_id, word HAVING COUNT(*) > 1)
+        ORDER BY set_id, word, vocab_id DESC""").fetchall()
+    groups = {}
+    for set_id, word, vocab_id, definition in duplicates:
+        groups.setdefault((set_id, word), []).append((vocab_id, definition))
+    for (set_id, word), rows in groups.items():
+        keep = rows[0][0]
+        definitions = list(dict.fromkeys(definition for _vocab_id, definition in rows))
+        conn.execute("UPDATE vocab SET definition=? WHERE vocab_id=?",
+                     ("; ".join(definitions), keep))
+        conn.executemany("DELETE FROM vocab WHERE vocab_id=?",
+                         [(vocab_id,) for vocab_id, _definition in rows[1:]])
+        print(f"Merged {len(rows) - 1} duplicate rows of '{word}' in set {set_id}: "
+              f"{'; '.join(definitions)}", file=sys.stderr)
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS vocab_set_word ON vocab (set_id, word)")
+    # Covers loading a set in insertion order without touching the table
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS vocab_set_cover
+        ON vocab (set_id, vocab_id, word, definition)""")
+
+
+@migration(3)
+def add_review_state(conn):
+    # Spaced-repetition state per word; interval is in days and due is a unix
+    # timestamp. New words start due immediately.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS review_state (
+            vocab_id INTEGER PRIMARY KEY,
+            set_id INTEGER NOT NULL,
+            ease REAL NOT NULL DEFAULT 2.5,
+            interval REAL NOT NULL DEFAULT 0,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            due REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE
+        )""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS review_state_due ON review_state (set_id, due)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS vocab_review_state AFTER INSERT ON vocab
+        BEGIN
+            INSERT INTO review_state (vocab_id, set_id) VALUES (new.vocab_id, new.set_id);
+        END""")
+    conn.execute("""
+        INSERT OR IGNORE INTO review_state (vocab_id, set_id)
+        SELECT vocab_id, set_id FROM vocab""")
+
+
+@migration(4)
+def add_review_log(conn):
+    # Append-only log of every answer. There is no foreign key so a batch never
+    # fails because a word was deleted mid-session; compaction drops orphans.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS review_log (
+            review_id INTEGER PRIMARY KEY,
+            vocab_id INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            reviewed_at REAL NOT NULL,
+            answer TEXT NOT NULL,
+            correct INTEGER NOT NULL
+        )""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS review_log_time ON review_log (reviewed_at)")
+    # Old log rows are compacted into one row per word per day
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS review_rollup (
+            vocab_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            reviews INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            PRIMARY KEY (vocab_id, day)
+        ) WITHOUT ROWID""")
+
+
+@migration(5)
+def add_vocab_search(conn):
+    # Full-text index over words and definitions. It is an external-content
+    # table, so it stores only the index; the triggers keep it in step with
+    # vocab. SQLite builds without FTS5 skip this and search falls back to LIKE.
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS vocab_fts USING fts5 (
+                word, definition,
+                content='vocab', content_rowid='vocab_id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS vocab_fts_insert AFTER INSERT ON vocab
+        BEGIN
+            INSERT INTO vocab_fts (rowid, word, definition)
+            VALUES (new.vocab_id, new.word, new.definition);
+        END""")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS vocab_fts_delete AFTER DELETE ON vocab
+        BEGIN
+            INSERT INTO vocab_fts (vocab_fts, rowid, word, definition)
+            VALUES ('delete', old.vocab_id, old.word, old.definition);
+        END""")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS vocab_fts_update AFTER UPDATE OF word, definition ON vocab
+        BEGIN
+            INSERT INTO vocab_fts (vocab_fts, rowid, word, definition)
+            VALUES ('delete', old.vocab_id, old.word, old.definition);
+            INSERT INTO vocab_fts (rowid, word, definition)
+            VALUES (new.vocab_id, new.word, new.definition);
+        END""")
+    conn.execute("INSERT INTO vocab_fts (vocab_fts) VALUES ('rebuild')")
+
+
+@migration(6)
+def add_vocab_tags(conn):
+    # Free-form tags on words. Keyed by tag first so a tag filter is an index
+    # range; the second index serves the cascade when a word is deleted.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vocab_tags (
+            tag TEXT NOT NULL,
+            vocab_id INTEGER NOT NULL,
+            PRIMARY KEY (tag, vocab_id),
+            FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS vocab_tags_vocab ON vocab_tags (vocab_id)")
+
+
+@migration(7)
+def add_profiles(conn):
+    # Learners sharing one database. Each has its own settings and its own
+    # review_state and history; everything before this belongs to profile 1.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profiles (
+            profile_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            last_used REAL NOT NULL DEFAULT 0
+        )""")
+    conn.execute("INSERT OR IGNORE INTO profiles (profile_id, name) VALUES (1, 'default')")
+    # values are JSON
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            profile_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (profile_id, key),
+            FOREIGN KEY (profile_id) REFERENCES profiles(profile_id) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
+
+    # review_state is rebuilt keyed by (profile_id, vocab_id); the trigger
+    # now starts a new word for every profile
+    conn.execute("DROP TRIGGER IF EXISTS vocab_review_state")
+    conn.execute("""
+        CREATE TABLE review_state_new (
+            profile_id INTEGER NOT NULL,
+            vocab_id INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            ease REAL NOT NULL DEFAULT 2.5,
+            interval REAL NOT NULL DEFAULT 0,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            due REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (profile_id, vocab_id),
+            FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE,
+            FOREIGN KEY (profile_id) REFERENCES profiles(profile_id) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
+    conn.execute("""
+        INSERT INTO review_state_new
+            (profile_id, vocab_id, set_id, ease, interval, repetitions, due)
+        SELECT 1, vocab_id, set_id, ease, interval, repetitions, due FROM review_state""")
+    conn.execute("DROP TABLE review_state")
+    conn.execute("ALTER TABLE review_state_new RENAME TO review_state")
+    conn.execute("CREATE INDEX review_state_due ON review_state (profile_id, set_id, due)")
+    # serves the cascade when a word is deleted
+    conn.execute("CREATE INDEX review_state_vocab ON review_state (vocab_id)")
+    conn.execute("""
+        CREATE TRIGGER vocab_review_state AFTER INSERT ON vocab
+        BEGIN
+            INSERT INTO review_state (profile_id, vocab_id, set_id)
+            SELECT profile_id, new.vocab_id, new.set_id FROM profiles;
+        END""")
+
+    conn.execute("ALTER TABLE review_log ADD COLUMN profile_id INTEGER NOT NULL DEFAULT 1")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS review_log_profile_time
+        ON review_log (profile_id, reviewed_at)""")
+    conn.execute("""
+        CREATE TABLE review_rollup_new (
+            profile_id INTEGER NOT NULL,
+            vocab_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            reviews INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            PRIMARY KEY (profile_id, vocab_id, day)
+        ) WITHOUT ROWID""")
+    conn.execute("""
+        INSERT INTO review_rollup_new (profile_id, vocab_id, day, set_id, reviews, correct)
+        SELECT 1, vocab_id, day, set_id, reviews, correct FROM review_rollup""")
+    conn.execute("DROP TABLE review_rollup")
+    conn.execute("ALTER TABLE review_rollup_new RENAME TO review_rollup")
+
+
+@migration(8)
+def add_review_stats(conn):
+    # Running totals kept up to date by a trigger on review_log, so statistics
+    # are read from a few rows however long the history is. Days are UTC, the
+    # same as review_rollup's.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS word_stats (
+            profile_id INTEGER NOT NULL,
+            vocab_id INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            streak INTEGER NOT NULL DEFAULT 0,
+            last_reviewed REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (profile_id, vocab_id)
+        ) WITHOUT ROWID""")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS word_stats_set ON word_stats (profile_id, set_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS set_stats (
+            profile_id INTEGER NOT NULL,
+            set_id INTEGER NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            mastered INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (profile_id, set_id)
+        ) WITHOUT ROWID""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            profile_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (profile_id, day)
+        ) WITHOUT ROWID""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profile_stats (
+            profile_id INTEGER PRIMARY KEY,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            answer_streak INTEGER NOT NULL DEFAULT 0,
+            best_answer_streak INTEGER NOT NULL DEFAULT 0,
+            day_streak INTEGER NOT NULL DEFAULT 0,
+            best_day_streak INTEGER NOT NULL DEFAULT 0,
+            last_day INTEGER
+        )""")
+    # set_stats.mastered is adjusted before word_stats.streak changes, since
+    # it needs the streak from before this answer
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS review_log_stats AFTER INSERT ON review_log
+        BEGIN
+            INSERT INTO set_stats (profile_id, set_id, reviews, correct, mastered)
+            VALUES (new.profile_id, new.set_id, 1, new.correct,
+                    new.correct AND {MASTERED_STREAK} = 1)
+            ON CONFLICT (profile_id, set_id) DO UPDATE SET
+                reviews = reviews + 1,
+                correct = correct + new.correct,
+                mastered = mastered + COALESCE((
+                    SELECT CASE
+                        WHEN new.correct AND w.streak = {MASTERED_STREAK} - 1 THEN 1
+                        WHEN NOT new.correct AND w.streak >= {MASTERED_STREAK} THEN -1
+                        ELSE 0 END
+                    FROM word_stats w
+                    WHERE w.profile_id = new.profile_id AND w.vocab_id = new.vocab_id),
+                    new.correct AND {MASTERED_STREAK} = 1);
+            INSERT INTO word_stats (profile_id, vocab_id, set_id, reviews, correct, streak,
+                                    last_reviewed)
+            VALUES (new.profile_id, new.vocab_id, new.set_id, 1, new.correct, new.correct,
+                    new.reviewed_at)
+            ON CONFLICT (profile_id, vocab_id) DO UPDATE SET
+                reviews = reviews + 1,
+                correct = correct + new.correct,
+                streak = CASE WHEN new.correct THEN streak + 1 ELSE 0 END,
+                last_reviewed = MAX(last_reviewed, new.reviewed_at);
+            INSERT INTO daily_stats (profile_id, day, reviews, correct)
+            VALUES (new.profile_id, CAST(new.reviewed_at / {DAY_SECONDS} AS INTEGER), 1,
+                    new.correct)
+            ON CONFLICT (profile_id, day) DO UPDATE SET
+                reviews = reviews + 1,
+                correct = correct + new.correct;
+            INSERT OR IGNORE INTO profile_stats (profile_id) VALUES (new.profile_id);
+            UPDATE profile_stats SET
+                day_streak = CASE
+                    WHEN last_day IS NULL
+                      OR CAST(new.reviewed_at / {DAY_SECONDS} AS INTEGER) > last_day + 1 THEN 1
+                    WHEN CAST(new.reviewed_at / {DAY_SECONDS} AS INTEGER) = last_day + 1
+                      THEN day_streak + 1
+                    ELSE day_streak END,
+                last_day = MAX(COALESCE(last_day, 0),
+                               CAST(new.reviewed_at / {DAY_SECONDS} AS INTEGER))
+            WHERE profile_id = new.profile_id;
+            UPDATE profile_stats SET
+                reviews = reviews + 1,
+                correct = correct + new.correct,
+                answer_streak = CASE WHEN new.correct THEN answer_streak + 1 ELSE 0 END,
+                best_answer_streak = MAX(best_answer_streak,
+                                         CASE WHEN new.correct THEN answer_streak + 1 ELSE 0 END),
+                best_day_streak = MAX(best_day_streak, day_streak)
+            WHERE profile_id = new.profile_id;
+        END""")
+    # A deleted word no longer counts towards its set's mastery
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_word_stats AFTER DELETE ON vocab
+        BEGIN
+            UPDATE set_stats SET mastered = mastered - 1
+            WHERE set_id = old.set_id AND profile_id IN (
+                SELECT profile_id FROM word_stats
+                WHERE vocab_id = old.vocab_id AND streak >= {MASTERED_STREAK});
+            DELETE FROM word_stats WHERE vocab_id = old.vocab_id;
+        END""")
+    conn.execute("CREATE INDEX IF NOT EXISTS word_stats_vocab ON word_stats (vocab_id)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS vocab_sets_stats AFTER DELETE ON vocab_sets
+        BEGIN
+            DELETE FROM set_stats WHERE set_id = old.set_id;
+        END""")
+
+    # Backfill: the daily rollups only have counts, then the log is replayed
+    # through the trigger in order so streaks come out right
+    conn.execute("""
+        INSERT INTO daily_stats (profile_id, day, reviews, correct)
+        SELECT profile_id, day, SUM(reviews), SUM(correct) FROM review_rollup
+        GROUP BY profile_id, day""")
+    conn.execute("""
+        INSERT INTO set_stats (profile_id, set_id, reviews, correct)
+        SELECT profile_id, set_id, SUM(reviews), SUM(correct) FROM review_rollup
+        GROUP BY profile_id, set_id""")
+    conn.execute("""
+        INSERT INTO word_stats (profile_id, vocab_id, set_id, reviews, correct, last_reviewed)
+        SELECT profile_id, vocab_id, set_id, SUM(reviews), SUM(correct), MAX(day) * ?
+        FROM review_rollup GROUP BY profile_id, vocab_id""", (DAY_SECONDS,))
+    conn.execute("""
+        INSERT INTO profile_stats (profile_id, reviews, correct)
+        SELECT profile_id, SUM(reviews), SUM(correct) FROM review_rollup
+        GROUP BY profile_id""")
+    conn.execute("CREATE TEMP TABLE review_log_replay AS SELECT * FROM review_log")
+    conn.execute("DELETE FROM review_log")
+    conn.execute("INSERT INTO review_log SELECT * FROM review_log_replay ORDER BY review_id")
+    conn.execute("DROP TABLE temp.review_log_replay")
+
+
+@migration(9)
+def add_sync_stamps(conn):
+    # Sets and words get a uid that is the same in every copy of the
+    # database, a Lamport stamp and the site that made the last change (which
+    # decide conflicts), and a local change sequence number (which picks the
+    # rows to send a peer). Deleted rows leave a tombstone. Triggers keep all
+    # of it up to date for ordinary writes; vocab_core.sync sets the columns
+    # itself, with a new seq, when applying a peer's changes, so the update
+    # triggers leave those alone.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_clock (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            site TEXT NOT NULL,
+            counter INTEGER NOT NULL,
+            seq INTEGER NOT NULL
+        )""")
+    conn.execute("""
+        INSERT OR IGNORE INTO sync_clock (id, site, counter, seq)
+        VALUES (1, lower(hex(randomblob(16))), 1, 1)""")
+    for table in ("vocab_sets", "vocab"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN uid TEXT")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN stamp INTEGER NOT NULL DEFAULT 0")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN site TEXT NOT NULL DEFAULT ''")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        conn.execute(f"""
+            UPDATE {table} SET uid = lower(hex(randomblob(16))), stamp = 1,
+                               site = (SELECT site FROM sync_clock), seq = 1""")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_uid ON {table} (uid)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_seq ON {table} (seq)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_tombstones (
+            uid TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            stamp INTEGER NOT NULL,
+            site TEXT NOT NULL,
+            seq INTEGER NOT NULL
+        ) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS sync_tombstones_seq ON sync_tombstones (seq)")
+    # Two rows made separately for the same set name or (set, word) are
+    # merged into the one with the smaller uid; the other uid points to it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_aliases (
+            uid TEXT PRIMARY KEY,
+            target TEXT NOT NULL,
+            seq INTEGER NOT NULL
+        ) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS sync_aliases_seq ON sync_aliases (seq)")
+    # per peer: the highest of its seqs applied here, and of ours it has applied
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            site TEXT PRIMARY KEY,
+            received INTEGER NOT NULL DEFAULT 0,
+            acked INTEGER NOT NULL DEFAULT 0,
+            last_sync REAL
+        ) WITHOUT ROWID""")
+
+    tick = """
+            UPDATE sync_clock SET counter = counter + 1, seq = seq + 1;"""
+    stamp = """
+                stamp = (SELECT counter FROM sync_clock),
+                site = (SELECT site FROM sync_clock),
+                seq = (SELECT seq FROM sync_clock)"""
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sets_sync_insert AFTER INSERT ON vocab_sets
+        WHEN new.uid IS NULL
+        BEGIN{tick}
+            UPDATE vocab_sets SET uid = lower(hex(randomblob(16))),{stamp}
+            WHERE set_id = new.set_id;
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sets_sync_update
+        AFTER UPDATE OF name, description ON vocab_sets
+        WHEN new.seq = old.seq
+        BEGIN{tick}
+            UPDATE vocab_sets SET{stamp}
+            WHERE set_id = new.set_id;
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sets_sync_delete AFTER DELETE ON vocab_sets
+        WHEN NOT EXISTS (SELECT 1 FROM sync_aliases WHERE uid = old.uid)
+        BEGIN{tick}
+            INSERT INTO sync_tombstones (uid, kind, stamp, site, seq)
+            SELECT old.uid, 'set', counter, site, seq FROM sync_clock WHERE true
+            ON CONFLICT (uid) DO NOTHING;
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sync_insert AFTER INSERT ON vocab
+        WHEN new.uid IS NULL
+        BEGIN{tick}
+            UPDATE vocab SET uid = lower(hex(randomblob(16))),{stamp}
+            WHERE vocab_id = new.vocab_id;
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sync_update
+        AFTER UPDATE OF set_id, word, definition ON vocab
+        WHEN new.seq = old.seq
+        BEGIN{tick}
+            UPDATE vocab SET{stamp}
+            WHERE vocab_id = new.vocab_id;
+        END""")
+    # Words deleted along with their set need no tombstones of their own
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_sync_delete AFTER DELETE ON vocab
+        WHEN EXISTS (SELECT 1 FROM vocab_sets WHERE set_id = old.set_id)
+         AND NOT EXISTS (SELECT 1 FROM sync_aliases WHERE uid = old.uid)
+        BEGIN{tick}
+            INSERT INTO sync_tombstones (uid, kind, stamp, site, seq)
+            SELECT old.uid, 'vocab', counter, site, seq FROM sync_clock WHERE true
+            ON CONFLICT (uid) DO NOTHING;
+        END""")
+
+
+@migration(10)
+def add_vocab_synonyms(conn):
+    # Extra answers accepted for a word, besides those listed in its definition
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vocab_synonyms (
+            vocab_id INTEGER NOT NULL,
+            synonym TEXT NOT NULL,
+            PRIMARY KEY (vocab_id, synonym),
+            FOREIGN KEY (vocab_id) REFERENCES vocab(vocab_id) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
+
+
+@migration(11)
+def move_progress_with_words(conn):
+    # A word moved to another set (sync merges sets this way) takes its
+    # review state, history and statistics along, so it is still quizzed and
+    # counted in its new set
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vocab_moved AFTER UPDATE OF set_id ON vocab
+        WHEN new.set_id <> old.set_id
+        BEGIN
+            UPDATE review_state SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+            UPDATE review_log SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+            UPDATE review_rollup SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+            INSERT INTO set_stats (profile_id, set_id, reviews, correct, mastered)
+            SELECT profile_id, new.set_id, reviews, correct, streak >= {MASTERED_STREAK}
+            FROM word_stats WHERE vocab_id = new.vocab_id
+            ON CONFLICT (profile_id, set_id) DO UPDATE SET
+                reviews = reviews + excluded.reviews,
+                correct = correct + excluded.correct,
+                mastered = mastered + excluded.mastered;
+            UPDATE set_stats SET
+                reviews = reviews - (SELECT w.reviews FROM word_stats w
+                                     WHERE w.vocab_id = new.vocab_id
+                                       AND w.profile_id = set_stats.profile_id),
+                correct = correct - (SELECT w.correct FROM word_stats w
+                                     WHERE w.vocab_id = new.vocab_id
+                                       AND w.profile_id = set_stats.profile_id),
+                mastered = mastered - (SELECT w.streak >= {MASTERED_STREAK} FROM word_stats w
+                                       WHERE w.vocab_id = new.vocab_id
+                                         AND w.profile_id = set_stats.profile_id)
+            WHERE set_id = old.set_id AND profile_id IN (
+                SELECT profile_id FROM word_stats WHERE vocab_id = new.vocab_id);
+            UPDATE word_stats SET set_id = new.set_id WHERE vocab_id = new.vocab_id;
+        END""")
+    # Words moved before this trigger existed: their set totals first, while
+    # word_stats still says where they were counted
+    moved = """
+        SELECT w.profile_id, w.set_id AS old_set, v.set_id AS new_set, w.reviews, w.correct,
+               w.streak >= ? AS mastered
+        FROM word_stats w JOIN vocab v ON v.vocab_id = w.vocab_id
+        WHERE v.set_id <> w.set_id"""
+    conn.execute(f"""
+        INSERT INTO set_stats (profile_id, set_id, reviews, correct, mastered)
+        SELECT profile_id, new_set, SUM(reviews), SUM(correct), SUM(mastered)
+        FROM ({moved}) GROUP BY profile_id, new_set
+        ON CONFLICT (profile_id, set_id) DO UPDATE SET
+            reviews = reviews + excluded.reviews,
+            correct = correct + excluded.correct,
+            mastered = mastered + excluded.mastered""", (MASTERED_STREAK,))
+    conn.execute(f"""
+        UPDATE set_stats AS s SET
+            reviews = s.reviews - m.reviews,
+            correct = s.correct - m.correct,
+            mastered = s.mastered - m.mastered
+        FROM (SELECT profile_id, old_set, SUM(reviews) AS reviews, SUM(correct) AS correct,
+                     SUM(mastered) AS mastered
+              FROM ({moved}) GROUP BY profile_id, old_set) AS m
+        WHERE s.profile_id = m.profile_id AND s.set_id = m.old_set""", (MASTERED_STREAK,))
+    for table in ("word_stats", "review_state", "review_log", "review_rollup"):
+        conn.execute(f"""
+            UPDATE {table} SET set_id = v.set_id FROM vocab AS v
+            WHERE v.vocab_id = {table}.vocab_id AND v.set_id <> {table}.set_id""")
+
+
+def latest_version():
+    return max(version for version, _ in MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(manager):
+    """Apply every pending migration, each in its own transaction."""
+    conn = manager.connection()
+    current = get_version(conn)
+    if current > latest_version():
+        raise MigrationError(
+            f"Database schema version {current} is newer than this app supports "
+            f"({latest_version()}).")
+
+    for version, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        with manager.transaction() as conn:
+            func(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        current = version
+    return current
@@ -0,0 +1,86 @@
+import json
+from collections import OrderedDict
+
+from .cache import set_cache
+from .database import Database
+
+
+class VocabPages:
+    """Random access to a set's vocab rows, fetched a page at a time.
+
+    Rows are ordered by vocab_id. A page is read with a keyset query
+    (vocab_id > last id of the previous page) when the previous page is cached,
+    and with LIMIT/OFFSET otherwise, e.g. after jumping with the scrollbar.
+    Only the most recently used pages are kept, and they are dropped when the
+    set's data version changes, i.e. after it was written anywhere.
+    """
+
+    def __init__(self, set_id, page_size=200, max_pages=32):
+        self.set_id = set_id
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.excluded_ids = set()
+        self.invalidate()
+
+    def invalidate(self):
+        self._pages = OrderedDict()
+        self._count = None
+        self._version = set_cache.version(self.set_id)
+
+    def _check_version(self):
+        if self._version != set_cache.version(self.set_id):
+            self.invalidate()
+
+    def exclude(self, vocab_id):
+        # Hide a row that has been deleted but not saved yet
+        self.excluded_ids.add(vocab_id)
+        self.invalidate()
+
+    def _where(self):
+        return ("set_id=? AND vocab_id NOT IN (SELECT value FROM json_each(?))",
+                [self.set_id, json.dumps(sorted(self.excluded_ids))])
+
+    def count(self):
+        self._check_version()
+        if self._count is None:
+            where, params = self._where()
+            self._count = Database.get_connection().execute(
+                f"SELECT COUNT(*) FROM vocab WHERE {where}", params).fetchone()[0]
+        return self._count
+
+    def _page(self, page_no):
+        page = self._pages.get(page_no)
+        if page is not None:
+            self._pages.move_to_end(page_no)
+            return page
+
+        where, params = self._where()
+        previous = self._pages.get(page_no - 1)
+        if previous:
+            sql = (f"SELECT vocab_id, word, definition FROM vocab WHERE {where} "
+                   "AND vocab_id > ? ORDER BY vocab_id LIMIT ?")
+            params += [previous[-1][0], self.page_size]
+        else:
+            sql = (f"SELECT vocab_id, word, definition FROM vocab WHERE {where} "
+                   "ORDER BY vocab_id LIMIT ? OFFSET ?")
+            params += [self.page_size, page_no * self.page_size]
+        page = Database.get_connection().execute(sql, params).fetchall()
+
+        self._pages[page_no] = page
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def rows(self, offset, limit):
+        # rows in the format [(vocab_id, word, definition)]
+        rows = []
+        end = min(offset + limit, self.count())
+        while offset < end:
+            page_no, start = divmod(offset, self.page_size)
+            page = self._page(page_no)
+            if start >= len(page):
+                break
+            taken = page[start:start + end - offset]
+            rows.extend(taken)
+            offset += len(taken)
+        return rows
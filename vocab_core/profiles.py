@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+
+from .database import Database
+
+
+# The profile everything belonged to before there were profiles
+DEFAULT_PROFILE = 1
+
+
+class ProfileExistsError(ValueError):
+    pass
+
+
+# [(profile_id, name)], most recently used first
+def list_profiles():
+    return Database.get_connection().execute(
+        "SELECT profile_id, name FROM profiles ORDER BY last_used DESC, profile_id").fetchall()
+
+
+def get_profile_id(name):
+    row = Database.get_connection().execute(
+        "SELECT profile_id FROM profiles WHERE name=?", (name,)).fetchone()
+    return None if row is None else row[0]
+
+
+def create_profile(name):
+    # The new learner starts every existing word from scratch
+    with Database.transaction() as conn:
+        if conn.execute("SELECT 1 FROM profiles WHERE name=?", (name,)).fetchone():
+            raise ProfileExistsError(f"A profile named {name!r} already exists.")
+        profile_id = conn.execute(
+            "INSERT INTO profiles (name) VALUES (?)", (name,)).lastrowid
+        # left by a profile with this id deleted before its history was
+        _delete_progress(conn, profile_id)
+        conn.execute("""
+            INSERT INTO review_state (profile_id, vocab_id, set_id)
+            SELECT ?, vocab_id, set_id FROM vocab""", (profile_id,))
+    return profile_id
+
+
+def _delete_progress(conn, profile_id):
+    for table in ("review_log", "review_rollup", "word_stats", "set_stats", "daily_stats",
+                  "profile_stats"):
+        conn.execute(f"DELETE FROM {table} WHERE profile_id=?", (profile_id,))
+
+
+def delete_profile(profile_id):
+    # Also deletes the profile's settings, review state, history and
+    # statistics; profile ids are reused, so nothing may be left for the next
+    # profile created
+    if profile_id == DEFAULT_PROFILE:
+        raise ValueError("The default profile cannot be deleted.")
+    with Database.transaction() as conn:
+        conn.execute("DELETE FROM profiles WHERE profile_id=?", (profile_id,))
+        _delete_progress(conn, profile_id)
+    SettingsStore.forget(profile_id)
+
+
+def touch_profile(profile_id):
+    # Remember which learner used the app last, so it is selected next time
+    with Database.transaction() as conn:
+        conn.execute("UPDATE profiles SET last_used=? WHERE profile_id=?",
+                     (time.time(), profile_id))
+
+
+class SettingsStore:
+    """One profile's settings, read once and written behind.
+
+    Reads come from memory. set()/update() change memory at once and write the
+    changed keys to the settings table in one transaction delay seconds later
+    (or on flush()/close()), so saving settings never waits on the database.
+    Use SettingsStore.get(profile_id) to share one store per profile.
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, profile_id, delay=1.0):
+        self.profile_id = profile_id
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+        self._dirty = set()
+        rows = Database.get_connection().execute(
+            "SELECT key, value FROM settings WHERE profile_id=?", (profile_id,)).fetchall()
+        self._values = {key: json.loads(value) for key, value in rows}
+
+    @classmethod
+    def get(cls, profile_id):
+        with cls._stores_lock:
+            store = cls._stores.get(profile_id)
+            if store is None:
+                store = cls._stores[profile_id] = cls(profile_id)
+            return store
+
+    @classmethod
+    def flush_all(cls):
+        with cls._stores_lock:
+            stores = list(cls._stores.values())
+        for store in stores:
+            store.flush()
+
+    @classmethod
+    def forget(cls, profile_id):
+        with cls._stores_lock:
+            store = cls._stores.pop(profile_id, None)
+        if store is not None:
+            store.cancel()
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+    def value(self, key, default=None):
+        return self._values.get(key, default)
+
+    def values(self, defaults):
+        # {key: value} for every key in defaults, saved values first
+        with self._lock:
+            return {key: self._values.get(key, default) for key, default in defaults.items()}
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        with self._lock:
+            for key, value in values.items():
+                if self._values.get(key, self) != value:
+                    self._values[key] = value
+                    self._dirty.add(key)
+            if self._dirty and self._timer is None:
+                self._timer = threading.Timer(self.delay, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            changes = [(self.profile_id, key, json.dumps(self._values[key]))
+                       for key in self._dirty]
+            self._dirty = set()
+        if changes:
+            with Database.transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO settings (profile_id, key, value) VALUES (?, ?, ?)",
+                    changes)
+
+    def _timed_flush(self):
+        # each Timer is a new thread, so close the connection it opened
+        try:
+            self.flush()
+        finally:
+            Database.release()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = set()
+
+    def close(self):
+        self.flush()
+
+
+def import_settings_file(path, profile_id=DEFAULT_PROFILE):
+    """Copy a settings.json from before settings were stored in the database.
+
+    Only done while the profile has no saved settings; returns whether anything
+    was imported.
+    """
+    store = SettingsStore.get(profile_id)
+    if len(store) or not os.path.isfile(path):
+        return False
+    try:
+        with open(path) as f:
+            values = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(values, dict):
+        return False
+    store.update(values)
+    store.flush()
+    return True
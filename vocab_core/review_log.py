@@ -0,0 +1,151 @@
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+
+from .database import Database
+from .profiles import DEFAULT_PROFILE
+from .scheduler import DAY
+
+
+# Log rows older than this are rolled up into review_rollup
+KEEP_DAYS = 90
+# A process compacts each database at most this often (seconds)
+COMPACT_EVERY = DAY
+
+_STOP = object()
+_FLUSH = object()
+
+# {database path: time.monotonic() of the last compaction}
+_compacted = {}
+_compacted_lock = threading.Lock()
+
+
+def compact_review_log(before):
+    """Roll log rows older than `before` (unix time) up into daily totals."""
+    with Database.transaction() as conn:
+        conn.execute("""
+            INSERT INTO review_rollup (profile_id, vocab_id, day, set_id, reviews, correct)
+            SELECT l.profile_id, l.vocab_id, CAST(l.reviewed_at / ? AS INTEGER), l.set_id,
+                   COUNT(*), SUM(l.correct)
+            FROM review_log l JOIN vocab v ON v.vocab_id = l.vocab_id
+            WHERE l.reviewed_at < ?
+            GROUP BY l.profile_id, l.vocab_id, CAST(l.reviewed_at / ? AS INTEGER)
+            ON CONFLICT (profile_id, vocab_id, day) DO UPDATE SET
+                reviews = reviews + excluded.reviews,
+                correct = correct + excluded.correct""", (DAY, before, DAY))
+        c = conn.execute("DELETE FROM review_log WHERE reviewed_at < ?", (before,))
+        compacted = c.rowcount
+        # rollups and stats of deleted words have nothing left to describe
+        conn.execute("""
+            DELETE FROM review_rollup
+            WHERE vocab_id NOT IN (SELECT vocab_id FROM vocab)""")
+        conn.execute("""
+            DELETE FROM word_stats
+            WHERE vocab_id NOT IN (SELECT vocab_id FROM vocab)""")
+    return compacted
+
+
+def compact_if_due(keep_days=KEEP_DAYS):
+    """Compact the open database unless this process did so recently.
+
+    Errors (e.g. the database is locked) are printed, not raised; the old
+    rows are simply compacted next time. Returns whether it compacted.
+    """
+    path = Database.manager().db_path
+    now = time.monotonic()
+    with _compacted_lock:
+        last = _compacted.get(path)
+        if last is not None and now - last < COMPACT_EVERY:
+            return False
+        _compacted[path] = now
+    try:
+        compact_review_log(time.time() - keep_days * DAY)
+    except sqlite3.Error:
+        traceback.print_exc()
+        with _compacted_lock:
+            _compacted.pop(path, None)
+        return False
+    return True
+
+
+class ReviewLogWriter:
+    """Appends answers to review_log from a background thread.
+
+    log() only puts the answer on a queue, so it never waits on the database.
+    The writer thread collects answers until it has batch_size of them or
+    flush_interval seconds have passed, then inserts them with one executemany
+    in one transaction. Before the first answer it compacts the log, at most
+    once a day per process (see compact_if_due).
+    """
+
+    def __init__(self, batch_size=500, flush_interval=2.0, keep_days=KEEP_DAYS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_days = keep_days
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="review-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, vocab_id, set_id, answer, correct, reviewed_at=None,
+            profile_id=DEFAULT_PROFILE):
+        if reviewed_at is None:
+            reviewed_at = time.time()
+        self._queue.put((vocab_id, set_id, reviewed_at, answer, int(correct), profile_id))
+
+    def flush(self):
+        # Block until everything logged so far has been written
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _write(self, batch):
+        with Database.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO review_log (vocab_id, set_id, reviewed_at, answer, correct, profile_id)
+                VALUES (?, ?, ?, ?, ?, ?)""", batch)
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            Database.release()
+
+    def _loop(self):
+        if self.keep_days is not None:
+            compact_if_due(self.keep_days)
+
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP or item is _FLUSH:
+                stopping = item is _STOP
+                self._queue.task_done()
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (item is _STOP or item is _FLUSH or item is None
+                          or len(batch) >= self.batch_size):
+                try:
+                    self._write(batch)
+                except sqlite3.Error:
+                    # keep the thread alive for the rest of the session
+                    traceback.print_exc()
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                batch = []
+                deadline = None
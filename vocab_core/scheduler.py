@@ -0,0 +1,91 @@
+import json
+import time
+
+from .database import Database
+from .profiles import DEFAULT_PROFILE
+
+
+DAY = 24 * 60 * 60
+# A word answered wrong comes back after this many seconds
+LAPSE_DELAY = 10 * 60
+MIN_EASE = 1.3
+
+# SM-2 answer quality (0-5) used for a right and a wrong answer
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+
+
+def sm2(ease, interval, repetitions, quality):
+    """Return the (ease, interval, repetitions) after an answer of the given quality.
+
+    interval is in days. A failed answer (quality < 3) restarts the word with
+    an interval of 0, so it is due again after LAPSE_DELAY.
+    """
+    if quality < 3:
+        repetitions = 0
+        interval = 0
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = interval * ease
+    ease += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return max(MIN_EASE, ease), interval, repetitions
+
+
+def due_time(now, interval):
+    return now + (interval * DAY if interval else LAPSE_DELAY)
+
+
+class Scheduler:
+    """Picks quiz batches for one set by due time, using one profile's review_state."""
+
+    def __init__(self, set_id, clock=time.time, profile_id=DEFAULT_PROFILE):
+        self.set_id = set_id
+        self.clock = clock
+        self.profile_id = profile_id
+
+    def next_batch(self, number_of_words, exclude=(), ahead=False, now=None):
+        # rows in the format [(vocab_id, word, definition)], earliest due first.
+        # Only words due by now (new words always are) unless ahead, which
+        # fills the batch with the words due soonest. Walks the (set_id, due)
+        # index, so this reads number_of_words rows rather than the whole set;
+        # 0 means every due word in the set.
+        limit = number_of_words if number_of_words > 0 else -1
+        due_by = float("inf") if ahead else (self.clock() if now is None else now)
+        c = Database.get_connection().execute("""
+            SELECT v.vocab_id, v.word, v.definition
+            FROM review_state r JOIN vocab v ON v.vocab_id = r.vocab_id
+            WHERE r.profile_id = ? AND r.set_id = ? AND r.due <= ?
+              AND r.vocab_id NOT IN (SELECT value FROM json_each(?))
+            ORDER BY r.due
+            LIMIT ?""", (self.profile_id, self.set_id, due_by, json.dumps(list(exclude)), limit))
+        batch = c.fetchall()
+        c.close()
+        return batch
+
+    def due_count(self):
+        return Database.get_connection().execute(
+            "SELECT COUNT(*) FROM review_state WHERE profile_id = ? AND set_id = ? AND due <= ?",
+            (self.profile_id, self.set_id, self.clock())).fetchone()[0]
+
+    def record(self, answers):
+        # answers in the format [(vocab_id, quality)]
+        now = self.clock()
+        with Database.transaction() as conn:
+            for vocab_id, quality in answers:
+                row = conn.execute(
+                    "SELECT ease, interval, repetitions FROM review_state "
+                    "WHERE profile_id = ? AND vocab_id = ?",
+                    (self.profile_id, vocab_id)).fetchone()
+                if row is None:
+                    continue
+                ease, interval, repetitions = sm2(*row, quality)
+                conn.execute("""
+                    UPDATE review_state SET ease = ?, interval = ?, repetitions = ?, due = ?
+                    WHERE profile_id = ? AND vocab_id = ?""",
+                    (ease, interval, repetitions, due_time(now, interval),
+                     self.profile_id, vocab_id))
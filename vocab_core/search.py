@@ -0,0 +1,67 @@
+import re
+
+from .database import Database
+
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Matches in the word count for more than matches in the definition
+WORD_WEIGHT = 10.0
+DEFINITION_WEIGHT = 1.0
+
+
+def has_fts(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='vocab_fts'").fetchone() is not None
+
+
+def match_expression(text):
+    # Every term must match, and the last one may be a prefix of a longer
+    # word, so results update as the user types
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_vocab(text, set_id=None, limit=50):
+    """Return [(vocab_id, set_id, word, definition)] matching text, best first.
+
+    Searches every set, or only set_id when given.
+    """
+    conn = Database.get_connection()
+    if not has_fts(conn):
+        return _search_like(conn, text, set_id, limit)
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    sql = """
+        SELECT v.vocab_id, v.set_id, v.word, v.definition
+        FROM vocab_fts f JOIN vocab v ON v.vocab_id = f.rowid
+        WHERE vocab_fts MATCH ?"""
+    params = [expression]
+    if set_id is not None:
+        sql += " AND v.set_id = ?"
+        params.append(set_id)
+    sql += " ORDER BY bm25(vocab_fts, ?, ?) LIMIT ?"
+    params += [WORD_WEIGHT, DEFINITION_WEIGHT, limit]
+    return conn.execute(sql, params).fetchall()
+
+
+def _search_like(conn, text, set_id, limit):
+    # Fallback for SQLite builds without FTS5: a full scan, unranked
+    text = text.strip()
+    if not text:
+        return []
+    pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    sql = """
+        SELECT vocab_id, set_id, word, definition FROM vocab
+        WHERE (word LIKE ? ESCAPE '\\' OR definition LIKE ? ESCAPE '\\')"""
+    params = [pattern, pattern]
+    if set_id is not None:
+        sql += " AND set_id = ?"
+        params.append(set_id)
+    sql += " ORDER BY vocab_id LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
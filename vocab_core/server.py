@@ -0,0 +1,391 @@
+"""Local HTTP/JSON API over the vocab database.
+
+    python -m vocab_core serve [--host 127.0.0.1] [--port 8765] [--workers 8]
+
+Endpoints (all bodies are JSON):
+
+    GET  /sets                          [{set_id, name, description, words}]
+    GET  /sets/<set_id>?offset=&limit=  {set_id, name, description, words, rows}
+    POST /sets/<set_id>/changes         {name?, description?, inserted: [[word, definition]],
+                                         updated: [[vocab_id, word, definition]], deleted: [vocab_id]}
+    GET  /profiles                      [{profile_id, name}]
+    GET  /stats?profile_id=&set_ids=&days=
+                                        {reviews, correct, accuracy, *_streak, today_*, sets, per_day}
+    POST /sessions                      {set_id | set_ids, tags?, wrong_days?,
+                                         profile_id?, number_of_words?, fuzzy?} -> {session_id}
+    GET  /sessions/<id>/batch           {words: [{vocab_id, word}]}
+    POST /sessions/<id>/answers         {answers: {vocab_id: answer}} -> {results, correct, total}
+    DELETE /sessions/<id>
+    GET  /search?q=&set_id=&limit=      [{vocab_id, set_id, word, definition}]
+
+Requests are parsed on the asyncio event loop; every SQLite call runs on a
+bounded thread pool, where each worker thread has its own WAL connection, so
+readers don't wait on each other or on a writer. A session unused for
+SESSION_TTL seconds is dropped, along with the words it had handed out.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .database import Database
+from .deckquery import session_source
+from .grading import Grader, GradingOptions
+from .review_log import ReviewLogWriter
+from .search import search_vocab
+from .session import TrainingSession
+from . import profiles, sets, stats
+
+MAX_BODY = 10 * 1024 * 1024
+DEFAULT_PAGE = 500
+SESSION_TTL = 30 * 60
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+
+class VocabAPI:
+    """Request handlers; each runs on a worker thread and returns (status, payload)."""
+
+    def __init__(self, review_log=None, session_ttl=SESSION_TTL, clock=time.monotonic):
+        self.review_log = review_log
+        self.session_ttl = session_ttl
+        self.clock = clock
+        self.sessions = {}
+        # {session_id: clock() when last used}
+        self.last_used = {}
+        self.next_sweep = clock() + session_ttl
+        self.sessions_lock = threading.Lock()
+        self.session_ids = itertools.count(1)
+        self.routes = [
+            ("GET", re.compile(r"/profiles"), self.list_profiles),
+            ("GET", re.compile(r"/stats"), self.get_stats),
+            ("GET", re.compile(r"/sets"), self.list_sets),
+            ("GET", re.compile(r"/sets/(\d+)"), self.get_set),
+            ("POST", re.compile(r"/sets/(\d+)/changes"), self.save_changes),
+            ("POST", re.compile(r"/sessions"), self.start_session),
+            ("GET", re.compile(r"/sessions/(\d+)/batch"), self.next_batch),
+            ("POST", re.compile(r"/sessions/(\d+)/answers"), self.submit_answers),
+            ("DELETE", re.compile(r"/sessions/(\d+)"), self.end_session),
+            ("GET", re.compile(r"/search"), self.search),
+        ]
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groups()
+                allowed = True
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No such resource: {path}")
+
+    def list_profiles(self, query, body):
+        return HTTPStatus.OK, [{"profile_id": profile_id, "name": name}
+                               for profile_id, name in profiles.list_profiles()]
+
+    def get_stats(self, query, body):
+        # set_ids is comma separated: /stats?set_ids=1,2
+        profile_id = _int(query.get("profile_id", profiles.DEFAULT_PROFILE), "profile_id")
+        set_ids = [_int(set_id, "set_ids")
+                   for set_id in query.get("set_ids", "").split(",") if set_id]
+        days = min(_int(query.get("days", 14), "days"), 366)
+        totals = stats.summary(profile_id, set_ids)
+        totals["per_day"] = [{"day": day, "reviews": reviews, "correct": correct}
+                             for day, reviews, correct in stats.reviews_per_day(profile_id, days)]
+        return HTTPStatus.OK, totals
+
+    def list_sets(self, query, body):
+        return HTTPStatus.OK, [
+            {"set_id": set_id, "name": name, "description": description, "words": words}
+            for set_id, name, description, words in sets.list_sets()]
+
+    def get_set(self, query, body, set_id):
+        set_id = int(set_id)
+        offset = _int(query.get("offset", 0), "offset")
+        if offset < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "offset must not be negative")
+        # SQLite reads a negative LIMIT as no limit at all
+        limit = max(1, min(_int(query.get("limit", DEFAULT_PAGE), "limit"), 10 * DEFAULT_PAGE))
+        conn = Database.get_connection()
+        row = conn.execute(
+            "SELECT name, description FROM vocab_sets WHERE set_id=?", (set_id,)).fetchone()
+        if row is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No vocab set {set_id}")
+        words = conn.execute(
+            "SELECT COUNT(*) FROM vocab WHERE set_id=?", (set_id,)).fetchone()[0]
+        rows = conn.execute("""
+            SELECT vocab_id, word, definition FROM vocab WHERE set_id=?
+            ORDER BY vocab_id LIMIT ? OFFSET ?""", (set_id, limit, offset)).fetchall()
+        return HTTPStatus.OK, {
+            "set_id": set_id, "name": row[0], "description": row[1], "words": words,
+            "rows": [list(r) for r in rows]}
+
+    def search(self, query, body):
+        set_id = query.get("set_id")
+        rows = search_vocab(
+            query.get("q", ""),
+            set_id=None if set_id is None else _int(set_id, "set_id"),
+            limit=max(1, min(_int(query.get("limit", 50), "limit"), DEFAULT_PAGE)))
+        return HTTPStatus.OK, [
+            {"vocab_id": vocab_id, "set_id": set_id, "word": word, "definition": definition}
+            for vocab_id, set_id, word, definition in rows]
+
+    def save_changes(self, query, body, set_id):
+        try:
+            sets.save_set_changes(
+                int(set_id),
+                name=body.get("name"),
+                description=body.get("description"),
+                inserted=[(word, definition) for word, definition in body.get("inserted", [])],
+                updated=[(vocab_id, word, definition)
+                         for vocab_id, word, definition in body.get("updated", [])],
+                deleted=body.get("deleted", []))
+        except sqlite3.IntegrityError:
+            raise HTTPError(HTTPStatus.CONFLICT, "Each word and the set name must be unique.")
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed change list")
+        return HTTPStatus.OK, {"saved": True}
+
+    def _sweep(self, now):
+        # drop sessions idle for longer than session_ttl, e.g. of clients that
+        # went away without ending them; called with sessions_lock held
+        if now < self.next_sweep:
+            return
+        self.next_sweep = now + self.session_ttl / 10
+        expired = [session_id for session_id, used in self.last_used.items()
+                   if now - used > self.session_ttl]
+        for session_id in expired:
+            del self.sessions[session_id]
+            del self.last_used[session_id]
+
+    def _session(self, session_id):
+        now = self.clock()
+        with self.sessions_lock:
+            self._sweep(now)
+            entry = self.sessions.get(int(session_id))
+            if entry is not None:
+                self.last_used[int(session_id)] = now
+        if entry is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No session {session_id}")
+        return entry
+
+    def start_session(self, query, body):
+        if "set_ids" in body:
+            if not isinstance(body["set_ids"], list):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "set_ids must be a list")
+            set_ids = [_int(set_id, "set_ids") for set_id in body["set_ids"]]
+        else:
+            set_ids = [_int(body.get("set_id"), "set_id")]
+        tags = body.get("tags", [])
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "tags must be a list of strings")
+        wrong_days = body.get("wrong_days")
+        if wrong_days is not None and not isinstance(wrong_days, (int, float)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "wrong_days must be a number")
+        number_of_words = _int(body.get("number_of_words", 10), "number_of_words")
+        fuzzy = body.get("fuzzy", False)
+        if not isinstance(fuzzy, bool):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "fuzzy must be true or false")
+        profile_id = _int(body.get("profile_id", profiles.DEFAULT_PROFILE), "profile_id")
+        conn = Database.get_connection()
+        if conn.execute("SELECT 1 FROM profiles WHERE profile_id=?", (profile_id,)).fetchone() is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No profile {profile_id}")
+        for set_id in set_ids:
+            if conn.execute("SELECT 1 FROM vocab_sets WHERE set_id=?", (set_id,)).fetchone() is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No vocab set {set_id}")
+        set_id, query = session_source(set_ids, tags, wrong_days, profile_id)
+        session = TrainingSession(set_id, number_of_words, self.review_log, query=query,
+                                  profile_id=profile_id,
+                                  grader=Grader(GradingOptions(fuzzy=fuzzy)))
+        now = self.clock()
+        with self.sessions_lock:
+            self._sweep(now)
+            session_id = next(self.session_ids)
+            # a session is used by one client; the lock serializes its requests
+            self.sessions[session_id] = (session, threading.Lock())
+            self.last_used[session_id] = now
+        return HTTPStatus.CREATED, {"session_id": session_id}
+
+    def next_batch(self, query, body, session_id):
+        session, lock = self._session(session_id)
+        with lock:
+            batch = session.next_batch()
+        return HTTPStatus.OK, {"words": [{"vocab_id": vocab_id, "word": word}
+                                         for vocab_id, word, _definition in batch]}
+
+    def submit_answers(self, query, body, session_id):
+        session, lock = self._session(session_id)
+        answers = body.get("answers")
+        if not isinstance(answers, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "answers must be an object")
+        # JSON object keys are strings
+        answers = {_int(k, "vocab_id"): str(v) for k, v in answers.items()}
+        with lock:
+            results = session.submit(answers)
+        return HTTPStatus.OK, {
+            "results": [{"vocab_id": vocab_id, "word": word, "definition": definition,
+                         "answer": answer, "correct": correct}
+                        for vocab_id, word, definition, answer, correct in results],
+            "correct": sum(1 for result in results if result[4]),
+            "total": len(results)}
+
+    def end_session(self, query, body, session_id):
+        with self.sessions_lock:
+            if self.sessions.pop(int(session_id), None) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No session {session_id}")
+            del self.last_used[int(session_id)]
+        return HTTPStatus.OK, {"ended": True}
+
+
+class APIServer:
+    def __init__(self, api, host="127.0.0.1", port=8765, workers=8):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vocab-api")
+        # Requests beyond this wait on the loop instead of piling up in the
+        # executor's unbounded queue
+        self.slots = asyncio.Semaphore(workers * 4)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def call(self, handler, *args):
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, handler, *args)
+
+    async def handle_request(self, method, target, raw_body):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            handler, args = self.api.route(method, url.path.rstrip("/") or "/")
+            try:
+                body = json.loads(raw_body) if raw_body else {}
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+            return await self.call(handler, query, body, *args)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except sqlite3.Error as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Database error: {e}"}
+        except Exception:
+            # a bug in a handler; the client still gets an answer
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # the body cannot be found, so neither can the next request
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}
+                    keep_alive = False
+                else:
+                    raw_body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle_request(method, target, raw_body)
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version == "HTTP/1.1")
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, workers):
+    review_log = ReviewLogWriter()
+    server = APIServer(VocabAPI(review_log), host, port, workers)
+    await server.start()
+    print(f"Serving on http://{server.host}:{server.port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+        review_log.close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8,
+                        help="threads running SQLite queries (default: 8)")
+    parser.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+from .database import Database
+from .deck import Deck
+from .grading import Grader
+from .metrics import metrics
+from .profiles import DEFAULT_PROFILE
+from .scheduler import QUALITY_CORRECT, QUALITY_INCORRECT, Scheduler
+from .synonyms import synonyms_for
+
+
+class TrainingSession:
+    """Hands out quiz batches for one set and grades the answers.
+
+    Words handed out are pending until they are graded or released, and are
+    not handed out again in the meantime. With order "due" batches come from
+    the spaced-repetition scheduler and hold only words that are due, so a
+    batch may be short or empty; "ahead" fills it up with the words due
+    soonest; with "shuffle" they cycle through the set in random order. Answers update the scheduler either way. The methods may
+    be called from different threads, e.g. batches prefetched in the background.
+
+    With a DeckQuery the session draws from the words it matches, which may
+    span several sets; set_id can then be None. Words are told apart by
+    vocab_id, so the same word from two sets is asked twice.
+
+    Progress is kept per profile; a query should be for the same profile_id.
+    """
+
+    ORDERS = ("due", "ahead", "shuffle")
+
+    def __init__(self, set_id, number_of_words=0, review_log=None, clock=time.time,
+                 grader=None, order="due", query=None, profile_id=DEFAULT_PROFILE):
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown word order {order!r}")
+        self.set_id = set_id
+        self.number_of_words = number_of_words
+        self.review_log = review_log
+        self.profile_id = profile_id
+        self.clock = clock
+        self.order = order
+        self.scheduler = Scheduler(set_id, clock, profile_id)
+        if order == "shuffle":
+            self.picker = Deck(set_id, query=query)
+        else:
+            self.picker = self.scheduler if query is None else query
+        self.grader = grader or Grader()
+        # {vocab_id: (word, definition)}
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def next_batch(self):
+        with self._lock, metrics.timer("session.next_batch"):
+            return self._next_batch()
+
+    def _next_batch(self):
+        # batch in the format [(vocab_id, word, definition)]; 0 words means
+        # the whole set
+        exclude = list(self.pending)
+        if self.order == "shuffle":
+            rows = self.picker.next_batch(self.number_of_words, exclude=exclude)
+        else:
+            rows = self.picker.next_batch(self.number_of_words, exclude=exclude,
+                                          ahead=self.order == "ahead", now=self.clock())
+        # normalize the definitions and synonyms now so grading the answers is cheap
+        self.grader.prepare([(vocab_id, definition) for vocab_id, _, definition in rows],
+                            synonyms_for([vocab_id for vocab_id, _, _ in rows]))
+        batch = []
+        for vocab_id, word, definition in rows:
+            if vocab_id in self.pending:
+                continue
+            self.pending[vocab_id] = (word, definition)
+            batch.append((vocab_id, word, definition))
+        return batch
+
+    def release(self, vocab_ids):
+        # The batch was dismissed without answering; its words can be shown again
+        with self._lock:
+            for vocab_id in vocab_ids:
+                self.pending.pop(vocab_id, None)
+
+    def submit(self, answers):
+        """Grade {vocab_id: answer} and record the results.
+
+        Returns [(vocab_id, word, definition, answer, correct)] for the words
+        that were pending; anything else is ignored.
+        """
+        with self._lock, metrics.timer("session.submit"):
+            return self._submit(answers)
+
+    def _submit(self, answers):
+        results = []
+        graded = []
+        logged = []
+        for vocab_id, answer in answers.items():
+            if vocab_id not in self.pending:
+                continue
+            word, definition = self.pending.pop(vocab_id)
+            correct = self.grader.grade(vocab_id, answer, definition)
+            results.append((vocab_id, word, definition, answer, correct))
+            graded.append((vocab_id, QUALITY_CORRECT if correct else QUALITY_INCORRECT))
+            logged.append((vocab_id, answer, correct))
+        if self.review_log is not None and logged:
+            set_ids = self._set_ids(vocab_id for vocab_id, _, _ in logged)
+            for vocab_id, answer, correct in logged:
+                if vocab_id in set_ids:
+                    self.review_log.log(vocab_id, set_ids[vocab_id], answer, correct,
+                                        profile_id=self.profile_id)
+        self.scheduler.record(graded)
+        return results
+
+    def _set_ids(self, vocab_ids):
+        # {vocab_id: set_id}; only looked up when the session spans sets
+        if self.set_id is not None:
+            return {vocab_id: self.set_id for vocab_id in vocab_ids}
+        return dict(Database.get_connection().execute(
+            "SELECT vocab_id, set_id FROM vocab WHERE vocab_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(vocab_ids)),)).fetchall())
@@ -0,0 +1,113 @@
+from types import MappingProxyType
+
+from .cache import set_cache
+from .database import Database
+
+
+class SetExistsError(ValueError):
+    pass
+
+
+# vocab sets in the format {name: (id, description)}
+def get_vocab_sets():
+    def load():
+        c = Database.get_connection().execute(
+            "SELECT set_id, name, description FROM vocab_sets ORDER BY set_id")
+        vocab_sets = {name: (set_id, description)
+                      for set_id, name, description in c.fetchall()}
+        c.close()
+        return vocab_sets
+    # a copy, so callers may keep and change theirs
+    return dict(set_cache.get(set_cache.METADATA, "sets", load, size=_no_words))
+
+
+# [(set_id, name, description, number of words)]
+def list_sets():
+    def load():
+        c = Database.get_connection().execute("""
+            SELECT s.set_id, s.name, s.description, COUNT(v.vocab_id)
+            FROM vocab_sets s LEFT JOIN vocab v ON v.set_id = s.set_id
+            GROUP BY s.set_id ORDER BY s.set_id""")
+        sets = c.fetchall()
+        c.close()
+        return sets
+    return list(set_cache.get(set_cache.METADATA, "counts", load, size=_no_words))
+
+
+# vocab list in the format {word: definition}, read-only since it is shared
+def get_vocab_list(set_id):
+    def load():
+        c = Database.get_connection().execute(
+            "SELECT word, definition FROM vocab WHERE set_id=? ORDER BY vocab_id", (set_id,))
+        vocab_list = MappingProxyType(dict(c.fetchall()))
+        c.close()
+        return vocab_list
+    return set_cache.get(set_id, "vocab", load)
+
+
+def get_set_id(name):
+    entry = get_vocab_sets().get(name)
+    return None if entry is None else entry[0]
+
+
+def get_vocab_id(set_id, word):
+    row = Database.get_connection().execute(
+        "SELECT vocab_id FROM vocab WHERE set_id=? AND word=?", (set_id, word)).fetchone()
+    return None if row is None else row[0]
+
+
+def _no_words(value):
+    # metadata is small; it counts against the entry limit only
+    return 0
+
+
+def create_set(name, description, vocab_items):
+    # vocab_items in the format [(word, definition)]
+    # imported here, so commands that only read sets never load the importer
+    from .importer import import_rows
+
+    with Database.transaction() as conn:
+        if conn.execute("SELECT 1 FROM vocab_sets WHERE name=?", (name,)).fetchone():
+            raise SetExistsError(f"A set named {name!r} already exists.")
+        set_id = conn.execute(
+            "INSERT INTO vocab_sets (name, description) VALUES (?, ?)",
+            (name, description)).lastrowid
+        import_rows(set_id, vocab_items)
+    set_cache.invalidate(set_id)
+    return set_id
+
+
+def delete_set(name):
+    with Database.transaction() as conn:
+        row = conn.execute("SELECT set_id FROM vocab_sets WHERE name = ?", (name,)).fetchone()
+        conn.execute("DELETE FROM vocab_sets WHERE name = ?", (name,))
+    if row is not None:
+        set_cache.invalidate(row[0])
+
+
+def save_set_changes(set_id, name=None, description=None,
+                     inserted=(), updated=(), deleted=()):
+    """Apply an edit to a set in one transaction.
+
+    inserted is [(word, definition)], updated is [(vocab_id, word, definition)]
+    and deleted is [vocab_id]; only those rows are written. name and
+    description are left alone when None. Raises sqlite3.IntegrityError (and
+    writes nothing) if a word or the name would no longer be unique.
+    """
+    with Database.transaction() as conn:
+        c = conn.cursor()
+        c.executemany("DELETE FROM vocab WHERE vocab_id=? AND set_id=?",
+                      ((vocab_id, set_id) for vocab_id in deleted))
+        c.executemany(
+            "UPDATE vocab SET word=?, definition=? WHERE vocab_id=? AND set_id=?",
+            ((word, definition, vocab_id, set_id) for vocab_id, word, definition in updated))
+        c.executemany(
+            "INSERT INTO vocab (set_id, word, definition) VALUES (?, ?, ?)",
+            ((set_id, word, definition) for word, definition in inserted))
+        if name is not None:
+            c.execute("UPDATE vocab_sets SET name=? WHERE set_id=?", (name, set_id))
+        if description is not None:
+            c.execute("UPDATE vocab_sets SET description=? WHERE set_id=?",
+                      (description, set_id))
+        c.close()
+    set_cache.invalidate(set_id)
@@ -0,0 +1,137 @@
+import json
+import time
+
+from .database import Database
+from .migrations import DAY_SECONDS, MASTERED_STREAK
+from .profiles import DEFAULT_PROFILE
+from .sets import list_sets
+
+# The totals read here are kept by the review_log_stats trigger (migration 8),
+# which adds every answer as it is written to review_log. Each function reads
+# a handful of rows by primary key, never the history itself. Answers still
+# queued in a ReviewLogWriter are not counted until it flushes.
+
+
+def today(now=None):
+    # UTC day number, the same as review_rollup.day and daily_stats.day
+    return int((time.time() if now is None else now) // DAY_SECONDS)
+
+
+def summary(profile_id=DEFAULT_PROFILE, set_ids=(), now=None):
+    """Totals for the dashboard, as a dict.
+
+    reviews, correct, accuracy (0 to 1, None before any answer),
+    answer_streak and best_answer_streak (correct answers in a row),
+    day_streak and best_day_streak (days in a row with an answer; the current
+    one is 0 once a whole day has passed without one), today_reviews,
+    today_correct, and sets: one dict per set in set_ids (every set if empty)
+    with set_id, name, words, mastered, reviews and correct.
+    """
+    day = today(now)
+    conn = Database.get_connection()
+    row = conn.execute("""
+        SELECT reviews, correct, answer_streak, best_answer_streak, day_streak,
+               best_day_streak, last_day
+        FROM profile_stats WHERE profile_id=?""", (profile_id,)).fetchone()
+    reviews, correct, answer_streak, best_answer_streak, day_streak, best_day_streak, last_day = (
+        row or (0, 0, 0, 0, 0, 0, None))
+    if last_day is None or last_day < day - 1:
+        day_streak = 0
+    row = conn.execute("SELECT reviews, correct FROM daily_stats WHERE profile_id=? AND day=?",
+                       (profile_id, day)).fetchone()
+    today_reviews, today_correct = row or (0, 0)
+    return {
+        "reviews": reviews,
+        "correct": correct,
+        "accuracy": correct / reviews if reviews else None,
+        "answer_streak": answer_streak,
+        "best_answer_streak": best_answer_streak,
+        "day_streak": day_streak,
+        "best_day_streak": best_day_streak,
+        "today_reviews": today_reviews,
+        "today_correct": today_correct,
+        "sets": set_mastery(profile_id, set_ids),
+    }
+
+
+def set_mastery(profile_id=DEFAULT_PROFILE, set_ids=()):
+    # [{set_id, name, words, mastered, reviews, correct}], word counts come
+    # from the cached set list
+    wanted = set(set_ids)
+    listed = [(set_id, name, words) for set_id, name, _description, words in list_sets()
+              if not wanted or set_id in wanted]
+    if not listed:
+        return []
+    c = Database.get_connection().execute("""
+        SELECT set_id, mastered, reviews, correct FROM set_stats
+        WHERE profile_id = ? AND set_id IN (SELECT value FROM json_each(?))""",
+        (profile_id, json.dumps([set_id for set_id, _name, _words in listed])))
+    totals = {set_id: rest for set_id, *rest in c.fetchall()}
+    c.close()
+    result = []
+    for set_id, name, words in listed:
+        mastered, reviews, correct = totals.get(set_id, (0, 0, 0))
+        result.append({"set_id": set_id, "name": name, "words": words,
+                       "mastered": mastered, "reviews": reviews, "correct": correct})
+    return result
+
+
+def reviews_per_day(profile_id=DEFAULT_PROFILE, days=14, now=None):
+    # [(day start as unix time, reviews, correct)] for the last `days` days,
+    # oldest first, with days without answers as zeros
+    last = today(now)
+    first = last - days + 1
+    c = Database.get_connection().execute("""
+        SELECT day, reviews, correct FROM daily_stats
+        WHERE profile_id = ? AND day BETWEEN ? AND ?""", (profile_id, first, last))
+    counts = {day: (reviews, correct) for day, reviews, correct in c.fetchall()}
+    c.close()
+    return [(day * DAY_SECONDS, *counts.get(day, (0, 0))) for day in range(first, last + 1)]
+
+
+def word_accuracy(vocab_ids, profile_id=DEFAULT_PROFILE):
+    # {vocab_id: (reviews, correct, streak)} for the words that have been answered
+    c = Database.get_connection().execute("""
+        SELECT vocab_id, reviews, correct, streak FROM word_stats
+        WHERE profile_id = ? AND vocab_id IN (SELECT value FROM json_each(?))""",
+        (profile_id, json.dumps(list(vocab_ids))))
+    accuracy = {vocab_id: tuple(rest) for vocab_id, *rest in c.fetchall()}
+    c.close()
+    return accuracy
+
+
+def weakest_words(set_id, profile_id=DEFAULT_PROFILE, limit=10):
+    # [(word, definition, reviews, correct)], lowest accuracy first, among the
+    # set's words that have been answered and are not mastered
+    c = Database.get_connection().execute("""
+        SELECT v.word, v.definition, w.reviews, w.correct
+        FROM word_stats w JOIN vocab v ON v.vocab_id = w.vocab_id
+        WHERE w.profile_id = ? AND w.set_id = ? AND w.streak < ?
+        ORDER BY CAST(w.correct AS REAL) / w.reviews, w.reviews DESC
+        LIMIT ?""", (profile_id, set_id, MASTERED_STREAK, limit))
+    words = c.fetchall()
+    c.close()
+    return words
+
+
+def summary_lines(totals):
+    # the summary as short lines of text, for the training window and the CLI
+    accuracy = totals["accuracy"]
+    lines = [
+        f"Today: {totals['today_correct']} / {totals['today_reviews']} correct",
+        f"All time: {totals['correct']} / {totals['reviews']} correct"
+        + (f" ({accuracy:.0%})" if accuracy is not None else ""),
+        f"Answer streak: {totals['answer_streak']} (best {totals['best_answer_streak']})",
+        f"Day streak: {totals['day_streak']} (best {totals['best_day_streak']})",
+    ]
+    for entry in totals["sets"]:
+        lines.append(f"{entry['name']}: {entry['mastered']} / {entry['words']} mastered")
+    return lines
+
+
+def weakest_lines(set_name, words):
+    # weakest_words() as short lines of text, for the training window and the CLI
+    if not words:
+        return []
+    return [f"Weakest in {set_name}:"] + [
+        f"  {word}: {correct} / {reviews} correct" for word, _definition, reviews, correct in words]
@@ -0,0 +1,448 @@
+"""Merge copies of the vocab database by exchanging changesets.
+
+    python -m vocab_core sync export changes.json [--peer SITE] [--full]
+    python -m vocab_core sync import changes.json
+    python -m vocab_core sync serve [--host 127.0.0.1] [--port 8766]
+    python -m vocab_core sync connect [--host 127.0.0.1] [--port 8766]
+    python -m vocab_core sync peers
+
+Every copy is a site with a random id. Sets and words carry a uid shared by
+all copies, a Lamport stamp and the site of their last change; deletions
+leave tombstones (migration 9). A changeset holds the rows and tombstones
+changed since a peer last heard from this site, so a sync costs
+O(changes). Applying one is deterministic, so every copy ends up the same:
+
+* the newer (stamp, site) of a row or tombstone wins, field values and all;
+* a row made separately in two copies under the same set name, or the same
+  (set, word), is merged into the one with the smaller uid, and the other
+  uid becomes an alias of it. Merged words keep both copies' progress;
+* words of a set that is deleted, or unknown here, are dropped.
+
+Only vocab sets and words are synced; review progress, settings and
+profiles stay with each copy.
+"""
+import argparse
+import gzip
+import json
+import socket
+import socketserver
+import sys
+import time
+
+from .cache import set_cache
+from .database import Database
+from .dedup import merge_rows
+
+FORMAT = 1
+DEFAULT_PORT = 8766
+
+
+class SyncError(Exception):
+    pass
+
+
+def local_site():
+    return Database.get_connection().execute("SELECT site FROM sync_clock").fetchone()[0]
+
+
+# [(site, received, acked, last_sync)]
+def list_peers():
+    return Database.get_connection().execute(
+        "SELECT site, received, acked, last_sync FROM sync_peers ORDER BY last_sync DESC").fetchall()
+
+
+def _peer(conn, site):
+    row = conn.execute("SELECT received, acked FROM sync_peers WHERE site=?", (site,)).fetchone()
+    return row or (0, 0)
+
+
+def changes_since(since, peer=None):
+    """The changeset of everything changed here after local seq `since`.
+
+    With peer (a site id), it also says how much of that peer's changes
+    this copy has applied, so the peer knows what to send next time.
+    """
+    with Database.snapshot() as conn:
+        site, counter, seq = conn.execute("SELECT site, counter, seq FROM sync_clock").fetchone()
+        changes = {
+            "format": FORMAT,
+            "site": site,
+            "clock": counter,
+            "since": since,
+            "until": seq,
+            # [uid, name, description, stamp, site]
+            "sets": conn.execute("""
+                SELECT uid, name, description, stamp, site FROM vocab_sets
+                WHERE seq > ?""", (since,)).fetchall(),
+            # [uid, set uid, word, definition, stamp, site]
+            "vocab": conn.execute("""
+                SELECT v.uid, s.uid, v.word, v.definition, v.stamp, v.site
+                FROM vocab v JOIN vocab_sets s ON s.set_id = v.set_id
+                WHERE v.seq > ?""", (since,)).fetchall(),
+            # [uid, "set" or "vocab", stamp, site]
+            "tombstones": conn.execute("""
+                SELECT uid, kind, stamp, site FROM sync_tombstones
+                WHERE seq > ?""", (since,)).fetchall(),
+            # [uid, uid it was merged into]
+            "aliases": conn.execute(
+                "SELECT uid, target FROM sync_aliases WHERE seq > ?", (since,)).fetchall(),
+        }
+        if peer is not None:
+            changes["received"] = _peer(conn, peer)[0]
+    return changes
+
+
+class _Apply:
+    # one changeset being applied inside a transaction
+
+    def __init__(self, conn, seq):
+        self.conn = conn
+        self.seq = seq
+        self.applied = 0
+        self.skipped = 0
+
+    def resolve(self, uid):
+        # follow aliases to the uid a row now has
+        while True:
+            row = self.conn.execute(
+                "SELECT target FROM sync_aliases WHERE uid=?", (uid,)).fetchone()
+            if row is None:
+                return uid
+            uid = row[0]
+
+    def alias(self, uid, target):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO sync_aliases (uid, target, seq) VALUES (?, ?, ?)",
+            (uid, target, self.seq))
+
+    def tombstoned(self, uid, stamp, site):
+        # whether a tombstone here is at least as new as (stamp, site)
+        row = self.conn.execute(
+            "SELECT stamp, site FROM sync_tombstones WHERE uid=?", (uid,)).fetchone()
+        return row is not None and tuple(row) >= (stamp, site)
+
+    def set_row(self, uid, name, description, stamp, site):
+        conn = self.conn
+        uid = self.resolve(uid)
+        if self.tombstoned(uid, stamp, site):
+            self.skipped += 1
+            return
+        row = conn.execute("SELECT set_id, stamp, site FROM vocab_sets WHERE uid=?",
+                           (uid,)).fetchone()
+        if row is not None and (stamp, site) <= (row[1], row[2]):
+            self.skipped += 1
+            return
+        other = conn.execute("SELECT set_id, uid, name, description, stamp, site FROM vocab_sets "
+                             "WHERE name=? AND uid<>?", (name, uid)).fetchone()
+        if other is not None:
+            self.merge_sets(row[0] if row else None, uid, (name, description, stamp, site), other)
+        elif row is not None:
+            conn.execute("""
+                UPDATE vocab_sets SET name=?, description=?, stamp=?, site=?, seq=?
+                WHERE set_id=?""", (name, description, stamp, site, self.seq, row[0]))
+        else:
+            conn.execute("""
+                INSERT INTO vocab_sets (name, description, uid, stamp, site, seq)
+                VALUES (?, ?, ?, ?, ?, ?)""", (name, description, uid, stamp, site, self.seq))
+        conn.execute("DELETE FROM sync_tombstones WHERE uid=?", (uid,))
+        self.applied += 1
+
+    def merge_sets(self, set_id, uid, fields, other):
+        # the incoming set (set_id here, or None if it is new) and another set
+        # of the same name become one, under the smaller uid
+        conn = self.conn
+        other_id, other_uid, *other_fields = other
+        keep_uid, drop_uid = sorted((uid, other_uid))
+        name, description, stamp, site = max(fields, tuple(other_fields), key=lambda f: f[2:])
+        self.alias(drop_uid, keep_uid)
+        if set_id is not None:
+            # both are here: the words of one move to the other
+            keep_id, drop_id = (set_id, other_id) if keep_uid == uid else (other_id, set_id)
+            c = conn.execute("SELECT vocab_id, uid, word, definition, stamp, site FROM vocab "
+                             "WHERE set_id=?", (drop_id,))
+            for vocab_id, word_uid, word, definition, word_stamp, word_site in c.fetchall():
+                self.place_word(vocab_id, word_uid, keep_id, word, definition, word_stamp, word_site)
+            conn.execute("DELETE FROM vocab_sets WHERE set_id=?", (drop_id,))
+        else:
+            keep_id = other_id
+        conn.execute("""
+            UPDATE vocab_sets SET uid=?, name=?, description=?, stamp=?, site=?, seq=?
+            WHERE set_id=?""", (keep_uid, name, description, stamp, site, self.seq, keep_id))
+
+    def place_word(self, vocab_id, uid, set_id, word, definition, stamp, site):
+        """Give the word row vocab_id (None for a new word) these values.
+
+        If another row already holds (set_id, word), the two are merged under
+        the smaller uid and the newer values.
+        """
+        conn = self.conn
+        other = conn.execute("""
+            SELECT vocab_id, uid, definition, stamp, site FROM vocab
+            WHERE set_id=? AND word=? AND uid<>?""", (set_id, word, uid)).fetchone()
+        if other is not None:
+            other_id, other_uid, other_definition, other_stamp, other_site = other
+            keep_uid, drop_uid = sorted((uid, other_uid))
+            definition, stamp, site = max((definition, stamp, site),
+                                          (other_definition, other_stamp, other_site),
+                                          key=lambda f: f[1:])
+            self.alias(drop_uid, keep_uid)
+            if vocab_id is not None:
+                # the row already in the set stays, under the kept uid, so
+                # only the other row's progress changes set
+                merge_rows(conn, [(other_id, set_id, vocab_id)])
+            uid, vocab_id = keep_uid, other_id
+        if vocab_id is None:
+            conn.execute("""
+                INSERT INTO vocab (set_id, word, definition, uid, stamp, site, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (set_id, word, definition, uid, stamp, site, self.seq))
+        else:
+            conn.execute("""
+                UPDATE vocab SET set_id=?, word=?, definition=?, uid=?, stamp=?, site=?, seq=?
+                WHERE vocab_id=?""",
+                (set_id, word, definition, uid, stamp, site, self.seq, vocab_id))
+
+    def vocab_row(self, uid, set_uid, word, definition, stamp, site):
+        conn = self.conn
+        uid = self.resolve(uid)
+        if self.tombstoned(uid, stamp, site):
+            self.skipped += 1
+            return
+        row = conn.execute("SELECT vocab_id, stamp, site FROM vocab WHERE uid=?", (uid,)).fetchone()
+        if row is not None and (stamp, site) <= (row[1], row[2]):
+            self.skipped += 1
+            return
+        set_row = conn.execute("SELECT set_id FROM vocab_sets WHERE uid=?",
+                               (self.resolve(set_uid),)).fetchone()
+        if set_row is None:
+            # its set was deleted here, or never arrived
+            self.skipped += 1
+            return
+        self.place_word(row[0] if row else None, uid, set_row[0], word, definition, stamp, site)
+        conn.execute("DELETE FROM sync_tombstones WHERE uid=?", (uid,))
+        self.applied += 1
+
+    def tombstone(self, uid, kind, stamp, site):
+        conn = self.conn
+        uid = self.resolve(uid)
+        if self.tombstoned(uid, stamp, site):
+            self.skipped += 1
+            return
+        table, key = ("vocab_sets", "set_id") if kind == "set" else ("vocab", "vocab_id")
+        row = conn.execute(f"SELECT {key}, stamp, site FROM {table} WHERE uid=?", (uid,)).fetchone()
+        if row is not None and (stamp, site) <= (row[1], row[2]):
+            # changed here after it was deleted there; the change wins
+            self.skipped += 1
+            return
+        # written first, so the delete trigger leaves it alone
+        conn.execute("""
+            INSERT INTO sync_tombstones (uid, kind, stamp, site, seq) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (uid) DO UPDATE SET
+                stamp = excluded.stamp, site = excluded.site, seq = excluded.seq""",
+            (uid, kind, stamp, site, self.seq))
+        if row is not None:
+            conn.execute(f"DELETE FROM {table} WHERE {key}=?", (row[0],))
+        self.applied += 1
+
+    def fold_alias(self, uid, target):
+        # a peer merged uid into target; do the same with the rows here
+        conn = self.conn
+        target = self.resolve(target)
+        if uid == target:
+            return
+        self.alias(uid, target)
+        row = conn.execute("SELECT set_id, name, description, stamp, site FROM vocab_sets "
+                           "WHERE uid=?", (uid,)).fetchone()
+        if row is not None:
+            other = conn.execute("SELECT set_id, uid, name, description, stamp, site "
+                                 "FROM vocab_sets WHERE uid=?", (target,)).fetchone()
+            if other is None:
+                conn.execute("UPDATE vocab_sets SET uid=?, seq=? WHERE set_id=?",
+                             (target, self.seq, row[0]))
+            else:
+                self.merge_sets(row[0], uid, tuple(row[1:]), other)
+            return
+        row = conn.execute("SELECT vocab_id, set_id, word, definition, stamp, site FROM vocab "
+                           "WHERE uid=?", (uid,)).fetchone()
+        if row is None:
+            return
+        vocab_id, set_id, word, definition, stamp, site = row
+        other = conn.execute("SELECT vocab_id, set_id, word, definition, stamp, site FROM vocab "
+                             "WHERE uid=?", (target,)).fetchone()
+        if other is None:
+            conn.execute("UPDATE vocab SET uid=?, seq=? WHERE vocab_id=?",
+                         (target, self.seq, vocab_id))
+            return
+        # both copies are here: keep the target row with the newer values
+        other_id, other_set, *_ = other
+        _word_id, set_id, word, definition, stamp, site = max(row, other, key=lambda r: r[4:])
+        merge_rows(conn, [(other_id, other_set, vocab_id)])
+        self.place_word(other_id, target, set_id, word, definition, stamp, site)
+
+
+def apply_changes(changes):
+    """Apply a peer's changeset in one transaction; returns (applied, skipped)."""
+    if changes.get("format") != FORMAT:
+        raise SyncError(f"Unsupported changeset format: {changes.get('format')!r}")
+    with Database.transaction() as conn:
+        site, counter, seq = conn.execute("SELECT site, counter, seq FROM sync_clock").fetchone()
+        peer = changes["site"]
+        if peer == site:
+            raise SyncError("This changeset was made by this database.")
+        # everything applied now shares one new seq, so it is passed on to
+        # other peers; the Lamport counter moves past the peer's
+        seq += 1
+        conn.execute("UPDATE sync_clock SET counter=?, seq=?",
+                     (max(counter, changes["clock"]), seq))
+        apply = _Apply(conn, seq)
+        for uid, target in changes["aliases"]:
+            apply.fold_alias(uid, target)
+        # deletes go first, so a set deleted there is not merged into one
+        # given its name in the same changeset
+        for row in changes["tombstones"]:
+            apply.tombstone(*row)
+        for row in changes["sets"]:
+            apply.set_row(*row)
+        for row in changes["vocab"]:
+            apply.vocab_row(*row)
+
+        received, acked = _peer(conn, peer)
+        if changes["since"] <= received:
+            # nothing of the peer's is missing up to `until`
+            received = max(received, changes["until"])
+        acked = max(acked, changes.get("received", 0))
+        conn.execute("""
+            INSERT OR REPLACE INTO sync_peers (site, received, acked, last_sync)
+            VALUES (?, ?, ?, ?)""", (peer, received, acked, time.time()))
+    set_cache.invalidate()
+    return apply.applied, apply.skipped
+
+
+def write_changes(path, peer=None, full=False):
+    # writes the changes a peer has not acknowledged (all of them if full or
+    # the peer is unknown) as JSON, gzipped if path ends in .gz
+    since = 0
+    if peer is not None and not full:
+        since = _peer(Database.get_connection(), peer)[1]
+    changes = changes_since(since, peer)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(changes, f)
+    return changes
+
+
+def read_changes(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Over a socket each side sends one JSON message per line:
+#   client: {"hello": site}
+#   server: {"hello": site, "received": server's received from client}
+#   client: changeset since that, with "received"
+#   server: changeset since the client's "received", computed before applying
+#           the client's, so the client's changes are not echoed straight back
+
+def _send(f, message):
+    f.write(json.dumps(message).encode("utf-8") + b"\n")
+    f.flush()
+
+
+def _receive(f):
+    line = f.readline()
+    if not line:
+        raise SyncError("The peer closed the connection.")
+    return json.loads(line)
+
+
+class SyncHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            hello = _receive(self.rfile)
+            peer = hello["hello"]
+            received, _acked = _peer(Database.get_connection(), peer)
+            _send(self.wfile, {"hello": local_site(), "received": received})
+            incoming = _receive(self.rfile)
+            outgoing = changes_since(incoming.get("received", 0), peer)
+            applied, skipped = apply_changes(incoming)
+            _send(self.wfile, outgoing)
+            print(f"Synced with {peer}: {applied} changes applied, {skipped} already up to date")
+        except (SyncError, ValueError, KeyError) as e:
+            print(f"Sync failed: {e}", file=sys.stderr)
+        finally:
+            # each sync runs on its own thread
+            Database.release()
+
+
+class SyncServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def sync_with(host="127.0.0.1", port=DEFAULT_PORT, timeout=60):
+    """Sync both ways with a `sync serve` peer; returns (applied, skipped) here."""
+    with socket.create_connection((host, port), timeout=timeout) as sock, \
+            sock.makefile("rwb") as f:
+        _send(f, {"hello": local_site()})
+        hello = _receive(f)
+        peer = hello["hello"]
+        _send(f, changes_since(hello.get("received", 0), peer))
+        return apply_changes(_receive(f))
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write this copy's changes to a file")
+    export.add_argument("path", help="changeset file (.json, or .json.gz)")
+    export.add_argument("--peer", help="site id of the copy it is for; only changes it lacks")
+    export.add_argument("--full", action="store_true", help="every set and word")
+    apply = commands.add_parser("import", help="apply a changeset file from another copy")
+    apply.add_argument("path")
+    serve = commands.add_parser("serve", help="wait for copies to sync over a socket")
+    connect = commands.add_parser("connect", help="sync with a copy running sync serve")
+    for command in (serve, connect):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    peers = commands.add_parser("peers", help="list the copies synced with")
+    for command in (export, apply, serve, connect, peers):
+        command.add_argument("--db", help="database file (default: vocabulary.db)")
+    args = parser.parse_args(argv)
+
+    Database.open(args.db)
+    try:
+        if args.command == "export":
+            changes = write_changes(args.path, args.peer, args.full)
+            print(f"Wrote {len(changes['sets'])} sets, {len(changes['vocab'])} words and "
+                  f"{len(changes['tombstones'])} deletions from {changes['site']}")
+        elif args.command == "import":
+            try:
+                applied, skipped = apply_changes(read_changes(args.path))
+            except (OSError, ValueError, KeyError, SyncError) as e:
+                sys.exit(f"Could not apply {args.path}: {e}")
+            print(f"{applied} changes applied, {skipped} already up to date")
+        elif args.command == "serve":
+            with SyncServer((args.host, args.port), SyncHandler) as server:
+                print(f"Site {local_site()} waiting for syncs on {args.host}:{args.port}")
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+        elif args.command == "connect":
+            try:
+                applied, skipped = sync_with(args.host, args.port)
+            except (OSError, ValueError, KeyError, SyncError) as e:
+                sys.exit(f"Sync failed: {e}")
+            print(f"{applied} changes applied, {skipped} already up to date")
+        else:
+            print(f"This copy: {local_site()}")
+            for site, received, acked, last_sync in list_peers():
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_sync)) if last_sync else "-"
+                print(f"{site}  last sync {when}  received {received}  acknowledged {acked}")
+    finally:
+        Database.close()
+
+
+if __name__ == "__main__":
+    main()
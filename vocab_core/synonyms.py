@@ -0,0 +1,29 @@
+import json
+
+from .database import Database
+
+
+def add_synonyms(vocab_id, synonyms):
+    synonyms = [synonym.strip() for synonym in synonyms if synonym.strip()]
+    with Database.transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO vocab_synonyms (vocab_id, synonym) VALUES (?, ?)",
+                         ((vocab_id, synonym) for synonym in synonyms))
+
+
+def remove_synonyms(vocab_id, synonyms):
+    with Database.transaction() as conn:
+        conn.executemany("DELETE FROM vocab_synonyms WHERE vocab_id=? AND synonym=?",
+                         ((vocab_id, synonym.strip()) for synonym in synonyms))
+
+
+def synonyms_for(vocab_ids):
+    # {vocab_id: (synonym, ...)} for the words that have any
+    c = Database.get_connection().execute("""
+        SELECT vocab_id, synonym FROM vocab_synonyms
+        WHERE vocab_id IN (SELECT value FROM json_each(?))
+        ORDER BY vocab_id, synonym""", (json.dumps(list(vocab_ids)),))
+    synonyms = {}
+    for vocab_id, synonym in c.fetchall():
+        synonyms.setdefault(vocab_id, []).append(synonym)
+    c.close()
+    return {vocab_id: tuple(words) for vocab_id, words in synonyms.items()}
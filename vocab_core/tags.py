@@ -0,0 +1,43 @@
+from .database import Database
+
+
+def clean_tag(tag):
+    tag = tag.strip()
+    if not tag:
+        raise ValueError("A tag cannot be empty.")
+    return tag
+
+
+def tag_words(tag, vocab_ids):
+    tag = clean_tag(tag)
+    with Database.transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO vocab_tags (tag, vocab_id) VALUES (?, ?)",
+                         ((tag, vocab_id) for vocab_id in vocab_ids))
+
+
+def tag_set(tag, set_id, words=None):
+    # Tag the given words of a set, or all of them when words is None
+    tag = clean_tag(tag)
+    sql = "INSERT OR IGNORE INTO vocab_tags (tag, vocab_id) SELECT ?, vocab_id FROM vocab WHERE set_id=?"
+    with Database.transaction() as conn:
+        if words is None:
+            c = conn.execute(sql, (tag, set_id))
+            return c.rowcount
+        c = conn.cursor()
+        tagged = 0
+        for word in words:
+            tagged += c.execute(sql + " AND word=?", (tag, set_id, word)).rowcount
+        c.close()
+        return tagged
+
+
+def untag_words(tag, vocab_ids):
+    with Database.transaction() as conn:
+        conn.executemany("DELETE FROM vocab_tags WHERE tag=? AND vocab_id=?",
+                         ((tag, vocab_id) for vocab_id in vocab_ids))
+
+
+# [(tag, number of words)]
+def list_tags():
+    return Database.get_connection().execute(
+        "SELECT tag, COUNT(*) FROM vocab_tags GROUP BY tag ORDER BY tag").fetchall()
@@ -0,0 +1,59 @@
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .database import Database
+
+
+class TaskRunner:
+    """Runs functions on a small thread pool and hands their results back to one thread.
+
+    The owning thread (e.g. the Tk event loop) calls poll() every so often;
+    poll() runs the callback of each finished task on that thread, so the
+    callbacks may touch widgets while the work itself never blocks it.
+    Failures go to on_error(exception) instead, or are printed. pending is
+    the number of tasks whose callback has not run yet, so the owner can stop
+    polling while there is nothing to wait for; submit() and poll() are both
+    called from the owning thread.
+    """
+
+    def __init__(self, workers=2, on_error=None):
+        self.on_error = on_error
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task")
+        # (callback, result, exception) for each finished task
+        self._done = queue.Queue()
+        self.pending = 0
+
+    def submit(self, fn, *args, callback=None):
+        future = self._pool.submit(fn, *args)
+        self.pending += 1
+        future.add_done_callback(
+            lambda f: self._done.put((callback, None if f.exception() else f.result(),
+                                      f.exception())))
+        return future
+
+    def poll(self):
+        # returns the number of callbacks run
+        count = 0
+        while True:
+            try:
+                callback, result, error = self._done.get_nowait()
+            except queue.Empty:
+                return count
+            count += 1
+            self.pending -= 1
+            if error is not None:
+                if self.on_error is not None:
+                    self.on_error(error)
+                else:
+                    traceback.print_exception(type(error), error, error.__traceback__)
+            elif callback is not None:
+                callback(result)
+
+    def close(self, wait=True):
+        # Finishes the tasks already submitted; their callbacks are not run.
+        # The workers' database connections are closed once they have exited
+        # (at the latest when the next connection is opened).
+        self._pool.shutdown(wait=wait)
+        if wait:
+            Database.release_finished()
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import time
+
+
+class SessionClock:
+    """Elapsed and active time of a training session, read from time.monotonic.
+
+    Session time starts at 0 on start() and stands still while paused, so
+    elapsed() never includes pauses and is unaffected by changes to the
+    system clock. Active time is the part of it during which at least one
+    quiz was open (between begin_active() and end_active()).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.start()
+        self.pause()
+
+    def start(self):
+        self.started = self.clock()
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.active_depth = 0
+        self.active_since = None
+        self.active_total = 0.0
+
+    @property
+    def paused(self):
+        return self.paused_at is not None
+
+    def now(self):
+        # seconds of session time since start()
+        current = self.paused_at if self.paused_at is not None else self.clock()
+        return current - self.started - self.paused_total
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = self.clock()
+
+    def resume(self):
+        if self.paused_at is not None:
+            self.paused_total += self.clock() - self.paused_at
+            self.paused_at = None
+
+    def elapsed(self):
+        return self.now()
+
+    def begin_active(self):
+        if self.active_depth == 0:
+            self.active_since = self.now()
+        self.active_depth += 1
+
+    def end_active(self):
+        if self.active_depth == 0:
+            return
+        self.active_depth -= 1
+        if self.active_depth == 0:
+            self.active_total += self.now() - self.active_since
+            self.active_since = None
+
+    def active(self):
+        if self.active_since is None:
+            return self.active_total
+        return self.active_total + self.now() - self.active_since
+
+
+class Timer:
+    __slots__ = ("when", "interval", "callback", "cancelled")
+
+    def __init__(self, when, interval, callback):
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.cancelled = False
+
+
+class Timers:
+    """Callbacks due at points in a SessionClock's time, run by one wake-up.
+
+    Deadlines are kept in a heap. Whoever drives the timers (TimerPump in
+    widgets.py for Tk) asks next_delay() how long it may sleep and calls
+    run_due() when it wakes; everything due within `slack` seconds of then is
+    run in the same wake-up. wakeup(), if set, is called whenever the
+    earliest deadline may have changed, so the driver can re-arm.
+
+    Repeating timers are scheduled from their previous deadline rather than
+    from when they ran, so lateness never accumulates; deadlines missed
+    entirely are skipped instead of run in a burst. pause() stops session
+    time, so nothing falls due until resume() and no timer has to be
+    rescheduled.
+    """
+
+    def __init__(self, clock=None, slack=0.05, wakeup=None):
+        self.clock = clock or SessionClock()
+        self.slack = slack
+        self.wakeup = wakeup
+        self._heap = []
+        self._seq = itertools.count()
+
+    def _push(self, timer):
+        earliest = not self._heap or timer.when < self._heap[0][0]
+        heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+        if earliest:
+            self._changed()
+
+    def _changed(self):
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def call_at(self, when, callback):
+        # run callback once at session time `when`
+        timer = Timer(when, None, callback)
+        self._push(timer)
+        return timer
+
+    def call_later(self, delay, callback):
+        return self.call_at(self.clock.now() + delay, callback)
+
+    def every(self, interval, callback, first=None):
+        # run callback every `interval` seconds, the first time after `first`
+        # seconds (default: one interval)
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        delay = interval if first is None else first
+        timer = Timer(self.clock.now() + delay, interval, callback)
+        self._push(timer)
+        return timer
+
+    def cancel(self, timer):
+        # the heap entry is dropped when it reaches the top
+        if timer is not None:
+            timer.cancelled = True
+
+    def clear(self):
+        for _when, _seq, timer in self._heap:
+            timer.cancelled = True
+        self._heap = []
+        self._changed()
+
+    def pause(self):
+        self.clock.pause()
+        self._changed()
+
+    def resume(self):
+        self.clock.resume()
+        self._changed()
+
+    def next_delay(self):
+        # seconds until the earliest deadline, or None while there is nothing
+        # to wait for (no timers, or paused)
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap or self.clock.paused:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock.now())
+
+    def run_due(self):
+        # run every callback due by now (+ slack); returns how many ran
+        if self.clock.paused:
+            return 0
+        now = self.clock.now()
+        ran = 0
+        while self._heap and self._heap[0][0] <= now + self.slack:
+            when, _seq, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                # the next slot that is not due yet
+                missed = max(0, int((now + self.slack - when) // timer.interval))
+                timer.when = when + (missed + 1) * timer.interval
+                heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+            ran += 1
+            timer.callback()
+            if self.clock.paused:
+                break
+        return ran
@@ -0,0 +1,172 @@
+import math
+import sys
+import tkinter as tk
+import tkinter.ttk as ttk
+
+from vocab_core.metrics import metrics
+
+
+class VirtualTreeview(tk.Frame):
+    """A Treeview with a scrollbar that only holds the rows currently in view.
+
+    Rows come from fetch_rows(offset, limit), which returns a list of
+    (iid, values), and count_rows(), which returns the total number of rows.
+    Scrolling moves a window of `height` rows over the data and asks for just
+    that window, so the number of Tk items stays constant however many rows
+    there are.
+    """
+
+    def __init__(self, master, columns, fetch_rows, count_rows, height=10, **kw):
+        super().__init__(master, **kw)
+        self.fetch_rows = fetch_rows
+        self.count_rows = count_rows
+        self.height = height
+        self.first = 0
+
+        self.tree = ttk.Treeview(
+            self, columns=columns, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(
+            self, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        # Scroll with the mouse wheel (Linux reports the wheel as buttons 4/5)
+        if sys.platform.startswith("linux"):
+            self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+            self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        else:
+            self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Up>", lambda event: self.on_arrow(event, -1))
+        self.tree.bind("<Down>", lambda event: self.on_arrow(event, 1))
+
+        self.refresh()
+
+    def heading(self, column, **kw):
+        return self.tree.heading(column, **kw)
+
+    def column(self, column, **kw):
+        return self.tree.column(column, **kw)
+
+    def on_mousewheel(self, event):
+        if sys.platform == "darwin":
+            self.scroll(-event.delta)
+        else:
+            self.scroll(-event.delta // 120 * 3)
+
+    def on_arrow(self, event, step):
+        # Move the window when the selection would leave the visible rows
+        children = self.tree.get_children()
+        selection = self.tree.selection()
+        if not children or not selection:
+            return None
+        edge = children[0] if step < 0 else children[-1]
+        if selection[-1] != edge:
+            return None
+        self.scroll(step)
+        children = self.tree.get_children()
+        if children:
+            self.tree.selection_set(children[0] if step < 0 else children[-1])
+        return "break"
+
+    def yview(self, *args):
+        total = self.count_rows()
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.height
+            self.first += amount
+        self.render(total)
+
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+
+    def scroll_to_end(self):
+        self.first = self.count_rows()
+        self.render()
+
+    def refresh(self):
+        # Redraw the visible window, e.g. after the underlying rows changed
+        self.render()
+
+    def render(self, total=None):
+        with metrics.timer("ui.treeview.render"):
+            self._render(total)
+
+    def _render(self, total):
+        if total is None:
+            total = self.count_rows()
+        self.first = max(0, min(self.first, total - self.height))
+        with metrics.timer("ui.treeview.fetch"):
+            rows = self.fetch_rows(self.first, self.height)
+
+        self.tree.delete(*self.tree.get_children())
+        for iid, values in rows:
+            self.tree.insert("", tk.END, iid=iid, values=values)
+
+        if total:
+            self.scrollbar.set(self.first / total,
+                               (self.first + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+class ListRows:
+    """fetch_rows/count_rows over an in-memory list of row values."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def fetch(self, offset, limit):
+        return [(str(i), values) for i, values in
+                enumerate(self.rows[offset:offset + limit], offset)]
+
+    def count(self):
+        return len(self.rows)
+
+
+class TimerPump:
+    """Runs a vocab_core.timers.Timers from Tk's event loop.
+
+    At most one after() callback is pending, set for the earliest deadline, so
+    however many timers there are the window wakes once per deadline (and
+    not at all while the timers are paused or empty).
+    """
+
+    def __init__(self, widget, timers):
+        self.widget = widget
+        self.timers = timers
+        self.after_id = None
+        self.running = False
+        timers.wakeup = self.arm
+
+    def arm(self):
+        # (re)schedule the wake-up for the earliest deadline
+        if self.running:
+            # wake() re-arms once the due callbacks have run
+            return
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        delay = self.timers.next_delay()
+        if delay is not None:
+            self.after_id = self.widget.after(max(1, math.ceil(delay * 1000)), self.wake)
+
+    def wake(self):
+        self.after_id = None
+        self.running = True
+        try:
+            self.timers.run_due()
+        finally:
+            self.running = False
+        self.arm()
+
+    def close(self):
+        self.timers.wakeup = None
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None